@@ -1,6 +1,7 @@
 import sys
 import os
 import random
+import asyncio
 
 # Add the parent directory to sys.path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -55,21 +56,60 @@ class PDFSummaryAgent(LLMAgent):
         Returns:
             str: The summary of the PDF content.
         """
+        prompts = self._summary_prompts(self.data_uploader, pdf_path, pdf_url)
+
+        # Ensure content was successfully extracted
+        if prompts is None:
+            return "Failed to extract content from the PDF."
+
+        try:
+            # Use the perform_action method from LLMAgent
+            response = self.perform_action(**prompts)
+
+            return response.content if response else "No summary generated."
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            print(f"Error type: {type(e).__name__}")
+            import traceback
+            traceback.print_exc()
+
+    async def summarize_pdf_async(self, pdf_path=None, pdf_url=None):
+        """
+        Async variant of summarize_pdf. The PDF is loaded in a worker thread, with its own
+        DataUploader so that concurrent summaries do not share state.
+        """
+        prompts = await asyncio.to_thread(self._summary_prompts, DataUploader(), pdf_path, pdf_url)
+        if prompts is None:
+            return "Failed to extract content from the PDF."
+
+        try:
+            response = await self.perform_action_async(**prompts)
+
+            return response.content if response else "No summary generated."
+        except Exception as e:
+            print(f"An error occurred: {str(e)}")
+            print(f"Error type: {type(e).__name__}")
+            import traceback
+            traceback.print_exc()
+
+    def _summary_prompts(self, data_uploader, pdf_path=None, pdf_url=None):
+        """
+        perform_action arguments of summarize_pdf, or None if no content could be extracted.
+        """
         # Load the PDF from a URL or file path
         if pdf_url:
-            content = self.data_uploader.upload_from_url(pdf_url)
+            content = data_uploader.upload_from_url(pdf_url)
             if content:
-                text_content = self.data_uploader.parse_html()  # Use parse_html to extract text from HTML
+                text_content = data_uploader.parse_html()  # Use parse_html to extract text from HTML
             else:
                 text_content = None
         elif pdf_path:
-            text_content = self.data_uploader.upload_from_pdf(pdf_path)
+            text_content = data_uploader.upload_from_pdf(pdf_path)
         else:
             raise ValueError("Either a PDF path or URL must be provided.")
 
-        # Ensure content was successfully extracted
         if not text_content:
-            return "Failed to extract content from the PDF."
+            return None
 
         # Check the word count
         word_count = len(text_content.split())
@@ -79,9 +119,8 @@ class PDFSummaryAgent(LLMAgent):
             text_content = self.random_adjust(text_content)
             print(f"Adjusted word count: {len(text_content.split())}")
 
-        try:
-            # Generate a summary using the LLM
-            system_prompt = """
+        # Generate a summary using the LLM
+        system_prompt = """
             You are a professional summarizer. Your task is to provide a concise and clear summary of the following content:
 
             The summary should cover the main points, key arguments, and conclusions. Keep it brief but informative.
@@ -89,21 +128,11 @@ class PDFSummaryAgent(LLMAgent):
             Format: Title. Main Narrative. Insight.
             """
 
-            user_prompt = text_content
-
-            # Use the perform_action method from LLMAgent
-            response = self.perform_action(
-                user_prompt=user_prompt,
-                system_prompt=system_prompt,
-                schema_class=None
-            )
-
-            return response.content if response else "No summary generated."
-        except Exception as e:
-            print(f"An error occurred: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            import traceback
-            traceback.print_exc()
+        return dict(
+            user_prompt=text_content,
+            system_prompt=system_prompt,
+            schema_class=None
+        )
 
     def to_string(self):
         """
@@ -1,7 +1,30 @@
+import time
+import asyncio
 from abc import ABC, abstractmethod
 from fundations.LLMResponsePro import LLMResponsePro
 from fundations.foundation import LLMResponse
+from fundations.responseCache import ResponseCache, default_response_cache
+from fundations.hedging import (HedgePolicy, DEFAULT_HEDGE_POLICY, RETRY_ONLY, call_hedged, call_hedged_async,
+                                latency_tracker, resolve_deadline, DeadlineExceeded)
 from pydantic import BaseModel, Field
+from openai.types.chat import ChatCompletionMessage
+
+def print_stream(deltas) -> str:
+    """
+    Print text deltas as they arrive (e.g. from LLMAgent.perform_action_stream) and return the whole text.
+    """
+    parts = []
+    for delta in deltas:
+        print(delta, end="", flush=True)
+        parts.append(delta)
+    print()
+    return "".join(parts)
+
+
+def print_first_token(seconds: float):
+    # on_first_token hook for the command line
+    print(f"(first token after {seconds:.2f}s)", flush=True)
+
 
 class Agent(ABC):
     def __init__(self):
@@ -28,28 +51,239 @@ class Agent(ABC):
         return self.previous_result
 
 class LLMAgent(Agent):
-    def __init__(self, model_name):
+    def __init__(self, model_name, cache: ResponseCache = None, hedging: HedgePolicy = None):
         super().__init__()
         self.model_name = model_name
         self.llm_pro = LLMResponsePro(model_name)
         self.llm = LLMResponse(model_name)
+        # Responses are cached across runs (see ResponseCache); LLM_CACHE=0 disables the default cache
+        self.cache = cache if cache is not None else default_response_cache()
+        # Hedging and retries of slow or failed calls; LLM_HEDGING=1 enables the default policy
+        self.hedging = hedging if hedging is not None else DEFAULT_HEDGE_POLICY
 
-    def perform_action(self, user_prompt: str, system_prompt: str, schema_class: BaseModel = None):
+    @classmethod
+    def latency_stats(cls) -> dict:
+        """
+        Count and p50/p95/p99 latency (seconds) of this agent class's model requests, plus hedging counters.
+        """
+        return latency_tracker.summary().get(cls.__name__, {})
+
+    def perform_action(self, user_prompt: str, system_prompt: str, schema_class: BaseModel = None,
+                       use_cache: bool = True, deadline=None, hedging: HedgePolicy = None, **params):
         """
         Perform an action using the LLM with explicit parameters.
         Use LLMResponsePro if schema_class is provided, otherwise use LLMResponse.
+        Generation params (e.g. temperature) are passed to the model and are part of the cache key.
+
+        deadline (seconds, or a Deadline; by default the one of the enclosing deadline_scope)
+        bounds the whole call, retries included. hedging (by default self.hedging) sends a
+        duplicate request when the first is slow. With either, failed calls are retried and
+        then raise (DeadlineExceeded once the deadline has passed) instead of returning None.
+        """
+        cache, key, response = self._cached(user_prompt, system_prompt, schema_class, use_cache, params)
+        if response is not None:
+            self.previous_result = response
+            return response
+
+        send = self.llm_pro.structured_output if schema_class else self.llm.llm_output
+        deadline, policy = resolve_deadline(deadline), hedging or self.hedging
+        if deadline is None and policy is None:
+            start = time.perf_counter()
+            response = send(**self._request_kwargs(user_prompt, system_prompt, schema_class, params))
+            if response is not None:
+                latency_tracker.record(type(self).__name__, time.perf_counter() - start)
+        else:
+            response = call_hedged(
+                lambda timeout: send(**self._request_kwargs(user_prompt, system_prompt, schema_class, params,
+                                                            timeout, hedged=True)),
+                type(self).__name__, policy or RETRY_ONLY, deadline)
+        return self._record(cache, key, response)
+
+    async def perform_action_async(self, user_prompt: str, system_prompt: str, schema_class: BaseModel = None,
+                                   use_cache: bool = True, deadline=None, hedging: HedgePolicy = None, **params):
+        """
+        Async variant of perform_action. Calls from all agents on one event loop share
+        the llm_semaphore, so many of them can be awaited together (e.g. with asyncio.gather).
+        Requests that lose a hedging race are cancelled.
+        """
+        cache, key, response = self._cached(user_prompt, system_prompt, schema_class, use_cache, params)
+        if response is not None:
+            self.previous_result = response
+            return response
+
+        send = self.llm_pro.structured_output_async if schema_class else self.llm.llm_output_async
+        deadline, policy = resolve_deadline(deadline), hedging or self.hedging
+        if deadline is None and policy is None:
+            start = time.perf_counter()
+            response = await send(**self._request_kwargs(user_prompt, system_prompt, schema_class, params))
+            if response is not None:
+                latency_tracker.record(type(self).__name__, time.perf_counter() - start)
+        else:
+            response = await call_hedged_async(
+                lambda timeout: send(**self._request_kwargs(user_prompt, system_prompt, schema_class, params,
+                                                            timeout, hedged=True)),
+                type(self).__name__, policy or RETRY_ONLY, deadline)
+        return self._record(cache, key, response)
+
+    @staticmethod
+    def _request_kwargs(user_prompt, system_prompt, schema_class, params, timeout=None, hedged=False) -> dict:
         """
+        Arguments of one llm_output or structured_output request.
+        """
+        kwargs = dict(params, user_prompt=user_prompt, system_prompt=system_prompt)
         if schema_class:
-            response = self.llm_pro.structured_output(
-                schema_class=schema_class,
-                user_prompt=user_prompt,
-                system_prompt=system_prompt
-            )
+            kwargs["schema_class"] = schema_class
+        if hedged:
+            # Retries are left to the hedging policy, so failures must raise rather than give None
+            kwargs["max_retries"] = 0
+            if schema_class:
+                kwargs["raise_errors"] = True
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return kwargs
+
+    def perform_action_stream(self, user_prompt: str, system_prompt: str, use_cache: bool = True,
+                              on_first_token=None, deadline=None, hedging: HedgePolicy = None, **params):
+        """
+        Free-text perform_action that yields text deltas as they arrive. When the stream is
+        exhausted, the assembled message is recorded in previous_result (and cached); a cached
+        response is yielded as a single delta. on_first_token is called with the time to the
+        first delta in seconds.
+
+        With a deadline or hedging (as in perform_action), the request is sent with the time
+        left as its timeout and is hedged and retried until its first delta arrives; the rest
+        of the stream must also arrive before the deadline, else DeadlineExceeded is raised.
+        The deadline of the enclosing deadline_scope is taken when this is called, not when
+        the stream is first read.
+        """
+        return self._stream(user_prompt, system_prompt, use_cache, on_first_token, resolve_deadline(deadline),
+                            hedging or self.hedging, params)
+
+    def _stream(self, user_prompt, system_prompt, use_cache, on_first_token, deadline, policy, params):
+        start = time.perf_counter()
+        cache, key, response = self._cached(user_prompt, system_prompt, None, use_cache, params)
+        if response is not None:
+            self.previous_result = response
+            if on_first_token is not None:
+                on_first_token(time.perf_counter() - start)
+            yield response.content
+            return
+
+        if deadline is None and policy is None:
+            deltas = self.llm.llm_output_stream(user_prompt, system_prompt, on_first_token, **params)
         else:
-            response = self.llm.llm_output(
-                user_prompt=user_prompt,
-                system_prompt=system_prompt
-            )
+            def first_delta(timeout):
+                stream = self.llm.llm_output_stream(user_prompt, system_prompt,
+                                                    **self._stream_kwargs(params, timeout))
+                return next(stream, ""), stream
+
+            first, stream = call_hedged(first_delta, self._first_token_name(), policy or RETRY_ONLY, deadline,
+                                        discard=lambda result: result[1].close())
+            if on_first_token is not None:
+                on_first_token(time.perf_counter() - start)
+            deltas = self._until_deadline(first, stream, deadline)
+
+        parts = []
+        for delta in deltas:
+            parts.append(delta)
+            yield delta
+        self._record(cache, key, ChatCompletionMessage(role="assistant", content="".join(parts)))
+
+    def perform_action_stream_async(self, user_prompt: str, system_prompt: str, use_cache: bool = True,
+                                    on_first_token=None, deadline=None, hedging: HedgePolicy = None, **params):
+        """
+        Async variant of perform_action_stream, an async iterator of text deltas.
+        """
+        return self._stream_async(user_prompt, system_prompt, use_cache, on_first_token, resolve_deadline(deadline),
+                                  hedging or self.hedging, params)
+
+    async def _stream_async(self, user_prompt, system_prompt, use_cache, on_first_token, deadline, policy, params):
+        start = time.perf_counter()
+        cache, key, response = self._cached(user_prompt, system_prompt, None, use_cache, params)
+        if response is not None:
+            self.previous_result = response
+            if on_first_token is not None:
+                on_first_token(time.perf_counter() - start)
+            yield response.content
+            return
+
+        parts = []
+        if deadline is None and policy is None:
+            async for delta in self.llm.llm_output_stream_async(user_prompt, system_prompt, on_first_token, **params):
+                parts.append(delta)
+                yield delta
+        else:
+            async def first_delta(timeout):
+                stream = self.llm.llm_output_stream_async(user_prompt, system_prompt,
+                                                          **self._stream_kwargs(params, timeout))
+                return await anext(stream, ""), stream
+
+            first, stream = await call_hedged_async(
+                first_delta, self._first_token_name(), policy or RETRY_ONLY, deadline,
+                discard=lambda result: asyncio.ensure_future(result[1].aclose()))
+            if on_first_token is not None:
+                on_first_token(time.perf_counter() - start)
+            try:
+                delta = first
+                while delta:
+                    parts.append(delta)
+                    yield delta
+                    if deadline is None:
+                        delta = await anext(stream, "")
+                        continue
+                    try:
+                        delta = await asyncio.wait_for(anext(stream, ""), deadline.remaining())
+                    except asyncio.TimeoutError:
+                        raise self._deadline_exceeded(deadline) from None
+            finally:
+                await stream.aclose()
+        self._record(cache, key, ChatCompletionMessage(role="assistant", content="".join(parts)))
+
+    def _first_token_name(self) -> str:
+        # Streams are hedged on their time to first token, tracked apart from whole calls
+        return f"{type(self).__name__}.first_token"
+
+    @staticmethod
+    def _stream_kwargs(params, timeout) -> dict:
+        # Arguments of one hedged stream request; retries are left to the hedging policy
+        kwargs = dict(params, max_retries=0)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        return kwargs
+
+    def _deadline_exceeded(self, deadline) -> DeadlineExceeded:
+        latency_tracker.count(type(self).__name__, "deadline_exceeded")
+        return DeadlineExceeded(f"{type(self).__name__} stream did not finish within its "
+                                f"{deadline.seconds:.1f}s deadline")
+
+    def _until_deadline(self, first, stream, deadline):
+        """
+        The first delta and the rest of a synchronous stream, checking the deadline between deltas.
+        """
+        try:
+            if first:
+                yield first
+            for delta in stream:
+                if deadline is not None and deadline.expired:
+                    raise self._deadline_exceeded(deadline)
+                yield delta
+        finally:
+            stream.close()
+
+    def _cached(self, user_prompt, system_prompt, schema_class, use_cache, params):
+        """
+        Cache and key for a call, and the cached response (None on a miss or without a cache).
+        """
+        cache = self.cache if use_cache else None
+        if cache is None:
+            return None, None, None
+        key = cache.key(self.model_name, system_prompt, user_prompt, schema_class, params)
+        return cache, key, cache.get(key, schema_class)
+
+    def _record(self, cache, key, response):
+        # Failed structured outputs come back as None and are not cached
+        if cache is not None and response is not None:
+            cache.put(key, response)
         self.previous_result = response
         return response
 
@@ -13,6 +13,21 @@ class ContextAnalyst(LLMAgent):
         super().__init__(model_name)  # Initialize the base LLMAgent class
 
     def analyze_literature_structured(self, background_info: str, literature_list: list[str]):
+        # Use the perform_action method from LLMAgent
+        response = self.perform_action(**self._structured_analysis_prompts(background_info, literature_list))
+        return response.relationships if response else None
+
+    async def analyze_literature_structured_async(self, background_info: str, literature_list: list[str]):
+        """
+        Async variant of analyze_literature_structured.
+        """
+        response = await self.perform_action_async(**self._structured_analysis_prompts(background_info, literature_list))
+        return response.relationships if response else None
+
+    def _structured_analysis_prompts(self, background_info: str, literature_list: list[str]) -> dict:
+        """
+        perform_action arguments of analyze_literature_structured.
+        """
         prompt_template = f"""
         You are an expert in literature analysis and synthesis. You are given several pieces of literature with background information:
 
@@ -27,16 +42,44 @@ class ContextAnalyst(LLMAgent):
         Provide the analysis in clear thematic sections.
         """
 
-        # Use the perform_action method from LLMAgent
-        response = self.perform_action(
+        return dict(
             system_prompt=prompt_template,
             user_prompt="",
             schema_class=LiteratureRelationshipSchema
         )
-
-        return response.relationships if response else None
     
     def analyze_literature_essay(self, background_info: str, literature_list: list[str]):
+        # Use the perform_action method from LLMAgent
+        response = self.perform_action(**self._essay_analysis_prompts(background_info, literature_list))
+        return response.content
+
+    async def analyze_literature_essay_async(self, background_info: str, literature_list: list[str]):
+        """
+        Async variant of analyze_literature_essay.
+        """
+        response = await self.perform_action_async(**self._essay_analysis_prompts(background_info, literature_list))
+        return response.content
+
+    def analyze_literature_essay_stream(self, background_info: str, literature_list: list[str],
+                                        on_first_token=None):
+        """
+        Streaming variant of analyze_literature_essay, yielding text deltas (see LLMAgent.perform_action_stream).
+        """
+        return self.perform_action_stream(**self._essay_analysis_prompts(background_info, literature_list),
+                                          on_first_token=on_first_token)
+
+    def analyze_literature_essay_stream_async(self, background_info: str, literature_list: list[str],
+                                              on_first_token=None):
+        """
+        Async iterator variant of analyze_literature_essay_stream.
+        """
+        return self.perform_action_stream_async(**self._essay_analysis_prompts(background_info, literature_list),
+                                                on_first_token=on_first_token)
+
+    def _essay_analysis_prompts(self, background_info: str, literature_list: list[str]) -> dict:
+        """
+        perform_action arguments of analyze_literature_essay.
+        """
         prompt_template = f"""
         You are an expert in literature analysis and synthesis from Oxford. You are given several pieces of literature with background information:
 
@@ -51,14 +94,11 @@ class ContextAnalyst(LLMAgent):
         Provide the analysis in clear thematic sections.
         """
 
-        # Use the perform_action method from LLMAgent
-        response = self.perform_action(
+        return dict(
             system_prompt=prompt_template,
             user_prompt="Make the essay comprehensive and effective please.",
         )
 
-        return response.content
-
 # Below is for individual testing. 
 # background_info = "The focus is on AI-driven agent systems and their use in autonomous research models."
 # literature_list = [
@@ -21,7 +21,21 @@ class CritiqueAgent(LLMAgent):
         Returns:
             str: A detailed critique highlighting strengths, weaknesses, and suggestions for improvement.
         """
+        # Perform the action using the LLM model
+        response = self.perform_action(**self._critique_prompts(essay_structure, compiled_essay))
+        return response.content if response else "Critique failed. Please try again."
+
+    async def critique_essay_async(self, essay_structure: List[Dict], compiled_essay: str) -> str:
+        """
+        Async variant of critique_essay.
+        """
+        response = await self.perform_action_async(**self._critique_prompts(essay_structure, compiled_essay))
+        return response.content if response else "Critique failed. Please try again."
 
+    def _critique_prompts(self, essay_structure: List[Dict], compiled_essay: str) -> dict:
+        """
+        perform_action arguments of critique_essay.
+        """
         critique_criteria = """
         Criteria for Critique:
             1. Structure & Flow: Is the essay well-organized? Are the sections clearly delineated? Are the transitions between sections smooth and logical?
@@ -71,14 +85,11 @@ class CritiqueAgent(LLMAgent):
         Writing Style: {critique_criteria}
         """
 
-        # Perform the action using the LLM model
-        response = self.perform_action(
+        return dict(
             user_prompt=input_prompt,
             system_prompt=system_prompt
         )
 
-        return response.content if response else "Critique failed. Please try again."
-
 
 # Example usage:
 if __name__ == "__main__":
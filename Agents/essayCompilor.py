@@ -11,6 +11,36 @@ class EssayCompiler(LLMAgent):
         super().__init__(model_name)
 
     def compile_essay(self, essay_structure: List[Dict], compiled_essay: str) -> str:
+        # Perform the action using the LLM model
+        response = self.perform_action(**self._compile_prompts(essay_structure, compiled_essay))
+        return response.content if response else "Compilation failed. Please try again."
+
+    async def compile_essay_async(self, essay_structure: List[Dict], compiled_essay: str) -> str:
+        """
+        Async variant of compile_essay.
+        """
+        response = await self.perform_action_async(**self._compile_prompts(essay_structure, compiled_essay))
+        return response.content if response else "Compilation failed. Please try again."
+
+    def compile_essay_stream(self, essay_structure: List[Dict], compiled_essay: str, on_first_token=None):
+        """
+        Streaming variant of compile_essay, yielding text deltas (see LLMAgent.perform_action_stream).
+        """
+        return self.perform_action_stream(**self._compile_prompts(essay_structure, compiled_essay),
+                                          on_first_token=on_first_token)
+
+    def compile_essay_stream_async(self, essay_structure: List[Dict], compiled_essay: str,
+                                   on_first_token=None):
+        """
+        Async iterator variant of compile_essay_stream.
+        """
+        return self.perform_action_stream_async(**self._compile_prompts(essay_structure, compiled_essay),
+                                                on_first_token=on_first_token)
+
+    def _compile_prompts(self, essay_structure: List[Dict], compiled_essay: str) -> dict:
+        """
+        perform_action arguments of compile_essay.
+        """
         writing_style = """
         Writing Style & Tone: 
             1.	Concise and Objective Statements: The text presents research findings and observations in a clear, factual manner, without emotional language. Examples include direct statements like “Studies on protests slogans… remain scarce.”
@@ -80,14 +110,11 @@ class EssayCompiler(LLMAgent):
 
         """#TODO Dynamic Writing Style in the future. 
 
-        # Perform the action using the LLM model
-        response = self.perform_action(
+        return dict(
             user_prompt=input_prompt,
             system_prompt=system_prompt
         )
 
-        return response.content if response else "Compilation failed. Please try again."
-
 # # Example usage:
 # if __name__ == "__main__":
 #     # Initialize the agent
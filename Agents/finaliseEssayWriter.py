@@ -22,7 +22,37 @@ class FinaliseEssayWriter(LLMAgent):
         Returns:
             str: The final revised version of the essay, addressing all feedback.
         """
+        # Perform the action using the LLM model
+        response = self.perform_action(**self._finalise_prompts(essay_structure, compiled_essay, critique))
+        return response.content if response else "Finalisation failed. Please try again."
+
+    async def finalise_essay_async(self, essay_structure: List[Dict], compiled_essay: str, critique: str) -> str:
+        """
+        Async variant of finalise_essay.
+        """
+        response = await self.perform_action_async(**self._finalise_prompts(essay_structure, compiled_essay, critique))
+        return response.content if response else "Finalisation failed. Please try again."
+
+    def finalise_essay_stream(self, essay_structure: List[Dict], compiled_essay: str, critique: str,
+                              on_first_token=None):
+        """
+        Streaming variant of finalise_essay, yielding text deltas (see LLMAgent.perform_action_stream).
+        """
+        return self.perform_action_stream(**self._finalise_prompts(essay_structure, compiled_essay, critique),
+                                          on_first_token=on_first_token)
 
+    def finalise_essay_stream_async(self, essay_structure: List[Dict], compiled_essay: str, critique: str,
+                                    on_first_token=None):
+        """
+        Async iterator variant of finalise_essay_stream.
+        """
+        return self.perform_action_stream_async(**self._finalise_prompts(essay_structure, compiled_essay, critique),
+                                                on_first_token=on_first_token)
+
+    def _finalise_prompts(self, essay_structure: List[Dict], compiled_essay: str, critique: str) -> dict:
+        """
+        perform_action arguments of finalise_essay.
+        """
         finalisation_criteria = """
         Finalisation Criteria:
             1. Address all weaknesses mentioned in the critique, including structure, clarity, and argument depth.
@@ -61,14 +91,11 @@ class FinaliseEssayWriter(LLMAgent):
         Writing Style: {finalisation_criteria}
         """
 
-        # Perform the action using the LLM model
-        response = self.perform_action(
+        return dict(
             user_prompt=input_prompt,
             system_prompt=system_prompt
         )
 
-        return response.content if response else "Finalisation failed. Please try again."
-
 
 # Example usage:
 if __name__ == "__main__":
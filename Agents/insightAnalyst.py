@@ -6,6 +6,21 @@ class InsightAnalyst(LLMAgent):
         super().__init__(model_name)  # Initialize the base LLMAgent class
 
     def generate_sub_questions(self, research_question: str):
+        # Use the perform_action method from LLMAgent
+        response = self.perform_action(**self._sub_question_prompts(research_question))
+        return response.sub_questions if response else None
+
+    async def generate_sub_questions_async(self, research_question: str):
+        """
+        Async variant of generate_sub_questions.
+        """
+        response = await self.perform_action_async(**self._sub_question_prompts(research_question))
+        return response.sub_questions if response else None
+
+    def _sub_question_prompts(self, research_question: str) -> dict:
+        """
+        perform_action arguments of generate_sub_questions.
+        """
         prompt_template = """
         You are an expert in brainstorming, analyzing, and researching. You are given a research question: 
 
@@ -14,13 +29,10 @@ class InsightAnalyst(LLMAgent):
         Your task is to generate a list of sub-questions that are related to this and will help in building a professional research thesis.
         """
 
-        # Use the perform_action method from LLMAgent
-        response = self.perform_action(
+        return dict(
             system_prompt=prompt_template,
             schema_class=SubQuestionSchema,
             user_prompt=research_question
         )
-
-        return response.sub_questions if response else None
     
     
@@ -37,6 +37,12 @@ class LectureAgent(LLMAgent):
         """
         transcription = self.llm_pro.whisper(audio_file_path)
         return transcription
+
+    async def record_lecture_async(self, audio_file_path):
+        """
+        Async variant of record_lecture.
+        """
+        return await self.llm_pro.whisper_async(audio_file_path)
     
 
     def explain(self, lecture_content: str) -> IdeaCardsSchema:
@@ -44,6 +50,22 @@ class LectureAgent(LLMAgent):
         Analyze the lecture content to identify and explain key terms.
         Outputs a schema of list of idea cards.
         """
+        idea_cards = self.perform_action(**self._explain_prompts(lecture_content))
+        self._log_idea_cards(idea_cards)
+        return idea_cards
+
+    async def explain_async(self, lecture_content: str) -> IdeaCardsSchema:
+        """
+        Async variant of explain.
+        """
+        idea_cards = await self.perform_action_async(**self._explain_prompts(lecture_content))
+        self._log_idea_cards(idea_cards)
+        return idea_cards
+
+    def _explain_prompts(self, lecture_content: str) -> dict:
+        """
+        perform_action arguments of explain.
+        """
         system_prompt = """
         You are a helpful assistant. You are professional. The student is an undergraduate student majoring in a subject at Oxford University. Explain concepts clearly and concisely.
 
@@ -66,12 +88,13 @@ class LectureAgent(LLMAgent):
         
         user_prompt = lecture_content
 
-        idea_cards = self.perform_action(
+        return dict(
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             schema_class=IdeaCardsSchema
         )
 
+    def _log_idea_cards(self, idea_cards: IdeaCardsSchema):
         # Log the received idea cards
         logger.info("Received idea cards:")
         for card in idea_cards.idea_cards:
@@ -80,8 +103,6 @@ class LectureAgent(LLMAgent):
             logger.info(f"Idea Context: {card.idea_context}")
             logger.info("---")
 
-        return idea_cards
-
     def build_knowledge(self, pdf_paths: List[str]):
         """
         Build a knowledge base by uploading PDFs or text, storing them in chunks and vector store.
@@ -99,11 +120,24 @@ class LectureAgent(LLMAgent):
         """
         Summarize the whole lecture into a hierarchical level of knowledge graph.
         """
-        response = self.perform_action(
+        response = self.perform_action(**self._summary_prompts(lecture_content))
+        return response.knowledge_graph if response else None
+
+    async def summarise_lec_async(self, lecture_content: str):
+        """
+        Async variant of summarise_lec.
+        """
+        response = await self.perform_action_async(**self._summary_prompts(lecture_content))
+        return response.knowledge_graph if response else None
+
+    def _summary_prompts(self, lecture_content: str) -> dict:
+        """
+        perform_action arguments of summarise_lec.
+        """
+        return dict(
             system_prompt="Summarize the following lecture content into a hierarchical knowledge graph.",
             user_prompt=lecture_content
         )
-        return response.knowledge_graph if response else None
 
 # Example usage
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import sys
 import os
+import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from pydantic import BaseModel, Field
 from typing import List
@@ -31,6 +32,21 @@ class ParagraphWriter(LLMAgent):
         Returns:
         - ParagraphCompilation: The compiled paragraph with references.
         """
+        # Perform the action and parse the result using the ParagraphCompilation schema
+        response = self.perform_action(**self._paragraph_prompts(paragraph_structure, context))
+        return response if response else None
+
+    async def compile_paragraph_async(self, paragraph_structure: dict, context: List[dict]) -> ParagraphCompilation:
+        """
+        Async variant of compile_paragraph.
+        """
+        response = await self.perform_action_async(**self._paragraph_prompts(paragraph_structure, context))
+        return response if response else None
+
+    def _paragraph_prompts(self, paragraph_structure: dict, context: List[dict]) -> dict:
+        """
+        perform_action arguments of compile_paragraph.
+        """
         system_prompt = """
         You are tasked with writing a paragraph as part of an essay. You are given the structure of the paragraph and relevant context from sources like PDFs. Write a professional and compelling paragraph based on the structure and cite the sources appropriately.
         """
@@ -45,14 +61,11 @@ class ParagraphWriter(LLMAgent):
         Your task is to use the structure and the context to write a detailed, high-quality paragraph, including in-text citations for evidence. Use APA style for citations with the format (Author, Year, Page Number). Also, generate a list of references based on the citations.
         """
 
-        # Perform the action and parse the result using the ParagraphCompilation schema
-        response = self.perform_action(
+        return dict(
             user_prompt=user_prompt,
             system_prompt=system_prompt,
             schema_class=ParagraphCompilation
         )
-        
-        return response if response else None
 
     def compile_entire_essay(self, essay_structure: List[dict], context_list: List[List[dict]]) -> EssayCompilationSchema:
         """
@@ -79,6 +92,17 @@ class ParagraphWriter(LLMAgent):
         # Return the final compiled essay in the schema
         return EssayCompilationSchema(essay=compiled_paragraphs)
 
+    async def compile_entire_essay_async(self, essay_structure: List[dict],
+                                         context_list: List[List[dict]]) -> EssayCompilationSchema:
+        """
+        Async variant of compile_entire_essay; all paragraphs are compiled concurrently.
+        """
+        contexts = [context_list[idx] if idx < len(context_list) else "No specific context available for this paragraph."
+                    for idx in range(len(essay_structure))]
+        compiled = await asyncio.gather(*(self.compile_paragraph_async(para_struct, context)
+                                          for para_struct, context in zip(essay_structure, contexts)))
+        return EssayCompilationSchema(essay=[compiled_para for compiled_para in compiled if compiled_para])
+
 # Example usage
 if __name__ == "__main__":
     # Mock essay structure
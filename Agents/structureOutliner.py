@@ -7,6 +7,21 @@ class StructureOutliner(LLMAgent):
         super().__init__(model_name)
 
     def structure_essay(self, main_question: str, sub_questions: list[str]):
+        # Use the perform_action method from LLMAgent
+        response = self.perform_action(**self._structure_prompts(main_question, sub_questions))
+        return response.essay_structure if response else None
+
+    async def structure_essay_async(self, main_question: str, sub_questions: list[str]):
+        """
+        Async variant of structure_essay.
+        """
+        response = await self.perform_action_async(**self._structure_prompts(main_question, sub_questions))
+        return response.essay_structure if response else None
+
+    def _structure_prompts(self, main_question: str, sub_questions: list[str]) -> dict:
+        """
+        perform_action arguments of structure_essay.
+        """
         system_prompt = f"""
         You are professional. You are in charge of structuring an essay that answers this question:
 
@@ -39,15 +54,12 @@ class StructureOutliner(LLMAgent):
 
         user_prompt = main_question
 
-        # Use the perform_action method from LLMAgent
-        response = self.perform_action(
+        return dict(
             user_prompt=user_prompt,
             system_prompt=system_prompt,
             schema_class=EssayStructureSchema
         )
 
-        return response.essay_structure if response else None
-
     def to_string(self):
         """
         Convert the LLM response to a readable string.
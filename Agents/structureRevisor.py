@@ -10,6 +10,21 @@ class StructureRevisor(LLMAgent):
         super().__init__(model_name)
 
     def revise_outline(self, question: str, provided_outline: str, context_summaries: list):
+        # Use the perform_action method from LLMAgent 
+        response = self.perform_action(**self._revision_prompts(question, provided_outline, context_summaries))
+        return response if response else None
+
+    async def revise_outline_async(self, question: str, provided_outline: str, context_summaries: list):
+        """
+        Async variant of revise_outline.
+        """
+        response = await self.perform_action_async(**self._revision_prompts(question, provided_outline, context_summaries))
+        return response if response else None
+
+    def _revision_prompts(self, question: str, provided_outline: str, context_summaries: list) -> dict:
+        """
+        perform_action arguments of revise_outline.
+        """
         prompt_template = """
         You are a professor from Oxford. You are in charge of revising the first draft of a structure of an essay written by a bright student. 
         The student has not read anything before, so you will pay attention to combining the context into the structure to update a better one.
@@ -36,15 +51,12 @@ class StructureRevisor(LLMAgent):
             context_summaries="\n".join(context_summaries)
         )
 
-        # Use the perform_action method from LLMAgent 
-        response = self.perform_action(
+        return dict(
             system_prompt=system_prompt,
             user_prompt="Stay critical. Restructure the whole essay from a new perspective, unless you think that the current one is very very good. Think step by step. Stay very critical and constructive. Your responsibility is to comprehend the background information and distill these information to generate a much better framework.",
             schema_class=EssayStructureSchema,
         )
 
-        return response if response else None
-
 # if __name__ == "__main__":
 #     model_name = "gpt-4o-mini-2024-07-18"
 #     revisor = StructureRevisor(model_name)
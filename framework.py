@@ -9,7 +9,10 @@ from Agents.PDFSummaryAgent import PDFSummaryAgent
 from Agents.contextAnalyst import ContextAnalyst
 from Agents.paragraphWriter import ParagraphWriter, ParagraphCompilation, EssayCompilationSchema
 from Agents.essayCompilor import EssayCompiler
+from Agents.basicAgents import print_stream, print_first_token
 from fundations.open_ai_RAG import Citation_Retriever
+from fundations.embeddingCache import EmbeddingCache
+from fundations.hedging import deadline_scope, latency_tracker
 
 import os
 import json
@@ -24,6 +27,9 @@ from utils.schemas import ParagraphSchema
 CACHE_DIR = "cache"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# Time budget in seconds of each pipeline stage, shared by the model calls it makes
+STAGE_DEADLINE = float(os.getenv("STAGE_DEADLINE", 600))
+
 class PydanticEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, BaseModel):
@@ -62,31 +68,40 @@ def cache_result(func):
 
 # Now you can use this decorator on any function you want to cache
 @cache_result
+@deadline_scope(STAGE_DEADLINE)
 def generate_sub_questions(insight_analyst, research_question):
     return insight_analyst.generate_sub_questions(research_question)
 
 @cache_result
+@deadline_scope(STAGE_DEADLINE)
 def structure_essay(outliner, research_question, sub_questions):
     return outliner.structure_essay(research_question, sub_questions)
 
 @cache_result
+@deadline_scope(STAGE_DEADLINE)
 def summarize_pdf(pdf_summary_agent, pdf_path):
     return pdf_summary_agent.summarize_pdf(pdf_path=pdf_path)
 
 @cache_result
+@deadline_scope(STAGE_DEADLINE)
 def analyze_literature(context_analyst, background_info, literature_list):
     return context_analyst.analyze_literature_essay(background_info, literature_list)
 
 @cache_result
+@deadline_scope(STAGE_DEADLINE)
 def revise_outline(revisor, research_question, essay_structure, additional_info):
     return revisor.revise_outline(research_question, essay_structure, additional_info)
 
 @cache_result
-def retrieve_context(citation_retriever, search_key):
-    answer, context, top_texts = citation_retriever.retrieve_and_ask(search_key)
-    return {"answer": answer, "context": context, "top_texts": top_texts}
+@deadline_scope(STAGE_DEADLINE)
+def retrieve_contexts(citation_retriever, search_keys):
+    # Wrapped in a dict so the cache does not mistake the list for paragraph schemas
+    results = citation_retriever.retrieve_and_ask_many(search_keys)
+    return {"contexts": [{"answer": answer, "context": context, "top_texts": top_texts}
+                         for answer, context, top_texts in results]}
 
 @cache_result
+@deadline_scope(STAGE_DEADLINE)
 def compile_essay(paragraph_writer, essay_structure, context_list):
     return paragraph_writer.compile_entire_essay(essay_structure, context_list)
 
@@ -151,20 +166,26 @@ if __name__ == "__main__":
     print(str(revised_structure_pro)[:500])
 
     # Step 7: Now let us write each paragraph by retrieval of evidence
-    citation_retriever = Citation_Retriever()
-    for pdf_path in pdf_files:
-        citation_retriever.create_embedding_for_pdf(pdf_path, chunk_mode="paragraph")
-
-    context_list = []
+    citation_retriever = Citation_Retriever(embedding_cache=EmbeddingCache(os.path.join(CACHE_DIR, "embeddings")))
+    citation_index_dir = os.path.join(CACHE_DIR, "citation_index")
+    if os.path.exists(citation_index_dir):
+        print("Loading cached citation index")
+        citation_retriever.load_index(citation_index_dir)
+    # Only new or changed PDFs are embedded; the index is saved again if anything changed
+    if citation_retriever.create_embeddings_for_pdfs(pdf_files, chunk_mode="token"):
+        citation_retriever.save_index(citation_index_dir)
+
+    search_keys = []
     for paragraph in essay_structure:
-        section = paragraph.section
-        purpose = paragraph.purpose
         evidence_needed = paragraph.evidence_needed
         argument_development = paragraph.argument_development
-       
+
         print(f"Retrieving context for: {evidence_needed}")
-        search_key = f"Argument to develop: {argument_development} Evidence Needed: {evidence_needed}"
-        retrieved_context = retrieve_context(citation_retriever, search_key)
+        search_keys.append(f"Argument to develop: {argument_development} Evidence Needed: {evidence_needed}")
+
+    # Retrieve evidence for all paragraphs with one embedding call and one batched search
+    context_list = []
+    for retrieved_context in retrieve_contexts(citation_retriever, search_keys)["contexts"]:
         context_pro = f"Answer:\n{retrieved_context['answer']}\nSources:\n{retrieved_context['context']}"
         context_list.append(context_pro)
 
@@ -192,10 +213,11 @@ if __name__ == "__main__":
     # Convert essay_structure to a list of dictionaries
     structure_dict = [paragraph.dict() for paragraph in essay_structure]
 
-    better_essay = essay_compiler_agent.compile_essay(structure_dict, whole_essay)
-
+    # Printed as it is generated
     print("\nFinal Compiled Essay:")
-    print(better_essay)
+    with deadline_scope(STAGE_DEADLINE):
+        better_essay = print_stream(essay_compiler_agent.compile_essay_stream(structure_dict, whole_essay,
+                                                                              on_first_token=print_first_token))
 
     # Optionally, save the final essay to a file
     with open("final_essay.txt", "w") as f:
@@ -203,5 +225,9 @@ if __name__ == "__main__":
 
     print("\nFinal essay has been saved to 'final_essay.txt'")
 
+    print("\nModel request latency per agent (seconds):")
+    for agent_name, stats in latency_tracker.summary().items():
+        print(f"{agent_name}: {stats}")
+
 
 
@@ -12,6 +12,11 @@ from Agents.essayCompilor import EssayCompiler
 from fundations.open_ai_RAG import Citation_Retriever
 from Agents.critiqueAgent import CritiqueAgent
 from Agents.finaliseEssayWriter import FinaliseEssayWriter
+from Agents.basicAgents import print_stream, print_first_token
+from fundations.hedging import deadline_scope
+
+# Time budget in seconds of the streamed final stage, shared by the model calls it makes
+STAGE_DEADLINE = float(os.getenv("STAGE_DEADLINE", 600))
 
 if __name__ == "__main__":
     model_name = "gpt-4o-mini-2024-07-18"  # Replace with your actual model name
@@ -64,9 +69,9 @@ if __name__ == "__main__":
         "We're Here! We're Queer Activist"
     ]
     context_analyst = ContextAnalyst(model_name)
-    relationship_analysis = context_analyst.analyze_literature_essay(background_info, literature_list)
     print("Literature Relationship Analysis:")
-    print(relationship_analysis)
+    relationship_analysis = print_stream(context_analyst.analyze_literature_essay_stream(
+        background_info, literature_list, on_first_token=print_first_token))
 
     # Step 6: Further Revise With Better Literature Analysis
     revised_structure_pro = revisor.revise_outline(research_question, revised_structure, relationship_analysis)
@@ -75,19 +80,19 @@ if __name__ == "__main__":
 
     # Step 7: Now let us write each paragraph by retrieval of evidence
     citation_retriever = Citation_Retriever()
-    for pdf_path in pdf_files:
-        citation_retriever.create_embedding_for_pdf(pdf_path, chunk_mode="paragraph")
+    citation_retriever.create_embeddings_for_pdfs(pdf_files, chunk_mode="token")
 
-    context_list = []
+    search_keys = []
     for paragraph in essay_structure:
-        section = paragraph.section
-        purpose = paragraph.purpose
         evidence_needed = paragraph.evidence_needed
         argument_development = paragraph.argument_development
-       
+
         print(f"Retrieving context for: {evidence_needed}")
-        search_key = f"Argument to develop: {argument_development} Evidence Needed: {evidence_needed}"
-        answer, context, top_texts = citation_retriever.retrieve_and_ask(search_key)
+        search_keys.append(f"Argument to develop: {argument_development} Evidence Needed: {evidence_needed}")
+
+    # Retrieve evidence for all paragraphs with one embedding call and one batched search
+    context_list = []
+    for answer, context, top_texts in citation_retriever.retrieve_and_ask_many(search_keys):
         context_pro = f"Answer:\n{answer}\nSources:\n{context}"
         context_list.append(context_pro)
 
@@ -114,10 +119,11 @@ if __name__ == "__main__":
     # Convert essay_structure to a list of dictionaries
     structure_dict = [paragraph.dict() for paragraph in essay_structure]
 
-    better_essay = essay_compiler_agent.compile_essay(structure_dict, whole_essay)
-
+    # Printed as it is generated
     print("\nFinal Compiled Essay:")
-    print(better_essay)
+    with deadline_scope(STAGE_DEADLINE):
+        better_essay = print_stream(essay_compiler_agent.compile_essay_stream(structure_dict, whole_essay,
+                                                                              on_first_token=print_first_token))
 
     # Step 10: Introducing Critiques
     critique_agent = CritiqueAgent(model_name)
@@ -140,10 +146,9 @@ if __name__ == "__main__":
 
     # Step 12: Finalise the essay based on the critique
     finalise_essay_writer = FinaliseEssayWriter(model_name)
-    finalised_essay = finalise_essay_writer.finalise_essay(structure_dict, better_essay, criticism)
-
     print("\nFinalised Essay:")
-    print(finalised_essay)
+    finalised_essay = print_stream(finalise_essay_writer.finalise_essay_stream(structure_dict, better_essay, criticism,
+                                                                               on_first_token=print_first_token))
 
     # Step 13: Save the final essay, critique, and finalised version
     with open("final_essay_complete.txt", "w") as f:
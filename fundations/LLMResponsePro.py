@@ -1,6 +1,7 @@
-from openai import OpenAI
+from pathlib import Path
 from pydantic import BaseModel
-from fundations.foundation import LLMResponse
+from fundations.foundation import LLMResponse, llm_semaphore
+from fundations.clientRegistry import get_client
 import os
 from dotenv import load_dotenv
 import streamlit as st
@@ -21,27 +22,51 @@ class LLMResponsePro(LLMResponse):
         """
         self.model_name = model_name  # Eg "gpt-4o-2024-08-06"
         
-        # Use the openai_api_key in your OpenAI client initialization
-        self.client = OpenAI(api_key=openai_api_key)
+        # Shared client for openai_api_key, reusing the connections of all other agents
+        self.api_key = openai_api_key
+        self.client = get_client(openai_api_key)
 
-    def structured_output(self, schema_class, user_prompt, system_prompt):
+    def structured_output(self, schema_class, user_prompt, system_prompt, raise_errors=False, max_retries=None,
+                          **params):
         """
         Structure the output according to the provided schema, user prompt, and system prompt.
+        Errors are printed and give None, unless raise_errors is set (e.g. to retry the call).
         """
         try:
-            completion = self.client.beta.chat.completions.parse(
+            completion = self._with_retries(self.client, max_retries).beta.chat.completions.parse(
                 model=self.model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
+                messages=self._messages(user_prompt, system_prompt),
                 response_format=schema_class,
+                **params
             )
 
             response = completion.choices[0].message.parsed
             return response
 
         except Exception as e:
+            if raise_errors:
+                raise
+            print(f"An error occurred: {e}")
+            return None
+
+    async def structured_output_async(self, schema_class, user_prompt, system_prompt, raise_errors=False,
+                                      max_retries=None, **params):
+        """
+        Async variant of structured_output, limited by the shared llm_semaphore.
+        """
+        try:
+            async with llm_semaphore():
+                completion = await self._with_retries(self.async_client, max_retries).beta.chat.completions.parse(
+                    model=self.model_name,
+                    messages=self._messages(user_prompt, system_prompt),
+                    response_format=schema_class,
+                    **params
+                )
+            return completion.choices[0].message.parsed
+
+        except Exception as e:
+            if raise_errors:
+                raise
             print(f"An error occurred: {e}")
             return None
         
@@ -59,3 +84,18 @@ class LLMResponsePro(LLMResponse):
         except Exception as e:
             print(f"An error occurred during transcription: {e}")
             return None
+
+    async def whisper_async(self, audio_file_path):
+        """
+        Async variant of whisper; the audio file is read without blocking the event loop.
+        """
+        try:
+            async with llm_semaphore():
+                transcription = await self.async_client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=Path(audio_file_path),
+                )
+            return transcription.text
+        except Exception as e:
+            print(f"An error occurred during transcription: {e}")
+            return None
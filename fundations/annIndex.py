@@ -0,0 +1,159 @@
+import os
+import sys
+import numpy as np
+from typing import Optional
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.vectorStore import normalize_rows, top_k
+
+
+class IVFIndex:
+    """
+    Inverted-file approximate nearest-neighbour index over a VectorStore.
+
+    Rows are assigned to the nearest of n_lists k-means centroids. A search scores the
+    centroids, then scores exactly only the rows of the nprobe closest lists. Raising
+    nprobe trades latency for recall; nprobe == n_lists is an exact search.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, nprobe: int = 8, n_iter: int = 10, seed: int = 0):
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+        self.centroids = None
+        self.lists = []  # Row ids of the store, one int64 array per centroid
+
+    def __len__(self):
+        return sum(len(rows) for rows in self.lists)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _assign(self, embeddings: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+        """
+        Index of the nearest centroid for every row, computed in blocks.
+        """
+        assignments = np.empty(len(embeddings), dtype=np.int64)
+        for start in range(0, len(embeddings), block_rows):
+            block = np.asarray(embeddings[start:start + block_rows], dtype=np.float32)
+            assignments[start:start + block_rows] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def train(self, embeddings: np.ndarray, sample_size: int = 256):
+        """
+        Fit centroids with spherical k-means on a sample of at most sample_size rows per list.
+        """
+        n = len(embeddings)
+        if n == 0:
+            raise ValueError("Cannot train an IVF index on an empty store")
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(self.seed)
+        sample_rows = np.sort(rng.choice(n, size=min(n, n_lists * sample_size), replace=False))
+        sample = np.asarray(embeddings[sample_rows], dtype=np.float32)
+
+        self.centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignments = self._assign(sample)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=n_lists)
+            empty = counts == 0
+            # Restart empty lists from random sample rows
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            self.centroids = normalize_rows(sums)
+        self.n_lists = n_lists
+        self.lists = [np.zeros(0, dtype=np.int64) for _ in range(n_lists)]
+
+    def add(self, embeddings: np.ndarray, start_row: int):
+        """
+        Assign rows start_row, start_row + 1, ... of the store to their nearest lists.
+        """
+        if not self.is_trained:
+            raise ValueError("IVF index must be trained before adding rows")
+        assignments = self._assign(embeddings)
+        rows = np.arange(start_row, start_row + len(embeddings), dtype=np.int64)
+        order = np.argsort(assignments, kind="stable")
+        list_ids, starts = np.unique(assignments[order], return_index=True)
+        for list_id, group in zip(list_ids, np.split(rows[order], starts[1:])):
+            self.lists[list_id] = np.concatenate([self.lists[list_id], group])
+
+    def remap(self, keep: np.ndarray):
+        """
+        Rewrite row ids after the store was compacted (new row i was old row keep[i]).
+        """
+        new_ids = np.full(int(keep.max()) + 1 if len(keep) else 0, -1, dtype=np.int64)
+        new_ids[keep] = np.arange(len(keep))
+        for list_id, rows in enumerate(self.lists):
+            rows = rows[rows < len(new_ids)]
+            rows = new_ids[rows]
+            self.lists[list_id] = rows[rows >= 0]
+
+    def search(self, embeddings: np.ndarray, query_embedding, top_n: int = 1, nprobe: Optional[int] = None,
+               deleted: Optional[np.ndarray] = None):
+        """
+        Approximate top_n search of `embeddings` (the store's matrix), skipping rows
+        flagged in the `deleted` mask. Returns (row indices, similarities), best first.
+        """
+        query = normalize_rows(query_embedding)
+        probe, _ = top_k(self.centroids @ query, nprobe or self.nprobe)
+        candidates = np.concatenate([self.lists[list_id] for list_id in probe])
+        if deleted is not None:
+            candidates = candidates[~deleted[candidates]]
+        if len(candidates) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        candidates.sort()  # Gather rows in storage order, friendlier to a memory-mapped matrix
+        indices, scores = top_k(embeddings[candidates] @ query, top_n)
+        return candidates[indices], scores
+
+    def save(self, path: str):
+        """
+        Save centroids and inverted lists to an .npz file.
+        """
+        lengths = np.array([len(rows) for rows in self.lists], dtype=np.int64)
+        rows = np.concatenate(self.lists) if self.lists else np.zeros(0, dtype=np.int64)
+        with open(path, "wb") as f:
+            np.savez(f, centroids=self.centroids, list_lengths=lengths, list_rows=rows,
+                     nprobe=self.nprobe, n_iter=self.n_iter, seed=self.seed)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        data = np.load(path)
+        index = cls(n_lists=len(data["centroids"]), nprobe=int(data["nprobe"]),
+                    n_iter=int(data["n_iter"]), seed=int(data["seed"]))
+        index.centroids = data["centroids"]
+        index.lists = np.split(data["list_rows"], np.cumsum(data["list_lengths"])[:-1])
+        return index
+
+
+# Example usage: recall@k and latency against exact search
+if __name__ == "__main__":
+    import time
+    from fundations.vectorStore import VectorStore
+
+    dim, n, n_clusters, k = 256, 200000, 500, 10
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((n_clusters, dim))
+    data = centers[rng.integers(n_clusters, size=n)] + 2.0 * rng.standard_normal((n, dim))
+    queries = centers[rng.integers(n_clusters, size=100)] + 2.0 * rng.standard_normal((100, dim))
+
+    store = VectorStore(dim)
+    store.add(data, [""] * n)
+    start = time.perf_counter()
+    ivf = IVFIndex()
+    ivf.train(store.embeddings)
+    ivf.add(store.embeddings, 0)
+    print(f"Built IVF with {ivf.n_lists} lists over {n} rows in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    exact = [set(store.search(q, k)[0].tolist()) for q in queries]
+    print(f"exact      {(time.perf_counter() - start) * 10:.2f} ms/query")
+    for nprobe in (1, 4, 16, 64):
+        start = time.perf_counter()
+        found = [set(ivf.search(store.embeddings, q, k, nprobe=nprobe)[0].tolist()) for q in queries]
+        elapsed = (time.perf_counter() - start) * 10
+        recall = np.mean([len(f & e) / k for f, e in zip(found, exact)])
+        print(f"nprobe={nprobe:<3} {elapsed:.2f} ms/query, recall@{k} = {recall:.3f}")
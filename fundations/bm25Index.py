@@ -0,0 +1,222 @@
+import os
+import re
+import sys
+import json
+import numpy as np
+from typing import List, Optional
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.vectorStore import top_k
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Merge the posting segments once there are more than this many
+MAX_SEGMENTS = 8
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over the rows of a VectorStore.
+
+    Postings are kept as integer arrays in CSR form: for each segment, the posting list of
+    term t is rows[offsets[t]:offsets[t + 1]] with term frequencies tfs[...]. Each add()
+    appends a new segment; segments are merged once there are more than MAX_SEGMENTS, so
+    incremental adds stay cheap and queries touch only a few arrays per term.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}  # term -> term id
+        self.doc_freqs = np.zeros(0, dtype=np.int64)  # Per term id
+        self.doc_lengths = np.zeros(0, dtype=np.int32)  # Per row
+        self.total_length = 0  # Sum of doc_lengths, so a query need not scan them for the average
+        self.segments = []  # (offsets, rows, tfs) per segment
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def _term_id(self, term: str) -> int:
+        if term not in self.vocabulary:
+            self.vocabulary[term] = len(self.vocabulary)
+        return self.vocabulary[term]
+
+    def add(self, texts: List[str], start_row: int):
+        """
+        Index texts as rows start_row, start_row + 1, ...
+        """
+        if not texts:
+            return
+        term_ids, rows, lengths = [], [], np.zeros(len(texts), dtype=np.int32)
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[i] = len(tokens)
+            term_ids.extend(self._term_id(token) for token in tokens)
+            rows.extend([start_row + i] * len(tokens))
+
+        doc_lengths = np.zeros(start_row + len(texts), dtype=np.int32)
+        kept = min(len(self.doc_lengths), start_row)
+        doc_lengths[:kept] = self.doc_lengths[:kept]
+        doc_lengths[start_row:] = lengths
+        self.doc_lengths = doc_lengths
+        self.total_length = int(doc_lengths.sum(dtype=np.int64))
+        if not term_ids:
+            return
+
+        # Count (term, row) pairs via a single int64 key, which sorts them grouped by term
+        n_terms, n_rows = len(self.vocabulary), len(self.doc_lengths)
+        keys, pair_tfs = np.unique(np.array(term_ids, dtype=np.int64) * n_rows + np.array(rows, dtype=np.int64),
+                                   return_counts=True)
+        pair_terms, pair_rows = np.divmod(keys, n_rows)
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pair_terms, minlength=n_terms), out=offsets[1:])
+        self.segments.append((offsets, pair_rows, pair_tfs.astype(np.int32)))
+
+        doc_freqs = np.zeros(n_terms, dtype=np.int64)
+        doc_freqs[:len(self.doc_freqs)] = self.doc_freqs
+        doc_freqs += np.bincount(pair_terms, minlength=n_terms)
+        self.doc_freqs = doc_freqs
+        if len(self.segments) > MAX_SEGMENTS:
+            self.merge()
+
+    def merge(self):
+        """
+        Merge all posting segments into one.
+        """
+        if len(self.segments) <= 1:
+            return
+        n_terms = len(self.vocabulary)
+        all_terms, all_rows, all_tfs = [], [], []
+        for offsets, rows, tfs in self.segments:
+            counts = np.diff(offsets)
+            all_terms.append(np.repeat(np.arange(len(counts)), counts))
+            all_rows.append(rows)
+            all_tfs.append(tfs)
+        terms, rows, tfs = np.concatenate(all_terms), np.concatenate(all_rows), np.concatenate(all_tfs)
+        order = np.lexsort((rows, terms))
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=n_terms), out=offsets[1:])
+        self.segments = [(offsets, rows[order], tfs[order])]
+
+    def remap(self, keep: np.ndarray):
+        """
+        Rewrite row ids after the store was compacted (new row i was old row keep[i]).
+        """
+        self.merge()
+        new_ids = np.full(len(self.doc_lengths), -1, dtype=np.int64)
+        new_ids[keep] = np.arange(len(keep))
+        self.doc_lengths = self.doc_lengths[keep]
+        self.total_length = int(self.doc_lengths.sum(dtype=np.int64))
+        if not self.segments:
+            return
+        offsets, rows, tfs = self.segments[0]
+        terms = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        rows = new_ids[rows]
+        live = rows >= 0
+        terms, rows, tfs = terms[live], rows[live], tfs[live]
+        offsets = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)), out=offsets[1:])
+        self.segments = [(offsets, rows, tfs)]
+        self.doc_freqs = np.bincount(terms, minlength=len(self.vocabulary)).astype(np.int64)
+
+    def scores(self, query: str, deleted: Optional[np.ndarray] = None):
+        """
+        BM25 scores of the rows matching any query term.
+        Returns (rows, scores) for the matching rows, sorted by row. Only the query terms'
+        posting lists are touched, so the cost does not grow with the number of rows.
+        """
+        n = len(self.doc_lengths)
+        term_ids = [self.vocabulary[term] for term in set(tokenize(query)) if term in self.vocabulary]
+        if n == 0 or not term_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        avg_length = max(self.total_length / n, 1.0)
+        matched, contributions = [], []
+        for term_id in term_ids:
+            df = self.doc_freqs[term_id]
+            idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+            for offsets, rows, tfs in self.segments:
+                if term_id + 1 >= len(offsets):
+                    continue
+                posting = slice(offsets[term_id], offsets[term_id + 1])
+                rows_t, tfs_t = rows[posting], tfs[posting]
+                if len(rows_t) == 0:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[rows_t] / avg_length)
+                matched.append(rows_t)
+                contributions.append(idf * tfs_t * (self.k1 + 1) / (tfs_t + norm))
+        if not matched:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        # Sum the contributions over the union of the posting rows
+        rows, inverse = np.unique(np.concatenate(matched), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions), minlength=len(rows)).astype(np.float32)
+        if deleted is not None:
+            live = ~deleted[rows]
+            rows, scores = rows[live], scores[live]
+        return rows, scores
+
+    def search(self, query: str, top_n: int = 1, deleted: Optional[np.ndarray] = None,
+               rows: Optional[np.ndarray] = None):
+        """
+        Top_n rows by BM25 score, optionally restricted to the sorted row ids `rows`.
+        Returns (row indices, scores), best first.
+        """
+        matched, scores = self.scores(query, deleted)
+        if rows is not None:
+            allowed = np.isin(matched, rows, assume_unique=True)
+            matched, scores = matched[allowed], scores[allowed]
+        indices, top_scores = top_k(scores, top_n)
+        return matched[indices], top_scores
+
+    def save(self, path: str):
+        self.merge()
+        if self.segments:
+            offsets, rows, tfs = self.segments[0]
+        else:
+            offsets, rows, tfs = np.zeros(len(self.vocabulary) + 1, dtype=np.int64), np.zeros(0), np.zeros(0)
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(path, "wb") as f:
+            np.savez(f, offsets=offsets, rows=rows.astype(np.int64), tfs=tfs.astype(np.int32),
+                     doc_freqs=self.doc_freqs, doc_lengths=self.doc_lengths, k1=self.k1, b=self.b,
+                     vocabulary=np.frombuffer(json.dumps(vocabulary).encode("utf-8"), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        data = np.load(path)
+        index = cls(k1=float(data["k1"]), b=float(data["b"]))
+        vocabulary = json.loads(data["vocabulary"].tobytes().decode("utf-8"))
+        index.vocabulary = {term: i for i, term in enumerate(vocabulary)}
+        index.doc_freqs = data["doc_freqs"]
+        index.doc_lengths = data["doc_lengths"]
+        index.total_length = int(index.doc_lengths.sum(dtype=np.int64))
+        if len(data["rows"]):
+            index.segments = [(data["offsets"], data["rows"], data["tfs"])]
+        return index
+
+
+# Example usage: lexical query latency on a synthetic corpus
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    words = np.array([f"word{i}" for i in range(20000)] + ["tishreen", "gene", "sharp"])
+    n_docs = 100000
+    index = BM25Index()
+    start = time.perf_counter()
+    for batch_start in range(0, n_docs, 10000):
+        texts = [" ".join(row) for row in words[rng.integers(len(words), size=(10000, 60))]]
+        index.add(texts, batch_start)
+    print(f"Indexed {len(index)} chunks in {time.perf_counter() - start:.1f}s")
+
+    for query in ("Tishreen", "Gene Sharp", "word12 word345 word6789"):
+        start = time.perf_counter()
+        for _ in range(100):
+            rows, scores = index.search(query, top_n=10)
+        print(f"{query!r}: {(time.perf_counter() - start) * 10:.3f} ms/query, top row {rows[0]} ({scores[0]:.2f})")
@@ -0,0 +1,216 @@
+import re
+import warnings
+from typing import Iterable, List, Tuple
+
+# Tokenizer of the text-embedding-3 models
+TOKENIZER_ENCODING = "cl100k_base"
+
+# Default chunk budget, in tokens
+CHUNK_MAX_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 48
+CHUNK_MIN_TOKENS = 64
+
+# Words ending in "." that do not end a sentence
+ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "vs", "etc", "e.g", "i.e", "cf", "p", "pp", "vol",
+                 "no", "fig", "ed", "eds", "al", "op", "cit", "ibid"}
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+LINE_HYPHEN = re.compile(r"(\w) ?-\s*\n\s*(\w)")  # "mobi-\nlise" -> "mobilise"
+SENTENCE_END = re.compile(r"[.!?][\"'”’)\]]*\s+(?=[\"'“‘(\[]?[A-Z0-9])")
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except (ImportError, OSError) as e:  # Not installed, or its encoding file cannot be fetched
+            warnings.warn(f"tiktoken {TOKENIZER_ENCODING} encoding unavailable ({type(e).__name__}: {e}); "
+                          f"token counts are estimated as ~4 characters per token")
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text with tiktoken, falling back to ~4 characters per token
+    when the tokenizer is not available.
+    """
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def split_tokens(text: str, max_tokens: int) -> List[str]:
+    """
+    Split a text into pieces of at most max_tokens tokens, on word boundaries when the
+    tokenizer is not available.
+    """
+    encoding = _get_encoding()
+    if encoding:
+        ids = encoding.encode(text)
+        return [encoding.decode(ids[start:start + max_tokens]) for start in range(0, len(ids), max_tokens)]
+    pieces, words, n_tokens = [], [], 0
+    for word in text.split():
+        word_tokens = count_tokens(" " + word)
+        if words and n_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(words))
+            words, n_tokens = [], 0
+        words.append(word)
+        n_tokens += word_tokens
+    if words:
+        pieces.append(" ".join(words))
+    return pieces
+
+
+def split_sentences(text: str):
+    """
+    Yields (sentence, ends_paragraph) for a page of extracted text, with line breaks and
+    hyphenation at line ends undone.
+    """
+    text = LINE_HYPHEN.sub(r"\1\2", text)
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        sentences, start = [], 0
+        for match in SENTENCE_END.finditer(paragraph):
+            words = paragraph[start:match.start() + 1].split()
+            if words and words[-1].rstrip(".").lower() in ABBREVIATIONS:
+                continue
+            sentences.append(paragraph[start:match.end()])
+            start = match.end()
+        sentences.append(paragraph[start:])
+        sentences = [" ".join(sentence.split()) for sentence in sentences]
+        sentences = [sentence for sentence in sentences if sentence]
+        for i, sentence in enumerate(sentences):
+            yield sentence, i == len(sentences) - 1
+
+
+class TokenChunker:
+    """
+    Single-pass, sentence-aware chunker with a token budget.
+
+    Sentences are packed greedily into chunks of at most max_tokens tokens. A chunk is
+    closed early at a paragraph end once it is half full, the last overlap_tokens worth
+    of sentences are repeated at the start of the next chunk (overlap_tokens must be below
+    half of max_tokens, and no chunk holds only repeated sentences), and a final chunk below
+    min_tokens is merged into the previous one when it fits. Pages are fed one at a time
+    and chunks carry the (first page, last page) span of their sentences and their token
+    count (the sum over their sentences), so later stages need not tokenize them again.
+    """
+
+    def __init__(self, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                 min_tokens: int = CHUNK_MIN_TOKENS):
+        # The overlap must stay below the early-close threshold, or a chunk could close on carried sentences alone
+        if not 0 <= overlap_tokens < max_tokens // 2 or min_tokens > max_tokens:
+            raise ValueError("Chunk sizes must satisfy 0 <= overlap_tokens < max_tokens // 2 and "
+                             "min_tokens <= max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_tokens = min_tokens
+        self._sentences = []  # (sentence, tokens, page) of the open chunk
+        self._tokens = 0
+        self._n_overlap = 0  # Leading sentences of the open chunk repeated from the previous one
+        self._pending = None  # Last closed chunk, held back so a small final chunk can be merged
+
+    def feed(self, page_num: int, page_text: str):
+        """
+        Add a page of text. Yields (text, first page, last page, tokens) for every chunk it completes.
+        """
+        for sentence, ends_paragraph in split_sentences(page_text):
+            n_tokens = count_tokens(sentence)
+            pieces = [sentence] if n_tokens <= self.max_tokens else split_tokens(sentence, self.max_tokens)
+            for piece in pieces:
+                n_tokens = n_tokens if len(pieces) == 1 else count_tokens(piece)
+                if self._tokens + n_tokens > self.max_tokens and len(self._sentences) > self._n_overlap:
+                    yield from self._close()
+                if self._tokens + n_tokens > self.max_tokens:  # The overlap alone does not leave room
+                    self._sentences, self._tokens, self._n_overlap = [], 0, 0
+                self._sentences.append((piece, n_tokens, page_num))
+                self._tokens += n_tokens
+            if ends_paragraph and self._tokens >= max(self.min_tokens, self.max_tokens // 2) and \
+                    len(self._sentences) > self._n_overlap:
+                yield from self._close()
+
+    def finish(self):
+        """
+        Yields the remaining chunks once all pages have been fed.
+        """
+        if len(self._sentences) > self._n_overlap:
+            new_tokens = sum(n_tokens for _, n_tokens, _ in self._sentences[self._n_overlap:])
+            if self._pending and new_tokens < self.min_tokens and \
+                    self._pending[3] + new_tokens <= self.max_tokens:
+                text, first_page, _, n_tokens = self._pending
+                extra = self._sentences[self._n_overlap:]
+                self._pending = (" ".join([text] + [sentence for sentence, _, _ in extra]), first_page,
+                                 extra[-1][2], n_tokens + new_tokens)
+            else:
+                yield from self._close()
+        if self._pending:
+            yield self._pending
+        self._sentences, self._tokens, self._n_overlap, self._pending = [], 0, 0, None
+
+    def _close(self):
+        if self._pending:
+            yield self._pending
+        sentences = self._sentences
+        self._pending = (" ".join(sentence for sentence, _, _ in sentences), sentences[0][2], sentences[-1][2],
+                         self._tokens)
+        # Carry the trailing sentences that fit in the overlap budget into the next chunk
+        overlap, overlap_tokens = [], 0
+        for sentence in reversed(sentences):
+            if overlap_tokens + sentence[1] > self.overlap_tokens:
+                break
+            overlap.insert(0, sentence)
+            overlap_tokens += sentence[1]
+        self._sentences, self._tokens, self._n_overlap = overlap, overlap_tokens, len(overlap)
+
+
+def chunk_pages(pages: Iterable[Tuple[int, str]], max_tokens: int = CHUNK_MAX_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS, min_tokens: int = CHUNK_MIN_TOKENS):
+    """
+    Yields (text, first page, last page, tokens) chunks of a document given as (page number, text) pairs.
+    """
+    chunker = TokenChunker(max_tokens, overlap_tokens, min_tokens)
+    for page_num, page_text in pages:
+        yield from chunker.feed(page_num, page_text)
+    yield from chunker.finish()
+
+
+# Example usage: chunk-size distribution on the demo readings, against the previous
+# sentence and paragraph chunking (split on ". " / blank lines, one embedding input per chunk)
+if __name__ == "__main__":
+    import os
+    import sys
+    import glob
+    import time
+    import numpy as np
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from fundations.pdfExtractor import extract_pages
+
+    reading_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "demo_reading")
+    documents = [extract_pages(path) for path in sorted(glob.glob(os.path.join(reading_dir, "*.pdf")))]
+    if not _get_encoding():
+        print("tiktoken encoding unavailable, token counts are estimated from characters")
+
+    def report(name, chunks, elapsed):
+        sizes = np.array([count_tokens(chunk) for chunk in chunks])
+        p10, p50, p90 = np.percentile(sizes, [10, 50, 90])
+        print(f"{name:<10} {len(chunks):5d} chunks ({(sizes < 20).sum():4d} under 20 tokens), "
+              f"tokens min/p10/median/p90/max = {sizes.min()}/{p10:.0f}/{p50:.0f}/{p90:.0f}/{sizes.max()}, "
+              f"{sizes.sum()} tokens embedded, {elapsed * 1000:.0f} ms")
+        return len(chunks)
+
+    counts = {}
+    for name, separator in (("sentence", ". "), ("paragraph", "\n\n")):
+        start = time.perf_counter()
+        chunks = [chunk for pages in documents for page in pages for chunk in page.split(separator)]
+        counts[name] = report(name, chunks, time.perf_counter() - start)
+    start = time.perf_counter()
+    token_chunks = [text for pages in documents for text, _, _, _ in chunk_pages(enumerate(pages, 1))]
+    after = report("token", token_chunks, time.perf_counter() - start)
+    for name, before in counts.items():
+        print(f"Embedding inputs vs {name} chunking: {before} -> {after} ({after / before - 1:+.0%})")
@@ -0,0 +1,231 @@
+import os
+import asyncio
+import threading
+import httpx
+import openai
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Connection pool and timeouts of the shared clients, overridable from the environment
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60))  # Seconds an idle connection is kept
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 600))  # Read, write and pool timeouts
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 5))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class PerLoop:
+    """
+    A value per running event loop, created by factory() on first use in that loop.
+
+    Values are keyed by id(loop) rather than held in a WeakKeyDictionary: clients and
+    semaphores reference their loop, so a weak key would never be released. An entry is
+    dropped when its loop shuts down its async generators, as asyncio.run() does before
+    closing the loop; `close`, if given, is awaited on the value then, while the loop still
+    runs. Entries of loops closed without that step are dropped on a later lookup.
+    """
+
+    def __init__(self, factory, close=None):
+        self.factory = factory
+        self.close = close
+        self._lock = threading.Lock()
+        self._values = {}  # id(loop) -> (loop, value, watcher)
+
+    def get(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._values.get(id(loop))
+            if entry is not None and entry[0] is loop:
+                return entry[1]
+            for loop_id, (other, _, _) in list(self._values.items()):
+                if other.is_closed():
+                    del self._values[loop_id]
+            value = self.factory()
+            # Started here and kept alive by the entry, so the loop's shutdown_asyncgens() finalizes it
+            watcher = self._watch(loop, value)
+            try:
+                watcher.asend(None).send(None)
+            except StopIteration:
+                pass
+            self._values[id(loop)] = (loop, value, watcher)
+        return value
+
+    async def _watch(self, loop, value):
+        try:
+            yield
+        finally:
+            with self._lock:
+                entry = self._values.get(id(loop))
+                if entry is not None and entry[1] is value:
+                    del self._values[id(loop)]
+            if self.close is not None:
+                await self.close(value)
+
+    def __len__(self):
+        return len(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values = {}
+
+
+class ClientRegistry:
+    """
+    Process-wide OpenAI clients, one per (api key, base URL).
+
+    Every client owns an httpx connection pool that keeps up to max_keepalive_connections
+    idle connections open for keepalive_expiry seconds, so callers that share a client
+    reuse warm TCP/TLS connections instead of opening new ones per request. Synchronous
+    clients are thread-safe and shared by all threads. Async connections are tied to the
+    event loop that opened them, so async clients are shared per running loop (see PerLoop)
+    and closed when that loop shuts down.
+    """
+
+    def __init__(self, max_connections: int = OPENAI_MAX_CONNECTIONS,
+                 max_keepalive_connections: int = OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                 keepalive_expiry: float = OPENAI_KEEPALIVE_EXPIRY, timeout: float = OPENAI_TIMEOUT,
+                 connect_timeout: float = OPENAI_CONNECT_TIMEOUT, max_retries: int = OPENAI_MAX_RETRIES):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self._lock = threading.Lock()
+        self._clients = {}  # (api key, base URL) -> OpenAI
+        self._async_clients = PerLoop(dict, self._close_async_clients)  # {(api key, base URL): AsyncOpenAI}
+        self._unbound_async_clients = {}  # Async clients requested outside of a running loop
+        self.stats = {"created": 0, "reused": 0}
+
+    @staticmethod
+    def _key(api_key: str = None, base_url: str = None) -> tuple:
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        base_url = str(base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        return api_key, base_url
+
+    def _lookup(self, clients: dict, key: tuple, create):
+        # Called with the lock held
+        client = clients.get(key)
+        if client is None:
+            client = clients[key] = create()
+            self.stats["created"] += 1
+        else:
+            self.stats["reused"] += 1
+        return client
+
+    def get(self, api_key: str = None, base_url: str = None) -> openai.OpenAI:
+        """
+        Shared OpenAI client for the key and base URL (default: OPENAI_API_KEY, OPENAI_BASE_URL).
+        """
+        key = self._key(api_key, base_url)
+        with self._lock:
+            return self._lookup(self._clients, key, lambda: openai.OpenAI(
+                api_key=key[0], base_url=key[1], timeout=self.timeout, max_retries=self.max_retries,
+                http_client=openai.DefaultHttpxClient(limits=self.limits, timeout=self.timeout)))
+
+    def get_async(self, api_key: str = None, base_url: str = None) -> openai.AsyncOpenAI:
+        """
+        Shared AsyncOpenAI client for the key and base URL, for use on the running event loop.
+        """
+        key = self._key(api_key, base_url)
+        try:
+            clients = self._async_clients.get()
+        except RuntimeError:  # No running loop
+            clients = self._unbound_async_clients
+        with self._lock:
+            return self._lookup(clients, key, lambda: openai.AsyncOpenAI(
+                api_key=key[0], base_url=key[1], timeout=self.timeout, max_retries=self.max_retries,
+                http_client=openai.DefaultAsyncHttpxClient(limits=self.limits, timeout=self.timeout)))
+
+    @staticmethod
+    async def _close_async_clients(clients: dict):
+        for client in list(clients.values()):
+            await client.close()
+
+    def close(self):
+        """
+        Close the synchronous clients' connections and forget all clients.
+        """
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients = {}
+            self._async_clients.clear()
+            self._unbound_async_clients = {}
+
+
+registry = ClientRegistry()
+
+
+def get_client(api_key: str = None, base_url: str = None) -> openai.OpenAI:
+    return registry.get(api_key, base_url)
+
+
+def get_async_client(api_key: str = None, base_url: str = None) -> openai.AsyncOpenAI:
+    return registry.get_async(api_key, base_url)
+
+
+# Example usage: chat completions against a local keep-alive stub of the endpoint, building
+# a client per call (as LLMResponse.llm_output did) vs the shared client, from 1 and 8 threads
+if __name__ == "__main__":
+    import json
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    connections = set()
+    connections_lock = threading.Lock()
+
+    class StubChat(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep connections alive between requests
+        disable_nagle_algorithm = True  # Headers and body go out without waiting for a delayed ACK
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with connections_lock:
+                connections.add(self.client_address)
+            payload = json.dumps({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "ok"}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubChat)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    messages = [{"role": "system", "content": "You are terse."}, {"role": "user", "content": "Say ok."}]
+    n_calls = 200
+
+    def per_call_client(_):
+        client = openai.OpenAI(api_key="stub", base_url=base_url)
+        client.chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    def shared_client(_):
+        get_client("stub", base_url).chat.completions.create(model="gpt-4o-mini", messages=messages)
+
+    for n_threads in (1, 8):
+        for name, call in (("client per call", per_call_client), ("shared client", shared_client)):
+            connections.clear()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(n_threads) as pool:
+                list(pool.map(call, range(n_calls)))
+            elapsed = time.perf_counter() - start
+            print(f"{n_threads} thread(s), {name:<15}: {elapsed * 1000 / n_calls:6.2f} ms/call, "
+                  f"{n_calls / elapsed:6.0f} calls/s, {len(connections)} connections opened")
+    print(f"registry: {registry.stats['created']} client(s) created, {registry.stats['reused']} reuses")
+    registry.close()
+    server.shutdown()
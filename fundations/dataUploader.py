@@ -2,6 +2,13 @@ import requests
 from bs4 import BeautifulSoup
 import PyPDF2
 import fitz  # PyMuPDF
+import os
+import sys
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.pdfExtractor import extract_pdfs
 
 class DataUploader:
     def __init__(self):
@@ -89,6 +96,25 @@ class DataUploader:
             print(f"An error occurred while extracting the PDF: {e}")
             return None
 
+    def upload_from_pdfs(self, pdf_paths, max_workers=None, progress=None):
+        """
+        Extracts text from many PDFs in parallel on a process pool using PyMuPDF.
+        Args:
+            pdf_paths (list): Paths to the PDF files.
+            max_workers (int): Number of worker processes (defaults to the CPU count).
+            progress (callable): Called as progress(done, total, pdf_path) as files finish.
+        Returns:
+            list: Extracted text per PDF in input order, None for PDFs that failed.
+        """
+        texts = []
+        for result in extract_pdfs(pdf_paths, max_workers=max_workers, engine="pymupdf", progress=progress):
+            if result["error"]:
+                print(f"An error occurred while extracting {result['path']}: {result['error']}")
+                texts.append(None)
+            else:
+                texts.append("".join(result["pages"]))
+        return texts
+
     def get_html_content(self):
         """
         Returns the stored HTML content.
@@ -0,0 +1,182 @@
+import re
+import zlib
+import hashlib
+import numpy as np
+from collections import defaultdict
+from typing import Callable, Optional
+
+# Standalone short numbers, such as page numbers in running headers and footers
+_PAGE_NUMBERS = re.compile(r"(?<!\S)\d{1,4}(?!\S)")
+
+
+class ChunkDeduplicator:
+    """
+    Exact and near-duplicate detection for chunk texts.
+
+    Texts are normalized (case, whitespace) and hashed for exact matches, so chunks that differ
+    in any number are never exact duplicates. Near duplicates are found with MinHash signatures
+    over word shingles, in which standalone page-number-like tokens are masked so that a page's
+    header or footer does not tell repeated boilerplate apart. Signatures are bucketed by LSH
+    bands; a bucket hit counts only if the signatures agree on at least `threshold` of their
+    positions (estimated Jaccard similarity). Entries are keyed by the store row of the
+    representative chunk.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 5,
+                 seed: int = 0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        # One 64-bit salt per permutation, mixed into the shingle hashes with splitmix64
+        self._salts = np.random.default_rng(seed).integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.exact = {}  # Digest of the normalized text -> key
+        self.signatures = {}  # key -> MinHash signature
+        self.buckets = defaultdict(list)  # (band, band values) -> keys
+
+    def __len__(self):
+        return len(self.signatures)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    def signature(self, normalized: str) -> np.ndarray:
+        words = _PAGE_NUMBERS.sub("0", normalized).split()
+        shingles = {" ".join(words[i:i + self.shingle_size])
+                    for i in range(max(len(words) - self.shingle_size + 1, 1))}
+        hashes = np.array([zlib.crc32(shingle.encode("utf-8")) for shingle in shingles], dtype=np.uint64)
+        x = self._salts[:, None] ^ hashes[None, :]
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+        return x.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray):
+        rows = self.num_perm // self.bands
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def match(self, text: str, accept: Optional[Callable[[int], bool]] = None):
+        """
+        Key of an accepted duplicate of `text`, or None.
+        Returns (key, "exact" or "near", digest, signature); the last two can be passed to add().
+        """
+        normalized = self.normalize(text)
+        digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+        key = self.exact.get(digest)
+        if key is not None and (accept is None or accept(key)):
+            return key, "exact", digest, None
+        signature = self.signature(normalized)
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self.buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if (accept is None or accept(key)) and \
+                        np.mean(self.signatures[key] == signature) >= self.threshold:
+                    return key, "near", digest, signature
+        return None, None, digest, signature
+
+    def add(self, key: int, text: str = None, digest: bytes = None, signature: np.ndarray = None):
+        """
+        Register a representative chunk under `key`.
+        """
+        if digest is None or signature is None:
+            normalized = self.normalize(text)
+            digest = hashlib.sha1(normalized.encode("utf-8")).digest()
+            signature = self.signature(normalized)
+        self.exact[digest] = key
+        self._index(key, signature)
+
+    def _index(self, key: int, signature: np.ndarray):
+        self.signatures[key] = signature
+        for band_key in self._band_keys(signature):
+            self.buckets[band_key].append(key)
+
+    def remap(self, keep: np.ndarray):
+        """
+        Rewrite keys after the store was compacted (new row i was old row keep[i]).
+        Entries of dropped rows are removed.
+        """
+        new_ids = {int(old): new for new, old in enumerate(keep)}
+        signatures = self.signatures
+        self.exact = {digest: new_ids[key] for digest, key in self.exact.items() if key in new_ids}
+        self.signatures, self.buckets = {}, defaultdict(list)
+        for key, signature in signatures.items():
+            if key in new_ids:
+                self._index(new_ids[key], signature)
+
+    def truncate(self, n_rows: int):
+        """
+        Drop entries keyed at or past n_rows, e.g. rows reserved by an ingestion that never added them.
+        """
+        self.remap(np.arange(n_rows))
+
+    def save(self, path: str):
+        keys = np.array(list(self.signatures), dtype=np.int64)
+        signatures = np.array([self.signatures[key] for key in keys], dtype=np.uint64).reshape(-1, self.num_perm)
+        exact_keys = np.array(list(self.exact.values()), dtype=np.int64)
+        digests = np.array(list(self.exact), dtype="S20")
+        with open(path, "wb") as f:
+            np.savez(f, keys=keys, signatures=signatures, exact_keys=exact_keys, digests=digests,
+                     params=np.array([self.num_perm, self.bands, self.shingle_size, self.seed]),
+                     threshold=self.threshold)
+
+    @classmethod
+    def load(cls, path: str) -> "ChunkDeduplicator":
+        data = np.load(path)
+        num_perm, bands, shingle_size, seed = (int(value) for value in data["params"])
+        deduplicator = cls(float(data["threshold"]), num_perm, bands, shingle_size, seed)
+        for key, signature in zip(data["keys"], data["signatures"]):
+            deduplicator._index(int(key), signature)
+        deduplicator.exact = {bytes(digest): int(key) for digest, key in zip(data["digests"], data["exact_keys"])}
+        return deduplicator
+
+
+# Example usage: duplicate chunks found in the demo readings for each chunking mode
+if __name__ == "__main__":
+    import os
+    import sys
+    import glob
+    import time
+
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from fundations.pdfExtractor import extract_pages
+    from fundations.chunker import chunk_pages, count_tokens
+
+    reading_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "demo_reading")
+    paths = sorted(glob.glob(os.path.join(reading_dir, "*.pdf")))
+    documents = [(os.path.basename(path), extract_pages(path)) for path in paths]
+
+    splitters = {
+        "sentence": lambda pages: [(chunk, n) for n, page in enumerate(pages, 1) for chunk in page.split(". ")],
+        "paragraph": lambda pages: [(chunk, n) for n, page in enumerate(pages, 1) for chunk in page.split("\n\n")],
+        "token": lambda pages: [(chunk, first) for chunk, first, _, _ in chunk_pages(enumerate(pages, 1))],
+    }
+    for mode, split in splitters.items():
+        deduplicator = ChunkDeduplicator()
+        counts = {"exact": 0, "near": 0}
+        n_chunks, tokens_saved = 0, 0
+        start = time.perf_counter()
+        for source, pages in documents:
+            for chunk, page in split(pages):
+                if not chunk.strip():
+                    continue
+                key, kind, digest, signature = deduplicator.match(chunk)
+                if key is None:
+                    deduplicator.add(n_chunks, digest=digest, signature=signature)
+                else:
+                    counts[kind] += 1
+                    tokens_saved += count_tokens(chunk)
+                n_chunks += 1
+        elapsed = time.perf_counter() - start
+        saved = counts["exact"] + counts["near"]
+        print(f"{mode:<10} {n_chunks:5d} chunks: {counts['exact']} exact + {counts['near']} near duplicates, "
+              f"{saved} embedding inputs and index rows saved ({saved / n_chunks:.1%}), "
+              f"{tokens_saved} tokens, {elapsed * 1000:.0f} ms")
@@ -0,0 +1,241 @@
+import os
+import re
+import sys
+import zlib
+import numpy as np
+from typing import List
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.chunker import count_tokens
+from fundations.embeddingService import EmbeddingService
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Limits of the embeddings endpoint, used to size batched requests
+EMBEDDING_MAX_INPUT_TOKENS = 8191  # Per input text
+EMBEDDING_MAX_REQUEST_TOKENS = 300000  # Summed over all inputs of one request
+EMBEDDING_MAX_BATCH_SIZE = 2048  # Number of inputs per request
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def batch_texts(texts: List[str], max_request_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+                max_batch_size: int = EMBEDDING_MAX_BATCH_SIZE, n_tokens: List[int] = None):
+    """
+    Group texts into batches that fit the embeddings endpoint limits, counting their tokens
+    unless n_tokens gives them. Yields lists of indices into `texts`, in order.
+    """
+    batch, batch_tokens = [], 0
+    for i, text in enumerate(texts):
+        text_tokens = count_tokens(text) if n_tokens is None else n_tokens[i]
+        if text_tokens > EMBEDDING_MAX_INPUT_TOKENS:
+            raise ValueError(f"Text {i} has {text_tokens} tokens, above the {EMBEDDING_MAX_INPUT_TOKENS} token "
+                             f"input limit")
+        if batch and (batch_tokens + text_tokens > max_request_tokens or len(batch) >= max_batch_size):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += text_tokens
+    if batch:
+        yield batch
+
+
+class EmbeddingBackend:
+    """
+    Interface of the embedding backends used by Retriever.
+
+    embed() returns one vector per text, in order; n_tokens, the texts' token counts when the
+    caller already knows them, spares backends that need them a recount. model_key() names the vectors a backend
+    produces, for the embedding cache. Backends that can shorten their vectors themselves
+    set supports_dimensions; max_concurrency is how many embed() calls may usefully run at once.
+    Backends whose vectors depend on corpus statistics report fitted=False until fit() has
+    run on the corpus, which Retriever does once, before the first chunk is embedded.
+    """
+
+    supports_dimensions = False
+    max_concurrency = 1
+    fitted = True
+
+    def fit(self, texts: List[str]):
+        return self
+
+    def model_key(self, dimensions: int = None) -> str:
+        raise NotImplementedError
+
+    def embed(self, texts: List[str], dimensions: int = None, n_tokens: List[int] = None) -> list:
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """
+    The OpenAI embeddings endpoint, called through an EmbeddingService (concurrent requests,
+    rate limits and retries). Without a client, an AsyncOpenAI client is created on first use
+    from OPENAI_API_KEY.
+    """
+
+    supports_dimensions = True
+
+    def __init__(self, client=None, model: str = EMBEDDING_MODEL, service: EmbeddingService = None):
+        self.model = model
+        self.service = service or (EmbeddingService(client) if client is not None else None)
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.service.max_concurrency if self.service is not None else 1
+
+    def _service(self) -> EmbeddingService:
+        if self.service is None:
+            import openai
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment variables")
+            # Requests are retried by EmbeddingService, which honours the rate limits
+            self.service = EmbeddingService(openai.AsyncOpenAI(api_key=api_key, max_retries=0))
+        return self.service
+
+    def model_key(self, dimensions: int = None) -> str:
+        return self.model if dimensions is None else f"{self.model}:{dimensions}"
+
+    def embed(self, texts: List[str], dimensions: int = None, n_tokens: List[int] = None) -> list:
+        """
+        Embed texts using token-bounded batch requests, sent concurrently.
+        """
+        if n_tokens is None:
+            n_tokens = [count_tokens(text) for text in texts]
+        batches = list(batch_texts(texts, n_tokens=n_tokens))
+        results = self._service().embed_batches_sync([[texts[i] for i in batch] for batch in batches], self.model,
+                                                     dimensions, [sum(n_tokens[i] for i in batch) for batch in batches])
+        embeddings = [None] * len(texts)
+        for batch, batch_embeddings in zip(batches, results):
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        return embeddings
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Local, deterministic TF-IDF embeddings with no network calls.
+
+    Word n-grams are hashed (crc32) into n_features feature ids, weighted by sublinear term
+    frequency times IDF, and projected to `dimensions` with a fixed signed hashing projection:
+    feature f adds sign[f] * weight to component bucket[f]. The IDF weights are fitted on
+    the corpus when the index is built (see Retriever.fit_embedding_backend) and saved with
+    it; fitting changes model_key() and every vector, so it must happen before anything is
+    embedded. Without fit() every IDF is 1.
+    """
+
+    def __init__(self, dimensions: int = 384, n_features: int = 1 << 20, ngram_range: tuple = (1, 2),
+                 seed: int = 0):
+        self.dimensions = dimensions
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self._buckets = rng.integers(0, dimensions, size=n_features, dtype=np.int64)
+        self._signs = rng.choice(np.array([-1.0, 1.0], dtype=np.float32), size=n_features)
+        self.idf = None  # float32 per feature, once fitted
+
+    @property
+    def fitted(self) -> bool:
+        return self.idf is not None
+
+    def model_key(self, dimensions: int = None) -> str:
+        fitted = f":idf{zlib.crc32(self.idf.tobytes()):08x}" if self.idf is not None else ""
+        low, high = self.ngram_range
+        return f"hashing-tfidf:{self.dimensions}:{self.n_features}:{low}-{high}:{self.seed}{fitted}"
+
+    def _features(self, texts: List[str]):
+        """
+        Feature ids of all n-grams and the index of the text each came from.
+        """
+        low, high = self.ngram_range
+        features, owners = [], []
+        for i, text in enumerate(texts):
+            tokens = TOKEN_PATTERN.findall(text.lower())
+            grams = [" ".join(tokens[start:start + n]) for n in range(low, high + 1)
+                     for start in range(len(tokens) - n + 1)]
+            features.extend(zlib.crc32(gram.encode("utf-8"), self.seed) for gram in grams)
+            owners.extend([i] * len(grams))
+        return (np.array(features, dtype=np.int64) % self.n_features), np.array(owners, dtype=np.int64)
+
+    def fit(self, texts: List[str]):
+        """
+        Fit smoothed IDF weights, log((1 + n) / (1 + df)) + 1, on a corpus.
+        """
+        features, owners = self._features(texts)
+        pairs = np.unique(owners * self.n_features + features)
+        doc_freqs = np.bincount(pairs % self.n_features, minlength=self.n_features)
+        self.idf = (np.log((1 + len(texts)) / (1 + doc_freqs)) + 1).astype(np.float32)
+        return self
+
+    def embed(self, texts: List[str], dimensions: int = None, n_tokens: List[int] = None) -> np.ndarray:
+        features, owners = self._features(texts)
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        if len(features):
+            keys, counts = np.unique(owners * self.n_features + features, return_counts=True)
+            owners, features = np.divmod(keys, self.n_features)
+            weights = (1 + np.log(counts)).astype(np.float32) * self._signs[features]
+            if self.idf is not None:
+                weights *= self.idf[features]
+            embeddings += np.bincount(owners * self.dimensions + self._buckets[features], weights=weights,
+                                      minlength=len(texts) * self.dimensions).reshape(len(texts), self.dimensions)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, params=np.array([self.dimensions, self.n_features, *self.ngram_range, self.seed]),
+                     idf=self.idf if self.idf is not None else np.zeros(0, dtype=np.float32))
+
+    @classmethod
+    def load(cls, path: str) -> "HashingEmbeddingBackend":
+        data = np.load(path)
+        dimensions, n_features, low, high, seed = (int(value) for value in data["params"])
+        backend = cls(dimensions, n_features, (low, high), seed)
+        backend.idf = data["idf"] if len(data["idf"]) else None
+        return backend
+
+
+# Backends selectable by name, e.g. through the EMBEDDING_BACKEND environment variable
+EMBEDDING_BACKENDS = {"openai": OpenAIEmbeddingBackend, "hashing": HashingEmbeddingBackend}
+
+
+def make_embedding_backend(name: str, **kwargs) -> EmbeddingBackend:
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {name!r}, expected one of {sorted(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[name](**kwargs)
+
+
+# Example usage: offline index build and search throughput on the demo readings with the
+# local backend (no API key needed)
+if __name__ == "__main__":
+    import glob
+    import time
+    from fundations.open_ai_RAG import Citation_Retriever
+
+    reading_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "demo_reading")
+    paths = sorted(glob.glob(os.path.join(reading_dir, "*.pdf")))
+    retriever = Citation_Retriever(embedding_backend="hashing")
+    start = time.perf_counter()
+    retriever.create_embeddings_for_pdfs(paths, max_workers=1)
+    elapsed = time.perf_counter() - start
+    texts = retriever.store.texts()
+    print(f"Indexed {len(paths)} PDFs, {len(texts)} chunks in {elapsed:.2f}s")
+
+    backend = retriever.embedding_backend
+    corpus = texts * 20
+    start = time.perf_counter()
+    backend.embed(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"Embedded {len(corpus)} chunks in {elapsed:.2f}s ({len(corpus) / elapsed:.0f} chunks/s)")
+
+    queries = ["protest songs and chants", "Tishreen October protests", "queer activism archive",
+               "Hong Kong Happy Birthday", "Red Shirts Bangkok rally"] * 20
+    start = time.perf_counter()
+    hits = retriever.vector_search_many(queries, top_n=5)
+    elapsed = time.perf_counter() - start
+    print(f"Searched {len(queries)} queries in {elapsed * 1000:.0f} ms ({len(queries) / elapsed:.0f} queries/s)")
+    for query, top_texts in zip(queries[:5], hits):
+        print(f"{query!r}: {top_texts[0][2]} p.{top_texts[0][3]} ({top_texts[0][1]:.3f})")
@@ -0,0 +1,173 @@
+import os
+import json
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional
+
+# One index record: sha256 key, blob offset and dimension (0 marks an evicted key)
+INDEX_RECORD = np.dtype([("key", "u1", (32,)), ("offset", "<u8"), ("dim", "<u4")])
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed cache of embeddings, keyed by hash(model, normalized text).
+
+    Vectors are appended as raw float32 to vectors.f32 and located through an offset index,
+    index.bin, of fixed-width (key, offset, dim) records. New entries and evictions are
+    appended to the index, so a put costs O(new entries); the index is only rewritten, as
+    a snapshot of the live entries in recency order, when the blob is compacted or the
+    cache is closed. When the live vectors exceed max_bytes the least recently used entries
+    are evicted, and the blob is compacted once more than half of it is dead space.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.index_path = os.path.join(directory, "index.bin")
+        self.entries = OrderedDict()  # key -> (offset, dim), least recently used first
+        self.live_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+        legacy_index_path = os.path.join(directory, "index.json")
+        if os.path.exists(self.index_path):
+            self._load_index()
+        elif os.path.exists(legacy_index_path):  # Written before the binary index
+            with open(legacy_index_path, "r") as f:
+                for key, offset, dim in json.load(f)["entries"]:
+                    self.entries[key] = (offset, dim)
+                    self.live_bytes += dim * 4
+        self._blob = open(self.vectors_path, "a+b")
+        self._write_index()
+        if os.path.exists(legacy_index_path):
+            os.remove(legacy_index_path)
+
+    def _load_index(self):
+        # Replay the records in order; a torn record left by a crash is dropped
+        n_bytes = os.path.getsize(self.index_path)
+        records = np.fromfile(self.index_path, dtype=INDEX_RECORD, count=n_bytes // INDEX_RECORD.itemsize)
+        for key_bytes, offset, dim in zip(records["key"], records["offset"].tolist(), records["dim"].tolist()):
+            key = key_bytes.tobytes().hex()
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.live_bytes -= previous[1] * 4
+            if dim:
+                self.entries[key] = (offset, dim)
+                self.live_bytes += dim * 4
+
+    @staticmethod
+    def _records(items) -> np.ndarray:
+        keys, offsets, dims = zip(*items) if items else ((), (), ())
+        records = np.zeros(len(keys), dtype=INDEX_RECORD)
+        records["key"] = np.frombuffer(b"".join(bytes.fromhex(key) for key in keys), dtype=np.uint8).reshape(-1, 32)
+        records["offset"], records["dim"] = offsets, dims
+        return records
+
+    def _append_index(self, items):
+        # Append (key, offset, dim) records; the blob they point into is already flushed
+        if items:
+            self._index.write(self._records(items).tobytes())
+            self._index.flush()
+
+    def _write_index(self):
+        # Replace the index with a snapshot of the live entries, in recency order
+        if getattr(self, "_index", None) is not None:
+            self._index.close()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._records([(key, offset, dim) for key, (offset, dim) in self.entries.items()]).tobytes())
+        os.replace(tmp_path, self.index_path)
+        self._index = open(self.index_path, "ab")
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key: str):
+        return key in self.entries
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(self, model: str, texts: List[str]) -> list:
+        """
+        Cached embeddings for texts, with None where the cache misses.
+        """
+        results = []
+        for text in texts:
+            key = self.key(model, text)
+            if key not in self.entries:
+                self.misses += 1
+                results.append(None)
+                continue
+            self.hits += 1
+            self.entries.move_to_end(key)
+            offset, dim = self.entries[key]
+            self._blob.seek(offset)
+            results.append(np.frombuffer(self._blob.read(dim * 4), dtype=np.float32))
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: list):
+        """
+        Append embeddings for texts, evict the least recently used entries past max_bytes,
+        and append the new and evicted entries to the index.
+        """
+        self._blob.seek(0, os.SEEK_END)
+        offset = self._blob.tell()
+        changes = []  # Index records: (key, offset, dim), dim 0 for evictions
+        for text, embedding in zip(texts, embeddings):
+            key = self.key(model, text)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                continue
+            vector = np.asarray(embedding, dtype=np.float32)
+            self._blob.write(vector.tobytes())
+            self.entries[key] = (offset, len(vector))
+            changes.append((key, offset, len(vector)))
+            self.live_bytes += vector.nbytes
+            offset += vector.nbytes
+        self._blob.flush()
+
+        while self.live_bytes > self.max_bytes and self.entries:
+            key, (_, dim) = self.entries.popitem(last=False)
+            changes.append((key, 0, 0))
+            self.live_bytes -= dim * 4
+        if offset > 2 * self.live_bytes:
+            self.compact()
+        else:
+            self._append_index(changes)
+
+    def compact(self):
+        """
+        Rewrite the blob with only live entries, in recency order.
+        """
+        tmp_path = self.vectors_path + ".tmp"
+        offset = 0
+        with open(tmp_path, "wb") as out:
+            for key, (old_offset, dim) in self.entries.items():
+                self._blob.seek(old_offset)
+                out.write(self._blob.read(dim * 4))
+                self.entries[key] = (offset, dim)
+                offset += dim * 4
+        self._blob.close()
+        os.replace(tmp_path, self.vectors_path)
+        self._blob = open(self.vectors_path, "a+b")
+        self._write_index()
+
+    def flush(self):
+        """
+        Write the index as a snapshot of the live entries, keeping their current recency order.
+        """
+        self._write_index()
+
+    def close(self):
+        self._write_index()
+        self._index.close()
+        self._blob.close()
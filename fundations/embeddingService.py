@@ -0,0 +1,264 @@
+import os
+import sys
+import asyncio
+import inspect
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import List, Optional
+import httpx
+import openai
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.chunker import count_tokens
+
+# Default limits of the embeddings endpoint (per minute) and of this client
+EMBEDDING_REQUESTS_PER_MINUTE = 3000
+EMBEDDING_TOKENS_PER_MINUTE = 1000000
+EMBEDDING_MAX_CONCURRENCY = 8
+EMBEDDING_MAX_RETRIES = 6
+
+# Backoff between retries: full jitter over base * 2^attempt, capped
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+# Client errors worth retrying (timeout, conflict, rate limit); 5xx are always retried
+RETRYABLE_STATUS = {408, 409, 429}
+
+# Network errors worth retrying: the request may not have reached the server, or timed out
+RETRYABLE_ERRORS = (openai.APIConnectionError, httpx.TransportError, asyncio.TimeoutError, ConnectionError)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at per_minute / 60 units per second, holding at
+    most `capacity` units (one minute's worth by default). acquire() waits until the
+    requested amount is available; waiters are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None  # Created on the event loop that uses the bucket
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        # A request larger than the bucket would never fit; let it through once the bucket is full
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            self._refill()
+            while self.level < amount:
+                await asyncio.sleep((amount - self.level) / self.rate)
+                self._refill()
+            self.level -= amount
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds to wait requested by the server's Retry-After (or retry-after-ms) header, if any.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:  # HTTP date
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Whether a failed request is worth sending again: retryable HTTP statuses and network
+    errors. Anything else (e.g. a TypeError from bad input) would fail again, so it is not.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return isinstance(error, RETRYABLE_ERRORS)
+    return status in RETRYABLE_STATUS or status >= 500
+
+
+class EmbeddingService:
+    """
+    Asyncio client for the embeddings endpoint.
+
+    At most max_concurrency requests are in flight; token buckets keep requests and tokens
+    per minute under the account limits. Failed requests (429, 5xx, connection errors) are
+    retried with jittered exponential backoff, waiting at least as long as the server's
+    Retry-After asks; a rate-limit response also pauses the other requests for that long.
+    Other errors (see is_retryable) are raised right away.
+    The client may be an openai.AsyncOpenAI or a synchronous client, which is then called
+    from worker threads. The *_sync methods run the coroutines on a background event loop,
+    so they can be called from any thread.
+    """
+
+    def __init__(self, client, max_concurrency: int = EMBEDDING_MAX_CONCURRENCY,
+                 requests_per_minute: float = EMBEDDING_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = EMBEDDING_TOKENS_PER_MINUTE,
+                 max_retries: int = EMBEDDING_MAX_RETRIES):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "tokens": 0}
+        self._semaphore = None
+        self._paused_until = 0.0
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    async def embed_batch(self, texts: List[str], model: str, dimensions: int = None, n_tokens: int = None) -> list:
+        """
+        Embeddings of one request's worth of texts, in order. n_tokens is their total token
+        count, counted here if not given.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if n_tokens is None:
+            n_tokens = sum(count_tokens(text) for text in texts)
+        kwargs = {"input": texts, "model": model}
+        if dimensions is not None:
+            kwargs["dimensions"] = dimensions
+        create = self.client.embeddings.create
+        for attempt in range(self.max_retries + 1):
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(n_tokens)
+            async with self._semaphore:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                self.stats["requests"] += 1
+                try:
+                    if inspect.iscoroutinefunction(create):
+                        response = await create(**kwargs)
+                    else:
+                        response = await asyncio.to_thread(create, **kwargs)
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        raise
+                    error = e
+                else:
+                    self.stats["tokens"] += n_tokens
+                    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+            # Back off outside the semaphore so other requests can proceed
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            server_delay = retry_after(error)
+            if server_delay is not None:
+                delay = max(delay, server_delay)
+            if getattr(error, "status_code", None) == 429:
+                self.stats["rate_limited"] += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats["retries"] += 1
+            print(f"Embedding batch of {len(texts)} texts failed: {error}. Retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+
+    async def embed_batches(self, batches: List[List[str]], model: str, dimensions: int = None,
+                            n_tokens: List[int] = None) -> list:
+        """
+        Embeddings of several batches, requested concurrently. Returns one list per batch.
+        n_tokens gives each batch's total token count, if known.
+        """
+        n_tokens = n_tokens or [None] * len(batches)
+        return list(await asyncio.gather(*(self.embed_batch(batch, model, dimensions, batch_tokens)
+                                           for batch, batch_tokens in zip(batches, n_tokens))))
+
+    def _run(self, coroutine):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def embed_batch_sync(self, texts: List[str], model: str, dimensions: int = None, n_tokens: int = None) -> list:
+        return self._run(self.embed_batch(texts, model, dimensions, n_tokens))
+
+    def embed_batches_sync(self, batches: List[List[str]], model: str, dimensions: int = None,
+                           n_tokens: List[int] = None) -> list:
+        return self._run(self.embed_batches(batches, model, dimensions, n_tokens))
+
+
+# Example usage: embed through a local stub of the embeddings endpoint that adds latency
+# and answers every 7th request with 429 + Retry-After, serially and with the service
+if __name__ == "__main__":
+    import json
+    import hashlib
+    import openai
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    latency, dim = 0.1, 64
+    counter = {"requests": 0}
+    counter_lock = threading.Lock()
+
+    class StubEmbeddings(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with counter_lock:
+                counter["requests"] += 1
+                limited = counter["requests"] % 7 == 0
+            time.sleep(latency)
+            if limited:
+                payload = json.dumps({"error": {"message": "Rate limit reached", "type": "requests"}}).encode()
+                self.send_response(429)
+                self.send_header("Retry-After", "0.2")
+            else:
+                data = [{"object": "embedding", "index": i,
+                         "embedding": [b / 255 for b in hashlib.sha256(text.encode()).digest()] * (dim // 32)}
+                        for i, text in enumerate(body["input"])]
+                payload = json.dumps({"object": "list", "data": data, "model": body["model"],
+                                      "usage": {"prompt_tokens": 0, "total_tokens": 0}}).encode()
+                self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubEmbeddings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    batches = [[f"chunk {b}-{i}" for i in range(16)] for b in range(40)]
+
+    sync_client = openai.OpenAI(api_key="stub", base_url=base_url, max_retries=0)
+    start = time.perf_counter()
+    for batch in batches:
+        for attempt in range(3):
+            try:
+                sync_client.embeddings.create(input=batch, model="text-embedding-3-small")
+                break
+            except openai.RateLimitError:
+                time.sleep(2 ** attempt)
+    print(f"serial:  {len(batches)} batches in {time.perf_counter() - start:.2f}s")
+
+    for concurrency in (4, 16):
+        service = EmbeddingService(openai.AsyncOpenAI(api_key="stub", base_url=base_url, max_retries=0),
+                                   max_concurrency=concurrency, requests_per_minute=6000)
+        start = time.perf_counter()
+        results = service.embed_batches_sync(batches, "text-embedding-3-small")
+        assert [len(result) for result in results] == [len(batch) for batch in batches]
+        print(f"service: {len(batches)} batches in {time.perf_counter() - start:.2f}s with {concurrency} in flight, "
+              f"{service.stats['requests']} requests, {service.stats['rate_limited']} rate limited")
+    server.shutdown()
@@ -1,5 +1,21 @@
 # Import necessary modules (assuming OpenAI or other APIs might be used)
-from openai import OpenAI
+import os
+import time
+import asyncio
+from fundations.clientRegistry import PerLoop, get_client, get_async_client
+
+# Async model calls in flight at once on an event loop, across all agents
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 100))
+
+_semaphores = PerLoop(lambda: asyncio.Semaphore(LLM_MAX_CONCURRENCY))
+
+
+def llm_semaphore() -> asyncio.Semaphore:
+    """
+    Semaphore shared by all async model calls on the running event loop, see LLM_MAX_CONCURRENCY.
+    """
+    return _semaphores.get()
+
 
 class LLMResponse:
     def __init__(self, model_name):
@@ -7,23 +23,98 @@ class LLMResponse:
         Initialize the LLMResponse with the given model name.
         """
         self.model_name = model_name #Eg "gpt-4o-2024-08-06"
-        self.client = OpenAI()
-        # Ensure your API key is set in the environment
+        # Shared client with a warm connection pool; ensure your API key is set in the environment
+        self.api_key = None  # OPENAI_API_KEY
+        self.client = get_client()
 
-    def llm_output(self, user_prompt, system_prompt):
-        client = OpenAI()
-        completion = client.chat.completions.create(
+    @property
+    def async_client(self):
+        """
+        Shared AsyncOpenAI client for the running event loop.
+        """
+        return get_async_client(self.api_key)
+
+    @staticmethod
+    def _with_retries(client, max_retries=None):
+        # The client retries failed requests itself unless told otherwise
+        return client if max_retries is None else client.with_options(max_retries=max_retries)
+
+    @staticmethod
+    def _messages(user_prompt, system_prompt):
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def llm_output(self, user_prompt, system_prompt, max_retries=None, **params):
+        """
+        Free-text completion; params (e.g. temperature) are passed to the chat completions endpoint.
+        max_retries overrides the client's own retries of failed requests.
+        """
+        completion = self._with_retries(self.client, max_retries).chat.completions.create(
             model=self.model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {
-                    "role": "user",
-                    "content": user_prompt
-                }
-            ]
+            messages=self._messages(user_prompt, system_prompt),
+            **params
         )
         return completion.choices[0].message
 
+    async def llm_output_async(self, user_prompt, system_prompt, max_retries=None, **params):
+        """
+        Async variant of llm_output, limited by the shared llm_semaphore.
+        """
+        async with llm_semaphore():
+            completion = await self._with_retries(self.async_client, max_retries).chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(user_prompt, system_prompt),
+                **params
+            )
+        return completion.choices[0].message
+
+    def llm_output_stream(self, user_prompt, system_prompt, on_first_token=None, max_retries=None, **params):
+        """
+        Free-text completion streamed as text deltas, as they arrive. on_first_token, if given,
+        is called with the seconds from the request to the first delta (time to first token).
+        """
+        start = time.perf_counter()
+        stream = self._with_retries(self.client, max_retries).chat.completions.create(
+            model=self.model_name,
+            messages=self._messages(user_prompt, system_prompt),
+            stream=True,
+            **params
+        )
+        with stream:
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if on_first_token is not None:
+                    on_first_token(time.perf_counter() - start)
+                    on_first_token = None
+                yield delta
+
+    async def llm_output_stream_async(self, user_prompt, system_prompt, on_first_token=None, max_retries=None,
+                                      **params):
+        """
+        Async variant of llm_output_stream. The call holds a slot of llm_semaphore until the stream ends.
+        """
+        start = time.perf_counter()
+        async with llm_semaphore():
+            stream = await self._with_retries(self.async_client, max_retries).chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(user_prompt, system_prompt),
+                stream=True,
+                **params
+            )
+            async with stream:
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if on_first_token is not None:
+                        on_first_token(time.perf_counter() - start)
+                        on_first_token = None
+                    yield delta
+
     def structure_output(self, schema, user_prompt, system_prompt):
         """
         Structure the output according to the provided schema, user prompt, and system prompt.
@@ -0,0 +1,370 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+import contextvars
+import numpy as np
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import Optional
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.embeddingService import is_retryable, retry_after
+
+# Latencies kept per name for the percentiles
+LATENCY_WINDOW = 1000
+
+# Threads running the requests of hedged synchronous calls
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", 32))
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """
+    Absolute point in time (monotonic clock) by which a call must have finished.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def __repr__(self):
+        return f"Deadline({self.remaining():.2f}s left of {self.seconds:.2f}s)"
+
+
+_current_deadline = contextvars.ContextVar("llm_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def resolve_deadline(deadline=None) -> Optional[Deadline]:
+    """
+    Deadline of a call: `deadline` (a Deadline or seconds from now) if given, else the current one.
+    A deadline inside an enclosing one never outlives it.
+    """
+    outer = current_deadline()
+    if deadline is None:
+        return outer
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    if outer is not None and outer.expires < deadline.expires:
+        return outer
+    return deadline
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Run a block (or, used as a decorator, each call of a function) under a deadline that
+    model calls inside it pick up, e.g. one pipeline stage. The clock starts on entry.
+    """
+    token = _current_deadline.set(resolve_deadline(seconds))
+    try:
+        yield _current_deadline.get()
+    finally:
+        _current_deadline.reset(token)
+
+
+class LatencyTracker:
+    """
+    Latencies of successful requests and hedging counters, per name (e.g. agent class), over
+    the last `window` requests.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._latencies = defaultdict(lambda: deque(maxlen=self.window))
+        self.counters = defaultdict(lambda: defaultdict(int))  # name -> counter -> value
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self._latencies[name].append(seconds)
+
+    def count(self, name: str, counter: str, n: int = 1):
+        with self._lock:
+            self.counters[name][counter] += n
+
+    def samples(self, name: str) -> int:
+        with self._lock:
+            return len(self._latencies.get(name, ()))
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        with self._lock:
+            latencies = list(self._latencies.get(name, ()))
+        return float(np.percentile(latencies, q)) if latencies else None
+
+    def summary(self) -> dict:
+        """
+        {name: {"count", "p50", "p95", "p99", and the counters}}, latencies in seconds.
+        """
+        with self._lock:
+            names = list(self._latencies)
+        stats = {}
+        for name in names:
+            p50, p95, p99 = (self.percentile(name, q) for q in (50, 95, 99))
+            stats[name] = {"count": self.samples(name), "p50": p50, "p95": p95, "p99": p99,
+                           **self.counters.get(name, {})}
+        return stats
+
+
+latency_tracker = LatencyTracker()
+
+
+class HedgePolicy:
+    """
+    How a call is hedged and retried.
+
+    Once a request has been in flight for the `percentile` latency of its name (or
+    initial_delay until min_samples latencies are known, and never less than min_delay),
+    a duplicate is sent; the first response wins. Up to max_hedges duplicates are sent,
+    one per further delay. Failed attempts are retried up to max_attempts times with
+    jittered exponential backoff, as long as the backoff fits in the remaining deadline.
+    max_hedges=0 only retries.
+    """
+
+    def __init__(self, percentile: float = 95, max_hedges: int = 1, initial_delay: float = 15.0,
+                 min_delay: float = 0.5, min_samples: int = 20, max_attempts: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0):
+        self.percentile = percentile
+        self.max_hedges = max_hedges
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def hedge_delay(self, name: str, tracker: LatencyTracker = latency_tracker) -> float:
+        if tracker.samples(name) < self.min_samples:
+            return max(self.min_delay, self.initial_delay)
+        return max(self.min_delay, tracker.percentile(name, self.percentile))
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = retry_after(error)
+        return delay if server_delay is None else max(delay, server_delay)
+
+
+# Retries within the deadline, without duplicate requests
+RETRY_ONLY = HedgePolicy(max_hedges=0)
+
+# Policy of agents that are not given one: LLM_HEDGING=1 hedges at the p95 latency
+DEFAULT_HEDGE_POLICY = HedgePolicy() if os.getenv("LLM_HEDGING", "0") == "1" else None
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(HEDGE_MAX_WORKERS, thread_name_prefix="hedged-request")
+        return _executor
+
+
+def _timed(call, name: str, timeout: Optional[float], tracker: LatencyTracker):
+    start = time.monotonic()
+    result = call(timeout)
+    tracker.record(name, time.monotonic() - start)
+    return result
+
+
+def _deadline_error(name: str, deadline: Deadline, tracker: LatencyTracker) -> DeadlineExceeded:
+    tracker.count(name, "deadline_exceeded")
+    return DeadlineExceeded(f"{name} call did not finish within its {deadline.seconds:.1f}s deadline")
+
+
+def _retry_delay(name, policy, attempt, error, deadline, tracker) -> float:
+    """
+    Backoff before the next attempt; raises `error` (or DeadlineExceeded) if there is none.
+    """
+    if isinstance(error, DeadlineExceeded) or attempt == policy.max_attempts - 1 or not is_retryable(error):
+        raise error
+    delay = policy.backoff(attempt, error)
+    if deadline is not None and delay >= deadline.remaining():
+        raise _deadline_error(name, deadline, tracker) from error
+    tracker.count(name, "retries")
+    print(f"{name} request failed: {error}. Retrying in {delay:.1f}s...")
+    return delay
+
+
+def _discard_losers(winner, futures, discard):
+    # Hand the results of requests that lost the race, now or once they finish, to discard
+    if discard is None:
+        return
+    for future in futures:
+        if future is not winner:
+            future.add_done_callback(lambda f: f.cancelled() or f.exception() is not None or discard(f.result()))
+
+
+def call_hedged(call, name: str, policy: HedgePolicy = RETRY_ONLY, deadline: Optional[Deadline] = None,
+                tracker: LatencyTracker = latency_tracker, discard=None):
+    """
+    Result of call(timeout), hedged and retried according to policy within the deadline.
+    `timeout` is the time left for that request (None without a deadline). Requests run on
+    worker threads; a request that loses a race finishes in the background, and its result
+    is passed to discard (e.g. to close an open stream).
+    """
+    for attempt in range(policy.max_attempts):
+        try:
+            return _hedged_attempt(call, name, policy, deadline, tracker, discard)
+        except Exception as e:
+            time.sleep(_retry_delay(name, policy, attempt, e, deadline, tracker))
+
+
+def _hedged_attempt(call, name, policy, deadline, tracker, discard=None):
+    executor = _hedge_executor()
+    start = time.monotonic()
+    hedge_delay = policy.hedge_delay(name, tracker)
+
+    def submit():
+        timeout = deadline.remaining() if deadline is not None else None
+        # Run in a copy of this context, so nested calls see the same deadline
+        return executor.submit(contextvars.copy_context().run, _timed, call, name, timeout, tracker)
+
+    pending, error, hedges = {submit()}, None, 0
+    first = next(iter(pending))
+    while True:
+        wait_for = deadline.remaining() if deadline is not None else None
+        if hedges < policy.max_hedges:
+            until_hedge = max(0.0, start + hedge_delay * (hedges + 1) - time.monotonic())
+            wait_for = until_hedge if wait_for is None else min(wait_for, until_hedge)
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is not first:
+                    tracker.count(name, "hedge_wins")
+                _discard_losers(future, done | pending, discard)
+                return future.result()
+            error = future.exception()
+        if not pending:
+            raise error
+        if deadline is not None and deadline.expired:
+            raise _deadline_error(name, deadline, tracker)
+        if hedges < policy.max_hedges and time.monotonic() >= start + hedge_delay * (hedges + 1):
+            pending.add(submit())
+            hedges += 1
+            tracker.count(name, "hedged")
+
+
+async def call_hedged_async(call, name: str, policy: HedgePolicy = RETRY_ONLY, deadline: Optional[Deadline] = None,
+                            tracker: LatencyTracker = latency_tracker, discard=None):
+    """
+    Async variant of call_hedged: `call(timeout)` returns an awaitable, and the requests that
+    lose a race are cancelled (those that finished anyway are passed to discard).
+    """
+    for attempt in range(policy.max_attempts):
+        try:
+            return await _hedged_attempt_async(call, name, policy, deadline, tracker, discard)
+        except Exception as e:
+            await asyncio.sleep(_retry_delay(name, policy, attempt, e, deadline, tracker))
+
+
+async def _hedged_attempt_async(call, name, policy, deadline, tracker, discard=None):
+    start = time.monotonic()
+    hedge_delay = policy.hedge_delay(name, tracker)
+
+    async def timed(timeout):
+        request_start = time.monotonic()
+        result = await call(timeout)
+        tracker.record(name, time.monotonic() - request_start)
+        return result
+
+    def submit():
+        return asyncio.ensure_future(timed(deadline.remaining() if deadline is not None else None))
+
+    first = submit()
+    pending, error, hedges = {first}, None, 0
+    try:
+        while True:
+            wait_for = deadline.remaining() if deadline is not None else None
+            if hedges < policy.max_hedges:
+                until_hedge = max(0.0, start + hedge_delay * (hedges + 1) - time.monotonic())
+                wait_for = until_hedge if wait_for is None else min(wait_for, until_hedge)
+            done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        tracker.count(name, "hedge_wins")
+                    _discard_losers(task, done, discard)
+                    return task.result()
+                error = task.exception()
+            if not pending:
+                raise error
+            if deadline is not None and deadline.expired:
+                raise _deadline_error(name, deadline, tracker)
+            if hedges < policy.max_hedges and time.monotonic() >= start + hedge_delay * (hedges + 1):
+                pending.add(submit())
+                hedges += 1
+                tracker.count(name, "hedged")
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+# Example usage: end-to-end latency percentiles of simulated model calls where 1 in 10
+# requests stalls, without and with hedging at the p90 latency
+if __name__ == "__main__":
+    def simulated_call(timeout):
+        latency = random.uniform(4, 6) if random.random() < 0.1 else random.uniform(0.2, 0.4)
+        if timeout is not None and latency > timeout:
+            time.sleep(timeout)
+            raise TimeoutError("Request timed out")
+        time.sleep(latency)
+        return "ok"
+
+    async def simulated_call_async(timeout):
+        latency = random.uniform(4, 6) if random.random() < 0.1 else random.uniform(0.2, 0.4)
+        await asyncio.wait_for(asyncio.sleep(latency), timeout)
+        return "ok"
+
+    random.seed(0)
+    n_calls = 200
+    policies = {"retries only": RETRY_ONLY,
+                "hedged at p90": HedgePolicy(percentile=90, min_delay=0.2, initial_delay=0.5)}
+    for label, policy in policies.items():
+        tracker = LatencyTracker()
+        calls = []
+        with ThreadPoolExecutor(8) as pool:
+            def one_call(_):
+                start = time.monotonic()
+                call_hedged(simulated_call, "sync", policy, Deadline(10), tracker)
+                return time.monotonic() - start
+            calls = list(pool.map(one_call, range(n_calls)))
+        p50, p95, p99 = np.percentile(calls, [50, 95, 99])
+        counters = dict(tracker.counters["sync"])
+        print(f"threads, {label:<14}: p50 {p50:.2f}s  p95 {p95:.2f}s  p99 {p99:.2f}s  {counters}")
+
+    async def run_async(policy):
+        tracker = LatencyTracker()
+
+        async def one_call():
+            start = time.monotonic()
+            await call_hedged_async(simulated_call_async, "async", policy, Deadline(10), tracker)
+            return time.monotonic() - start
+
+        calls = await asyncio.gather(*(one_call() for _ in range(n_calls)))
+        return np.percentile(calls, [50, 95, 99]), dict(tracker.counters["async"])
+
+    for label, policy in policies.items():
+        (p50, p95, p99), counters = asyncio.run(run_async(policy))
+        print(f"asyncio, {label:<14}: p50 {p50:.2f}s  p95 {p95:.2f}s  p99 {p99:.2f}s  {counters}")
@@ -0,0 +1,287 @@
+import os
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+from fundations.pdfExtractor import iter_pages, iter_extract_pdfs
+from fundations.chunker import TokenChunker, count_tokens
+from fundations.embeddingBackends import EMBEDDING_MAX_REQUEST_TOKENS
+
+_DONE = None  # Sentinel closing a queue
+
+
+class IngestPipeline:
+    """
+    Streaming extract -> chunk -> embed -> index ingestion for a Citation_Retriever.
+
+    Extraction, chunking and embedding each run in their own thread and hand work on
+    through bounded queues, so a slow stage applies backpressure instead of letting work
+    pile up, and the network is busy while later pages are still being parsed. Batches fill
+    up to batch_size chunks or batch_tokens tokens across PDF boundaries; every chunk carries
+    its source, and rows are credited to their sources one by one as they are appended to
+    the index on the calling thread. The embedding stage keeps as many batches
+    in flight as the retriever's embedding backend allows. Every stage keeps input order, so a
+    source's old rows are swapped out only after all of its new rows are in the index.
+    If a source fails part-way, its partial rows are removed and its old rows are kept.
+
+    When the retriever has a deduplicator, chunks that duplicate an indexed chunk (exactly or
+    nearly, see ChunkDeduplicator) are not embedded; their (source, page) is recorded as an
+    occurrence of the representative row instead. Duplicates are only matched against rows that
+    are certain to stay: rows of sources not being replaced, earlier rows of the same source,
+    and rows of sources that finished earlier in the same run, including earlier in the same batch.
+    """
+
+    def __init__(self, retriever, chunk_mode: str = "token", max_workers: int = None,
+                 queue_size: int = 8, batch_size: int = 256, batch_tokens: int = EMBEDDING_MAX_REQUEST_TOKENS,
+                 pages_per_task: int = None, progress: Callable[[int, int, str], None] = None):
+        self.retriever = retriever
+        self.chunk_mode = chunk_mode
+        # Extraction worker processes (defaults to the CPU count); 1 streams pages in a thread
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Page ranges of this size are extracted as separate tasks (see iter_extract_pdfs)
+        self.pages_per_task = pages_per_task
+        # Called as progress(done, total, pdf_path) after each extraction task, i.e. each page
+        # range, or each PDF when extracting with a single worker
+        self.progress = progress
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self._stop = threading.Event()
+        self._errors = []
+        # Sources fully ingested so far, also valid when run() raises
+        self.ingested = []
+        # Chunks not embedded because they duplicate an indexed chunk, and their tokens
+        self.dedup_counts = {"exact": 0, "near": 0, "tokens": 0}
+
+    def _put(self, q: queue.Queue, item):
+        # Block on a full queue, but give up once another stage has failed
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        # Block on an empty queue, but return the sentinel once another stage has failed
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _stage(self, target, *args):
+        def run():
+            try:
+                target(*args)
+            except Exception as e:
+                self._errors.append(e)
+                self._stop.set()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _extract(self, pdf_paths: List[str], page_q: queue.Queue):
+        if self.max_workers == 1:
+            for done, pdf_path in enumerate(pdf_paths, 1):
+                source, error = os.path.basename(pdf_path), None
+                try:
+                    for page_num, page_text in enumerate(iter_pages(pdf_path), 1):
+                        if self._stop.is_set():
+                            return
+                        self._put(page_q, ("page", source, page_num, page_text))
+                except Exception as e:
+                    error = f"{type(e).__name__}: {e}"
+                if self.progress:
+                    self.progress(done, len(pdf_paths), pdf_path)
+                self._put(page_q, ("end", source, error))
+        else:
+            for result in iter_extract_pdfs(pdf_paths, max_workers=self.max_workers,
+                                            pages_per_task=self.pages_per_task, progress=self.progress):
+                if self._stop.is_set():
+                    return
+                source = os.path.basename(result["path"])
+                for page_num, page_text in enumerate(result["pages"] or [], 1):
+                    self._put(page_q, ("page", source, page_num, page_text))
+                self._put(page_q, ("end", source, result["error"]))
+        self._put(page_q, _DONE)
+
+    def _chunk(self, page_q: queue.Queue, batch_q: queue.Queue):
+        texts, sources, pages, tokens = [], [], [], []
+        n_tokens = 0
+        ends = []  # End markers of sources with chunks in the open batch, sent after it
+        chunker = None  # Per-source TokenChunker in 'token' mode, so chunks can run across pages
+
+        def add(chunks, source):
+            nonlocal n_tokens
+            for text, page_num, text_tokens in chunks:
+                if texts and n_tokens + text_tokens > self.batch_tokens:
+                    flush()
+                texts.append(text)
+                sources.append(source)
+                pages.append(page_num)
+                tokens.append(text_tokens)
+                n_tokens += text_tokens
+                if len(texts) >= self.batch_size:
+                    flush()
+
+        def flush():
+            nonlocal n_tokens
+            if texts:
+                # Sources whose chunks all are in this batch may serve as duplicates within it
+                finished = {source for _, source, error in ends if not error}
+                self._put(batch_q, ("batch", list(texts), list(sources), list(pages), list(tokens), finished))
+                texts.clear(), sources.clear(), pages.clear(), tokens.clear()
+                n_tokens = 0
+            for end in ends:
+                self._put(batch_q, end)
+            ends.clear()
+
+        while True:
+            item = self._get(page_q)
+            if item is _DONE:
+                break
+            if item[0] == "page":
+                _, source, page_num, page_text = item
+                if self.chunk_mode == "token":
+                    chunker = chunker or TokenChunker()
+                    add(((text, first_page, n) for text, first_page, _, n in chunker.feed(page_num, page_text)),
+                        source)
+                else:
+                    add(((text, page, count_tokens(text)) for text, _, page in
+                         self.retriever.chunk_page(page_text, source, page_num, self.chunk_mode)), source)
+            else:
+                _, source, error = item
+                if chunker is not None:
+                    if not error:
+                        add(((text, first_page, n) for text, first_page, _, n in chunker.finish()), source)
+                    chunker = None
+                # A source ends only after the batch holding its last chunks; the batch keeps filling
+                if texts:
+                    ends.append(item)
+                else:
+                    self._put(batch_q, item)
+        flush()
+        self._put(batch_q, _DONE)
+
+    def _embed(self, batch_q: queue.Queue, rows_q: queue.Queue, first_row: int, replaced: set):
+        deduplicator = getattr(self.retriever, "deduplicator", None)
+        store = self.retriever.store
+        run_sources = []  # Source of each row this run will add, from first_row on
+        completed = set()  # Sources of this run whose chunks all made it through
+        current = None
+        backend = getattr(self.retriever, "embedding_backend", None)
+        max_in_flight = backend.max_concurrency if backend is not None else 1
+        in_flight = deque()  # (embedding future or None, item), in input order
+
+        def accept(row):
+            if row >= first_row:
+                source = run_sources[row - first_row]
+                return source == current or source in completed
+            return not store.deleted[row] and store.source(row) not in replaced
+
+        def drain(limit):
+            while len(in_flight) > limit:
+                future, item = in_flight.popleft()
+                self._put(rows_q, item if future is None else ("rows", future.result()) + item)
+
+        executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        try:
+            while True:
+                item = self._get(batch_q)
+                if item is _DONE:
+                    break
+                if item[0] == "batch":
+                    _, texts, sources, pages, tokens, finished = item
+                    duplicates = []  # (representative row, source, page)
+                    if deduplicator is not None:
+                        completed.update(finished)
+                        kept = []
+                        for text, source, page, n_tokens in zip(texts, sources, pages, tokens):
+                            current = source
+                            row, kind, digest, signature = deduplicator.match(text, accept)
+                            if row is None:
+                                deduplicator.add(first_row + len(run_sources), digest=digest, signature=signature)
+                                run_sources.append(source)
+                                kept.append((text, source, page, n_tokens))
+                            else:
+                                duplicates.append((row, source, page))
+                                self.dedup_counts[kind] += 1
+                                self.dedup_counts["tokens"] += n_tokens
+                        texts, sources, pages, tokens = (list(column) for column in zip(*kept)) if kept else \
+                            ([], [], [], [])
+                    if texts:
+                        in_flight.append((executor.submit(self.retriever.embed_texts, texts, tokens),
+                                          (texts, sources, pages, duplicates)))
+                    else:
+                        in_flight.append((None, ("rows", [], texts, sources, pages, duplicates)))
+                else:
+                    _, source, error = item
+                    if not error:
+                        completed.add(source)
+                    in_flight.append((None, item))
+                drain(max_in_flight - 1)
+            if not self._stop.is_set():
+                drain(0)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._put(rows_q, _DONE)
+
+    def run(self, pdf_paths: List[str]) -> List[str]:
+        """
+        Ingest the PDFs, replacing any rows their sources already had in the index.
+        Returns the sources that were ingested successfully.
+        """
+        retriever = self.retriever
+        store = retriever.store
+        old_rows = {os.path.basename(pdf_path): store.source_rows(os.path.basename(pdf_path))
+                    for pdf_path in pdf_paths}
+        new_rows = defaultdict(list)
+        occurrences = defaultdict(list)  # (row, page) duplicates of each source, recorded once it is ingested
+        ingested = self.ingested
+
+        page_q, batch_q, rows_q = (queue.Queue(maxsize=self.queue_size) for _ in range(3))
+        threads = [self._stage(self._extract, pdf_paths, page_q),
+                   self._stage(self._chunk, page_q, batch_q),
+                   self._stage(self._embed, batch_q, rows_q, len(store), set(old_rows))]
+
+        while True:
+            item = self._get(rows_q)
+            if item is _DONE:
+                break
+            if item[0] == "rows":
+                _, embeddings, texts, sources, pages, duplicates = item
+                for row, source, page in duplicates:
+                    occurrences[source].append((row, page))
+                if texts:
+                    start_row = len(store)
+                    retriever.add_embeddings(embeddings, texts, sources, pages)
+                    for row, source in enumerate(sources, start_row):
+                        new_rows[source].append(row)
+            else:
+                _, source, error = item
+                source_occurrences = occurrences.pop(source, [])
+                if error:
+                    print(f"Skipping {source}: {error}")
+                    retriever.delete_rows(new_rows.pop(source, []))
+                else:
+                    retriever.delete_rows(old_rows[source])
+                    retriever.forget_occurrences(source)
+                    retriever.add_occurrences(source, source_occurrences)
+                    ingested.append(source)
+
+        self._stop.set()
+        for thread in threads:
+            thread.join()
+        if self._errors:
+            # Roll back sources that did not finish
+            for source, rows in new_rows.items():
+                if source not in ingested:
+                    retriever.delete_rows(rows)
+            if getattr(retriever, "deduplicator", None) is not None:
+                retriever.deduplicator.truncate(len(store))  # Rows reserved but never added
+            raise self._errors[0]
+        return ingested
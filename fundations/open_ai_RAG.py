@@ -1,11 +1,12 @@
 import os
-import openai
+import json
+import hashlib
 import pandas as pd
-from scipy import spatial
 import numpy as np
 import sys
+import threading
 import PyPDF2  # To extract text from PDF
-from typing import Union, List
+from typing import Iterable, Union, List
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -15,18 +16,37 @@ load_dotenv()
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from fundations.foundation import LLMResponse
-
-# Get the API key from environment variables
+from fundations.vectorStore import VectorStore, top_k
+from fundations.annIndex import IVFIndex
+from fundations.bm25Index import BM25Index
+from fundations.projection import PCAProjection
+from fundations.pdfExtractor import extract_pages, extract_pdfs
+from fundations.ingestPipeline import IngestPipeline
+from fundations.chunker import count_tokens, split_tokens, chunk_pages
+from fundations.dedup import ChunkDeduplicator
+from fundations.embeddingService import EmbeddingService
+from fundations.embeddingBackends import EmbeddingBackend, HashingEmbeddingBackend, make_embedding_backend
+from fundations.shardedSearch import ShardedSearch
+from fundations.clientRegistry import get_client
+from fundations.hedging import RETRY_ONLY, call_hedged, resolve_deadline
+
+# Get the API key from environment variables; without one, only local embedding backends work
 api_key = os.getenv('OPENAI_API_KEY')
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-client = openai.OpenAI(api_key=api_key)
+client = get_client(api_key) if api_key else None
 
-# Updated embedding models
-EMBEDDING_MODEL = "text-embedding-3-small"  # Updated model
 GPT_MODEL = "gpt-4o-mini"
 
+# Embedding backend used by default, by name (see EMBEDDING_BACKENDS): "openai" or "hashing"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+
+# Compact the index once this fraction of its rows are tombstones
+COMPACT_DELETED_RATIO = 0.25
+
+# Hybrid search: number of BM25 candidates scored densely, and the weight of the
+# (max-normalized) BM25 score in the fused score
+HYBRID_CANDIDATES = 200
+HYBRID_LEXICAL_WEIGHT = 0.3
+
 # Function to normalize embeddings
 def normalize_l2(x):
     x = np.array(x)
@@ -34,51 +54,374 @@ def normalize_l2(x):
     return x if norm == 0 else x / norm
 
 class Retriever:
-    def __init__(self):
-        # DataFrame to store text and embeddings
-        self.df = pd.DataFrame(columns=["text", "embedding"])
+    def __init__(self, embedding_client=None, embedding_cache=None, precision: str = "float32", rescore: int = 0,
+                 dimensions: int = None, embedding_service: EmbeddingService = None,
+                 embedding_backend: Union[str, EmbeddingBackend] = None):
+        # Backend computing the embeddings: an EmbeddingBackend or a backend name, by default
+        # EMBEDDING_BACKEND. The OpenAI backend uses embedding_client (or an AsyncOpenAI client)
+        # through embedding_service, which sets its concurrency and per-minute limits
+        if not isinstance(embedding_backend, EmbeddingBackend):
+            name = embedding_backend or ("openai" if embedding_client or embedding_service else EMBEDDING_BACKEND)
+            kwargs = {"client": embedding_client, "service": embedding_service} if name == "openai" else {}
+            embedding_backend = make_embedding_backend(name, **kwargs)
+        self.embedding_backend = embedding_backend
+        # Optional EmbeddingCache consulted before calling the embeddings endpoint
+        self.embedding_cache = embedding_cache
+        self._cache_lock = threading.Lock()  # embed_texts may run on several threads
+        # Shortened embedding size requested from the endpoint. With rescore > 0 the full
+        # embeddings are requested and truncated locally instead, which is equivalent for the
+        # text-embedding-3 models, so the top candidates can be reranked at full dimension.
+        self.dimensions = dimensions
+        # Optional PCA projection of the stored and query embeddings (see fit_projection)
+        self.projection = None
+        # Columnar store for text and embeddings, optionally quantized to float16 or int8
+        # (see VectorStore); with rescore > 0 that many top candidates are rescored with
+        # full-precision, full-dimension embeddings
+        self.rescore = rescore
+        self.store = self._new_store(precision)
+        # Optional approximate nearest-neighbour index over the store (see build_ann_index)
+        self.ann_index = None
+        # BM25 inverted index over the same rows, for lexical and hybrid search
+        self.lexical_index = BM25Index()
+        # Optional multi-process exact search over shards of the store (see enable_sharded_search)
+        self.n_shards = None
+        self.n_shard_workers = None
+        self._sharded_search = None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        DataFrame copy of the index, for inspection.
+        """
+        return pd.DataFrame({"text": self.store.texts(), "embedding": list(self.store.embeddings)})
+
+    def _new_store(self, precision: str) -> VectorStore:
+        reduced = self.dimensions is not None or self.projection is not None
+        return VectorStore(precision=precision, keep_float32=self.rescore > 0 and (precision != "float32" or reduced))
+
+    def save_index(self, directory: str):
+        """
+        Persist the index to a directory (see VectorStore.save), including the BM25 index,
+        the PCA projection and the ANN index if built.
+        """
+        self.store.save(directory)
+        if self.projection is not None:
+            self.projection.save(os.path.join(directory, "projection.npz"))
+        self.lexical_index.save(os.path.join(directory, "bm25.npz"))
+        if isinstance(self.embedding_backend, HashingEmbeddingBackend):
+            self.embedding_backend.save(os.path.join(directory, "hashing_backend.npz"))
+        if self.ann_index is not None:
+            self.ann_index.save(os.path.join(directory, "ivf.npz"))
+
+    def load_index(self, directory: str, mmap: bool = True):
+        """
+        Replace the index with one saved by save_index. The embedding matrix is memory-mapped
+        by default, so loading does not read it into RAM.
+        """
+        self.store = VectorStore.load(directory, mmap=mmap)
+        projection_path = os.path.join(directory, "projection.npz")
+        self.projection = PCAProjection.load(projection_path) if os.path.exists(projection_path) else None
+        ann_path = os.path.join(directory, "ivf.npz")
+        self.ann_index = IVFIndex.load(ann_path) if os.path.exists(ann_path) else None
+        backend_path = os.path.join(directory, "hashing_backend.npz")
+        if isinstance(self.embedding_backend, HashingEmbeddingBackend) and os.path.exists(backend_path):
+            self.embedding_backend = HashingEmbeddingBackend.load(backend_path)  # Keep the fitted IDF
+        lexical_path = os.path.join(directory, "bm25.npz")
+        if os.path.exists(lexical_path):
+            self.lexical_index = BM25Index.load(lexical_path)
+        else:  # Saved before the BM25 index existed
+            self.lexical_index = BM25Index()
+            self.lexical_index.add(self.store.texts(), 0)
+
+    def fit_embedding_backend(self, texts: List[str]):
+        """
+        Fit the embedding backend's corpus statistics (e.g. the hashing backend's IDF) on texts.
+        Only allowed on an empty index, since fitting changes every vector the backend produces.
+        """
+        if len(self.store):
+            raise ValueError("The embedding backend can only be fitted before anything is indexed")
+        self.embedding_backend.fit(texts)
+
+    def enable_sharded_search(self, n_shards: int = None, n_workers: int = None):
+        """
+        Run unfiltered exact searches on n_shards shards of the store (one per CPU by default),
+        scanned in parallel by n_workers processes over shared memory (see ShardedSearch).
+        The shared snapshot is rebuilt on the next search after the store changes.
+        """
+        n_shards = n_shards or os.cpu_count() or 1
+        if (n_shards, n_workers) != (self.n_shards, self.n_shard_workers):
+            self._close_sharded_search()
+        self.n_shards = n_shards
+        self.n_shard_workers = n_workers
+
+    def _close_sharded_search(self):
+        if self._sharded_search is not None:
+            self._sharded_search.close()
+            self._sharded_search = None
+
+    def close(self):
+        """
+        Stop the sharded search's worker processes and free its shared memory, if any.
+        The retriever stays usable; a later sharded search starts a new snapshot.
+        """
+        self._close_sharded_search()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _exact_searcher(self, rows=None):
+        # The store, or its sharded snapshot for unfiltered searches once enabled
+        if self.n_shards is None or rows is not None:
+            return self.store
+        if self._sharded_search is None or not self._sharded_search.is_current(self.store):
+            self._close_sharded_search()
+            self._sharded_search = ShardedSearch(self.store, self.n_shards, self.n_shard_workers)
+        return self._sharded_search
+
+    def build_ann_index(self, n_lists: int = None, nprobe: int = 8):
+        """
+        Train an IVF index on the current embeddings so vector_search probes only the
+        nprobe closest lists instead of scanning every chunk. Rows added later are
+        assigned to the trained lists incrementally.
+        """
+        self.ann_index = IVFIndex(n_lists=n_lists, nprobe=nprobe)
+        self.ann_index.train(self.store.vectors)
+        self.ann_index.add(self.store.vectors, 0)
+
+    def fit_projection(self, dimensions: int, sample_size: int = 20000):
+        """
+        Fit a PCA projection to `dimensions` on the stored embeddings and re-project the
+        store; rows added later and queries are projected the same way. With rescore > 0 the
+        full-dimension embeddings are kept (memory-mapped once saved) for a second-stage rerank.
+        """
+        if self.dimensions is not None or self.projection is not None:
+            raise ValueError("fit_projection needs a full-dimension index")
+        self.compact_index()  # Row ids stay aligned with the BM25 index
+        old_store, full = self.store, self.store.embeddings
+        self.projection = PCAProjection(dimensions)
+        self.projection.fit(full, sample_size=sample_size)
+        self.store = self._new_store(old_store.precision)
+        self.store.add(self.projection.transform(full), old_store.texts(), old_store.sources(), old_store.pages(),
+                       full_embeddings=full)
+        if self.ann_index is not None:
+            self.build_ann_index(n_lists=self.ann_index.n_lists, nprobe=self.ann_index.nprobe)
+
+    def _reduce(self, embeddings) -> np.ndarray:
+        """
+        Embeddings in the stored dimension: truncated to `dimensions` and/or PCA-projected.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dimensions is not None and embeddings.shape[-1] > self.dimensions:
+            embeddings = embeddings[..., :self.dimensions]  # Rows are renormalized by the store
+        if self.projection is not None:
+            embeddings = self.projection.transform(embeddings)
+        return embeddings
+
+    def compact_index(self) -> np.ndarray:
+        """
+        Drop tombstoned rows from the store and remap the BM25 and ANN indexes to the new row ids.
+        Returns the old ids of the kept rows.
+        """
+        keep = self.store.compact()
+        self.lexical_index.remap(keep)
+        if self.ann_index is not None:
+            self.ann_index.remap(keep)
+        return keep
+
+    def _maybe_compact(self):
+        if self.store.n_deleted > COMPACT_DELETED_RATIO * len(self.store):
+            self.compact_index()
+
+    def add_embeddings(self, embeddings, texts: List[str], sources: List[str] = None, pages: List[int] = None):
+        """
+        Append already embedded rows to the store and keep the BM25 and ANN indexes in sync.
+        """
+        start_row = len(self.store)
+        self.store.add(self._reduce(embeddings), texts, sources, pages, full_embeddings=embeddings)
+        self.lexical_index.add(texts, start_row)
+        if self.ann_index is not None:
+            self.ann_index.add(self.store.vectors[start_row:], start_row)
 
     def embed_text(self, text: str) -> list:
-        response = client.embeddings.create(
-            input=[text],
-            model=EMBEDDING_MODEL
-        )
-        return response.data[0].embedding
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str], n_tokens: List[int] = None) -> list:
+        """
+        Embed many texts with the embedding backend, skipping texts found in the embedding cache.
+        n_tokens, the token counts of the texts if already known (e.g. from the chunker), saves
+        counting them again. Returns the embeddings in the same order as `texts`.
+        """
+        if self.embedding_cache is not None:
+            with self._cache_lock:
+                embeddings = self.embedding_cache.get_many(self._model_key(), texts)
+        else:
+            embeddings = [None] * len(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        missing_texts = [texts[i] for i in missing]
+
+        if missing:
+            missing_tokens = [n_tokens[i] for i in missing] if n_tokens is not None else None
+            for i, embedding in zip(missing, self.embedding_backend.embed(missing_texts, self._api_dimensions(),
+                                                                          missing_tokens)):
+                embeddings[i] = embedding
+
+        if self.embedding_cache is not None and missing:
+            with self._cache_lock:
+                self.embedding_cache.put_many(self._model_key(), missing_texts, [embeddings[i] for i in missing])
+        return embeddings
+
+    def _api_dimensions(self):
+        # Shortened embeddings are requested only when no full-dimension rerank is needed
+        if self.dimensions is None or self.rescore or not self.embedding_backend.supports_dimensions:
+            return None
+        return self.dimensions
+
+    def _model_key(self) -> str:
+        # Cache key of the embeddings the backend returns
+        return self.embedding_backend.model_key(self._api_dimensions())
 
     def add_to_index(self, text: str):
         """
-        Adds text and its embedding to the index (DataFrame).
+        Adds text and its embedding to the index.
         """
         embedding = self.embed_text(text)
-        new_entry = pd.DataFrame([[text, embedding]], columns=["text", "embedding"])
-        self.df = pd.concat([self.df, new_entry], ignore_index=True)
+        self.add_embeddings([embedding], [text])
 
-    def vector_search(self, query: str, top_n: int = 1) -> list:
+    def add_many_to_index(self, texts: List[str]):
+        """
+        Adds many texts to the index, embedding them in batches.
+        """
+        if not texts:
+            return
+        embeddings = self.embed_texts(texts)
+        self.add_embeddings(embeddings, texts)
+
+    def vector_search(self, query: str, top_n: int = 1, hybrid: bool = False,
+                      sources: List[str] = None, pages: Iterable[int] = None) -> list:
         """
         Perform a vector search by embedding the query and finding the most relevant text.
         Returns the top_n most related texts and their similarity scores.
+        With hybrid=True, only the BM25 candidates are scored densely (see _hybrid_search).
+        `sources` and `pages` (e.g. range(10, 20)) restrict the search to matching chunks;
+        only those rows are scored.
         """
         # Embed the query
         query_embedding = self.embed_text(query)
 
-        # Calculate similarity between query and stored embeddings
-        self.df["similarity"] = self.df["embedding"].apply(
-            lambda x: 1 - spatial.distance.cosine(query_embedding, x)
-        )
+        # Score all stored embeddings at once (or only the probed IVF lists / filtered rows) and select the top_n texts
+        rows = self._filter_rows(sources, pages)
+        if hybrid:
+            top_rows, similarities = self._hybrid_search(query, query_embedding, top_n, rows)
+        else:
+            top_rows, similarities = self._dense_search(query_embedding, top_n, rows)
+        return [self.result_row(i, float(similarity)) for i, similarity in zip(top_rows, similarities)]
+
+    def vector_search_many(self, queries: List[str], top_n: int = 1, hybrid: bool = False,
+                           sources: List[str] = None, pages: Iterable[int] = None) -> list:
+        """
+        Vector search for several queries at once: the queries are embedded in one batched
+        request and scored against the index with a single matrix-matrix product.
+        Returns one list of top_n results per query, in the same format as vector_search.
+        """
+        if not queries:
+            return []
+        query_embeddings = np.asarray(self.embed_texts(queries), dtype=np.float32)
+        rows = self._filter_rows(sources, pages)
+        if hybrid:
+            hits = [self._hybrid_search(query, query_embedding, top_n, rows)
+                    for query, query_embedding in zip(queries, query_embeddings)]
+        elif self.ann_index is not None and rows is None:
+            hits = [self._ann_search(query_embedding, top_n) for query_embedding in query_embeddings]
+        else:
+            searcher = self._exact_searcher(rows)
+            kwargs = {"rows": rows} if searcher is self.store else {}
+            hits = searcher.search_many(self._reduce(query_embeddings), top_n=top_n, rescore=self._rescore(),
+                                        full_queries=query_embeddings, **kwargs)
+        return [[self.result_row(i, float(similarity)) for i, similarity in zip(top_rows, similarities)]
+                for top_rows, similarities in hits]
+
+    def _rescore(self) -> int:
+        # A loaded index may have been saved without its float32 copy
+        return self.rescore if self.store.keep_float32 else 0
+
+    def _filter_rows(self, sources: List[str] = None, pages: Iterable[int] = None):
+        """
+        Rows matching the metadata filters, or None when there are no filters.
+        """
+        if sources is None and pages is None:
+            return None
+        if sources is not None:
+            sources = [os.path.basename(source) for source in sources]
+        return self.store.filter_rows(sources, pages)
+
+    def _dense_search(self, query_embedding, top_n: int, rows=None):
+        # A filtered subset is scored exactly; otherwise use the ANN index if one is built
+        if self.ann_index is not None and rows is None:
+            return self._ann_search(query_embedding, top_n)
+        searcher = self._exact_searcher(rows)
+        kwargs = {"rows": rows} if searcher is self.store else {}
+        return searcher.search(self._reduce(query_embedding), top_n=top_n, rescore=self._rescore(),
+                               full_queries=query_embedding, **kwargs)
+
+    def _ann_search(self, query_embedding, top_n: int):
+        deleted = self.store.deleted if self.store.n_deleted else None
+        return self.ann_index.search(self.store.vectors, self._reduce(query_embedding), top_n=top_n, deleted=deleted)
+
+    def _hybrid_search(self, query: str, query_embedding, top_n: int, rows=None,
+                       n_candidates: int = HYBRID_CANDIDATES, lexical_weight: float = HYBRID_LEXICAL_WEIGHT):
+        """
+        Score densely only the n_candidates best BM25 rows (among `rows`, if given) and rank
+        them by (1 - lexical_weight) * cosine + lexical_weight * BM25 / max BM25.
+        Falls back to a dense search when no row shares a term with the query.
+        """
+        deleted = self.store.deleted if self.store.n_deleted else None
+        candidates, lexical_scores = self.lexical_index.search(query, n_candidates, deleted=deleted, rows=rows)
+        if len(candidates) == 0:
+            return self._dense_search(query_embedding, top_n, rows)
+        order = np.argsort(candidates)  # Gather rows in storage order
+        candidates, lexical_scores = candidates[order], lexical_scores[order]
+        dense_scores = self.store.vectors[candidates] @ normalize_l2(self._reduce(query_embedding))
+        fused = (1 - lexical_weight) * dense_scores + lexical_weight * lexical_scores / lexical_scores.max()
+        indices, scores = top_k(fused.astype(np.float32), top_n)
+        return candidates[indices], scores
+
+    def lexical_search(self, query: str, top_n: int = 1, sources: List[str] = None,
+                       pages: Iterable[int] = None) -> list:
+        """
+        BM25 keyword search, without embedding the query.
+        Returns the top_n matching texts and their BM25 scores.
+        """
+        deleted = self.store.deleted if self.store.n_deleted else None
+        top_rows, scores = self.lexical_index.search(query, top_n, deleted=deleted,
+                                                     rows=self._filter_rows(sources, pages))
+        return [self.result_row(i, float(score)) for i, score in zip(top_rows, scores)]
 
-        # Sort by similarity and return the top_n texts
-        results = self.df.sort_values(by="similarity", ascending=False).head(top_n)
-        return results[["text", "similarity"]].values.tolist()
+    def result_row(self, i: int, similarity: float) -> list:
+        """
+        The search result for row i of the index.
+        """
+        return [self.store.text(i), similarity]
 
     def ask_gpt(self, query: str, context: str):
         """
         Use GPT to answer the query, with relevant context inserted.
+        Inside a deadline_scope, the request is retried and times out within the deadline.
         """
         llm = LLMResponse(model_name=GPT_MODEL)
         system_prompt = "You answer questions using the provided context."
         user_prompt = f"Context: {context}\n\nQuestion: {query}"
-        
-        response = llm.llm_output(user_prompt, system_prompt)
+
+        deadline = resolve_deadline()
+        if deadline is None:
+            response = llm.llm_output(user_prompt, system_prompt)
+        else:
+            # Retried within the deadline, each request timing out when the deadline does
+            response = call_hedged(lambda timeout: llm.llm_output(user_prompt, system_prompt, max_retries=0,
+                                                                  timeout=timeout),
+                                   f"{type(self).__name__}.ask_gpt", RETRY_ONLY, deadline)
         return response.content
 
     def retrieve_and_ask(self, query: str, top_n: int = 5):
@@ -95,18 +438,21 @@ class Retriever:
 
     def chunking(self, text: str, mode: str = "sentence"):
         """
-        Splits the text into chunks based on the chosen mode ('sentence', 'paragraph', or 'page').
+        Splits the text into chunks based on the chosen mode ('token', 'sentence', 'paragraph', or 'page').
+        'token' packs whole sentences into token-budgeted chunks (see fundations/chunker.py).
         """
-        if mode == "sentence":
+        if mode == "token":
+            return [chunk for chunk, _, _, _ in chunk_pages([(1, text)])]
+        elif mode == "sentence":
             return text.split(". ")
         elif mode == "paragraph":
             return text.split("\n\n")
         elif mode == "page":
             return text.split("\f")
         else:
-            raise ValueError("Invalid mode! Choose either 'sentence', 'paragraph', or 'page'.")
+            raise ValueError("Invalid mode! Choose either 'token', 'sentence', 'paragraph', or 'page'.")
 
-    def create_embedding_for_pdf(self, pdf_path: str, chunk_mode: str = "paragraph"):
+    def create_embedding_for_pdf(self, pdf_path: str, chunk_mode: str = "token"):
         """
         Extracts text from a PDF, chunks it, and generates embeddings for each chunk.
         """
@@ -120,14 +466,13 @@ class Retriever:
         # Step 2: Chunk the text
         chunks = self.chunking(pdf_text, mode=chunk_mode)
 
-        # Step 3: Create embeddings for each chunk and index them
+        # Step 3: Split chunks that are too large, then embed them in batches and index them
+        sub_chunks = []
         for chunk in chunks:
-            # Split the chunk further if it's too large
-            sub_chunks = self.split_text(chunk, max_tokens=8000)  # Leave some buffer
-            for sub_chunk in sub_chunks:
-                self.add_to_index(sub_chunk)
+            sub_chunks.extend(self.split_text(chunk, max_tokens=8000))  # Leave some buffer
+        self.add_many_to_index(sub_chunks)
 
-    def rag_complete(self, pdf_path: str, query: str, chunk_mode: str = "paragraph"):
+    def rag_complete(self, pdf_path: str, query: str, chunk_mode: str = "token"):
         """
         Given a PDF and a query, generate a response using retrieval-augmented generation (RAG).
         """
@@ -146,24 +491,14 @@ class Retriever:
         return answer, context
 
     def split_text(self, text, max_tokens=8000):
-        tokens = self.tokenize(text)
-        chunks = []
-        current_chunk = []
-        current_length = 0
-
-        for token in tokens:
-            if current_length + len(token) > max_tokens:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [token]
-                current_length = len(token)
-            else:
-                current_chunk.append(token)
-                current_length += len(token)
-
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-
-        return chunks
+        """
+        Split text into pieces of at most max_tokens embedding tokens, dropping blank pieces.
+        """
+        if not text.strip():
+            return []
+        if count_tokens(text) <= max_tokens:
+            return [text]
+        return split_tokens(text, max_tokens)
 
     def tokenize(self, text):
         # Implement a simple tokenization method
@@ -172,41 +507,296 @@ class Retriever:
     
 
 class Citation_Retriever(Retriever):
-    def __init__(self):
-        super().__init__()
-        self.df = pd.DataFrame(columns=["text", "embedding", "source", "page"])
+    def __init__(self, embedding_client=None, embedding_cache=None, precision: str = "float32", rescore: int = 0,
+                 dimensions: int = None, dedup: bool = True, embedding_service: EmbeddingService = None,
+                 embedding_backend: Union[str, EmbeddingBackend] = None):
+        super().__init__(embedding_client, embedding_cache, precision, rescore, dimensions, embedding_service,
+                         embedding_backend)
+        # Ingested sources: source name -> {"path", "size", "mtime", "sha256", "chunk_mode"}
+        self.manifest = {}
+        # Duplicate chunks are not embedded again (see IngestPipeline); their (source, page)
+        # pairs are recorded against the row of the chunk they duplicate
+        self.deduplicator = ChunkDeduplicator() if dedup else None
+        self.occurrences = {}  # row -> [[source, page], ...]
+        self.source_occurrences = {}  # source -> {row: [page, ...]}, the same pairs indexed by source
+        self.dedup_counts = {"exact": 0, "near": 0, "tokens": 0}
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """
+        DataFrame copy of the index, for inspection.
+        """
+        return pd.DataFrame({"text": self.store.texts(), "embedding": list(self.store.embeddings),
+                             "source": self.store.sources(), "page": self.store.pages()})
 
     def add_to_index(self, text: str, source: str, page: int):
         embedding = self.embed_text(text)
-        new_entry = pd.DataFrame([[text, embedding, source, page]], columns=["text", "embedding", "source", "page"])
-        self.df = pd.concat([self.df, new_entry], ignore_index=True)
+        self.add_embeddings([embedding], [text], [source], [page])
 
-    def vector_search(self, query: str, top_n: int = 1) -> list:
-        query_embedding = self.embed_text(query)
-        self.df["similarity"] = self.df["embedding"].apply(
-            lambda x: 1 - spatial.distance.cosine(query_embedding, x)
-        )
-        results = self.df.sort_values(by="similarity", ascending=False).head(top_n)
-        return results[["text", "similarity", "source", "page"]].values.tolist()
+    def add_many_to_index(self, texts: List[str], sources: List[str], pages: List[int]):
+        """
+        Adds many texts to the index, embedding them in batches.
+        `sources` and `pages` are aligned with `texts`.
+        """
+        if not texts:
+            return
+        embeddings = self.embed_texts(texts)
+        self.add_embeddings(embeddings, texts, sources, pages)
 
-    def retrieve_and_ask(self, query: str, top_n: int = 5):
-        top_texts = self.vector_search(query, top_n=top_n)
+    def result_row(self, i: int, similarity: float) -> list:
+        return [self.store.text(i), similarity, self.store.source(i), self.store.page(i)]
+
+    def save_index(self, directory: str):
+        """
+        Save the index and its sidecar files. Each sidecar is written to a temporary name and
+        swapped in, and the manifest goes last: a save cut short leaves the previous manifest,
+        so the sources it lists are ingested again rather than trusted as up to date.
+        """
+        super().save_index(directory)
+
+        def write(name, writer):
+            path = os.path.join(directory, name)
+            writer(path + ".tmp")
+            os.replace(path + ".tmp", path)
+
+        def write_json(data, **kwargs):
+            def writer(path):
+                with open(path, "w") as f:
+                    json.dump(data, f, **kwargs)
+            return writer
+
+        write("occurrences.json", write_json({str(row): pairs for row, pairs in self.occurrences.items()}))
+        if self.deduplicator is not None:
+            write("dedup.npz", self.deduplicator.save)
+        write("manifest.json", write_json(self.manifest, indent=2))
+
+    def load_index(self, directory: str, mmap: bool = True):
+        super().load_index(directory, mmap=mmap)
+        manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = {}
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                self.manifest = json.load(f)
+        occurrences_path = os.path.join(directory, "occurrences.json")
+        self.occurrences = {}
+        if os.path.exists(occurrences_path):
+            with open(occurrences_path, "r") as f:
+                self.occurrences = {int(row): pairs for row, pairs in json.load(f).items()}
+        self._index_occurrences()
+        if self.deduplicator is not None:
+            dedup_path = os.path.join(directory, "dedup.npz")
+            if os.path.exists(dedup_path):
+                self.deduplicator = ChunkDeduplicator.load(dedup_path)
+            else:  # Saved before deduplication existed
+                self.deduplicator = ChunkDeduplicator()
+                deleted = self.store.deleted
+                for row, text in enumerate(self.store.texts()):
+                    if not deleted[row]:
+                        self.deduplicator.add(row, text)
+
+    def compact_index(self) -> np.ndarray:
+        keep = super().compact_index()
+        if self.deduplicator is not None:
+            self.deduplicator.remap(keep)
+        new_ids = {int(old): new for new, old in enumerate(keep)}
+        self.occurrences = {new_ids[row]: pairs for row, pairs in self.occurrences.items() if row in new_ids}
+        self._index_occurrences()
+        return keep
+
+    def delete_rows(self, rows):
+        """
+        Tombstone rows. Sources that had duplicate chunks recorded against these rows are
+        dropped from the manifest, so their next ingestion indexes those chunks again.
+        """
+        self.store.delete_rows(rows)
+        for row in rows:
+            for source, _ in self.occurrences.pop(int(row), []):
+                self.manifest.pop(source, None)
+                source_rows = self.source_occurrences.get(source, {})
+                source_rows.pop(int(row), None)
+                if not source_rows:
+                    self.source_occurrences.pop(source, None)
+
+    def add_occurrences(self, source: str, occurrences: List[tuple]):
+        """
+        Record (row, page) pairs where a chunk of `source` duplicates the chunk at row.
+        """
+        for row, page in occurrences:
+            self.occurrences.setdefault(int(row), []).append([source, int(page)])
+            self.source_occurrences.setdefault(source, {}).setdefault(int(row), []).append(int(page))
+
+    def forget_occurrences(self, source: str):
+        """
+        Drop the duplicate occurrences recorded for a source.
+        """
+        for row in self.source_occurrences.pop(source, {}):
+            pairs = [pair for pair in self.occurrences[row] if pair[0] != source]
+            if pairs:
+                self.occurrences[row] = pairs
+            else:
+                del self.occurrences[row]
+
+    def _index_occurrences(self):
+        # Rebuild source_occurrences from occurrences
+        self.source_occurrences = {}
+        for row, pairs in self.occurrences.items():
+            for source, page in pairs:
+                self.source_occurrences.setdefault(source, {}).setdefault(row, []).append(page)
+
+    def occurrences_of(self, i: int) -> List[tuple]:
+        """
+        All (source, page) places the chunk at row i appears, its own first.
+        """
+        return [(self.store.source(i), self.store.page(i))] + \
+            [tuple(pair) for pair in self.occurrences.get(i, [])]
+
+    def _filter_rows(self, sources: List[str] = None, pages: Iterable[int] = None):
+        # A chunk also matches through the sources and pages of its duplicates
+        pages = pages if pages is None or isinstance(pages, range) else set(pages)
+        rows = super()._filter_rows(sources, pages)
+        if rows is None or not self.occurrences:
+            return rows
+        # Only the requested sources' occurrences are looked at
+        names = self.source_occurrences if sources is None else {os.path.basename(source) for source in sources}
+        extra = [row for name in names for row, row_pages in self.source_occurrences.get(name, {}).items()
+                 if pages is None or any(page in pages for page in row_pages)]
+        return np.union1d(rows, np.array(extra, dtype=np.int64)) if extra else rows
+
+    @staticmethod
+    def file_sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def source_entry(self, pdf_path: str, chunk_mode: str):
+        """
+        Manifest entry for a file, or None if the file is already indexed unchanged.
+        Size and mtime are checked first; the content hash is only computed when they differ.
+        """
+        stat = os.stat(pdf_path)
+        entry = {"path": os.path.abspath(pdf_path), "size": stat.st_size, "mtime": stat.st_mtime,
+                 "chunk_mode": chunk_mode}
+        previous = self.manifest.get(os.path.basename(pdf_path))
+        if previous and all(previous.get(key) == entry[key] for key in ("size", "mtime", "chunk_mode")):
+            return None
+        entry["sha256"] = self.file_sha256(pdf_path)
+        if previous and previous.get("sha256") == entry["sha256"] and previous.get("chunk_mode") == chunk_mode:
+            previous["mtime"] = entry["mtime"]  # Touched but unchanged
+            return None
+        return entry
+
+    def remove_source(self, source: str):
+        """
+        Remove a document's chunks from the index by tombstoning them.
+        The store is compacted once enough rows are tombstones.
+        """
+        source = os.path.basename(source)
+        self.delete_rows(self.store.source_rows(source))
+        self.forget_occurrences(source)
+        self.manifest.pop(source, None)
+        self._maybe_compact()
+
+    def retrieve_and_ask(self, query: str, top_n: int = 5, hybrid: bool = False,
+                         sources: List[str] = None, pages: Iterable[int] = None):
+        top_texts = self.vector_search(query, top_n=top_n, hybrid=hybrid, sources=sources, pages=pages)
         context = "\n\n".join([f"[Source: {source}, Page: {page}]\n{text}" for text, _, source, page in top_texts])
         answer = self.ask_gpt(query, context)
         return answer, context, top_texts
 
-    def create_embedding_for_pdf(self, pdf_path: str, chunk_mode: str = "paragraph"):
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            for page_num, page in enumerate(reader.pages, 1):
-                page_text = page.extract_text()
-                chunks = self.chunking(page_text, mode=chunk_mode)
-                for chunk in chunks:
-                    sub_chunks = self.split_text(chunk, max_tokens=8000)
-                    for sub_chunk in sub_chunks:
-                        self.add_to_index(sub_chunk, os.path.basename(pdf_path), page_num)
+    def retrieve_and_ask_many(self, queries: List[str], top_n: int = 5, hybrid: bool = False,
+                              sources: List[str] = None, pages: Iterable[int] = None) -> list:
+        """
+        retrieve_and_ask for several queries, sharing one batched retrieval.
+        Returns a list of (answer, context, top_texts) tuples, one per query.
+        """
+        results = []
+        hits = self.vector_search_many(queries, top_n=top_n, hybrid=hybrid, sources=sources, pages=pages)
+        for query, top_texts in zip(queries, hits):
+            context = "\n\n".join([f"[Source: {source}, Page: {page}]\n{text}" for text, _, source, page in top_texts])
+            answer = self.ask_gpt(query, context)
+            results.append((answer, context, top_texts))
+        return results
+
+    def chunk_page(self, page_text: str, source: str, page_num: int, chunk_mode: str = "token"):
+        """
+        Yields (text, source, page) for every chunk of one page.
+        """
+        if chunk_mode == "token":
+            for chunk, _, _, _ in chunk_pages([(page_num, page_text)]):
+                yield chunk, source, page_num
+            return
+        chunks = self.chunking(page_text, mode=chunk_mode)
+        for chunk in chunks:
+            sub_chunks = self.split_text(chunk, max_tokens=8000)
+            for sub_chunk in sub_chunks:
+                yield sub_chunk, source, page_num
 
-    def rag_complete(self, pdf_paths: Union[str, List[str]], query: str, chunk_mode: str = "paragraph"):
+    def page_chunks(self, page_texts: List[str], source: str, chunk_mode: str = "token"):
+        """
+        Yields (text, source, page) for every chunk of a document's extracted pages.
+        In 'token' mode chunks may run across pages and carry the page they start on.
+        """
+        if chunk_mode == "token":
+            for chunk, first_page, _, _ in chunk_pages(enumerate(page_texts, 1)):
+                yield chunk, source, first_page
+            return
+        for page_num, page_text in enumerate(page_texts, 1):
+            yield from self.chunk_page(page_text, source, page_num, chunk_mode)
+
+    def pdf_chunks(self, pdf_path: str, chunk_mode: str = "token"):
+        """
+        Yields (text, source, page) for every chunk of a PDF.
+        """
+        yield from self.page_chunks(extract_pages(pdf_path), os.path.basename(pdf_path), chunk_mode)
+
+    def create_embedding_for_pdf(self, pdf_path: str, chunk_mode: str = "token"):
+        self.create_embeddings_for_pdfs([pdf_path], chunk_mode)
+
+    def create_embeddings_for_pdfs(self, pdf_paths: List[str], chunk_mode: str = "token",
+                                   max_workers: int = None, pages_per_task: int = None, progress=None) -> int:
+        """
+        Streams the PDFs through extraction, chunking and batched embedding into the index
+        (see IngestPipeline). PDFs already in the manifest and unchanged are skipped. A changed
+        PDF has its old chunks replaced only once all new ones are indexed. Text is extracted
+        on a process pool of max_workers, in page ranges of pages_per_task pages if set, calling
+        progress(done, total, pdf_path) after each extraction task; a PDF that fails to extract
+        is reported and skipped.
+        Duplicate chunks, within or across PDFs, are embedded and indexed once.
+        Returns the number of PDFs that were (re)indexed.
+        """
+        entries = {}
+        for pdf_path in pdf_paths:
+            entry = self.source_entry(pdf_path, chunk_mode)
+            if entry is not None:
+                entries[os.path.basename(pdf_path)] = (pdf_path, entry)
+
+        if not self.embedding_backend.fitted and len(self.store) == 0 and entries:
+            # Index build: fit the backend on the whole corpus before the first chunk is embedded
+            corpus = [text for result in extract_pdfs([pdf_path for pdf_path, _ in entries.values()], max_workers)
+                      if result["pages"] is not None
+                      for text, _, _ in self.page_chunks(result["pages"], result["path"], chunk_mode)]
+            self.fit_embedding_backend(corpus)
+
+        pipeline = IngestPipeline(self, chunk_mode=chunk_mode, max_workers=max_workers,
+                                  pages_per_task=pages_per_task, progress=progress)
+        try:
+            pipeline.run([pdf_path for pdf_path, _ in entries.values()])
+        finally:
+            for source in pipeline.ingested:
+                self.manifest[source] = entries[source][1]
+            for key, count in pipeline.dedup_counts.items():
+                self.dedup_counts[key] += count
+        skipped = pipeline.dedup_counts["exact"] + pipeline.dedup_counts["near"]
+        if skipped:
+            print(f"Skipped {skipped} duplicate chunks ({pipeline.dedup_counts['exact']} exact, "
+                  f"{pipeline.dedup_counts['near']} near, {pipeline.dedup_counts['tokens']} tokens): "
+                  f"{skipped} fewer embedding inputs and index rows")
+        self._maybe_compact()
+        return len(pipeline.ingested)
+
+    def rag_complete(self, pdf_paths: Union[str, List[str]], query: str, chunk_mode: str = "token"):
         """
         Given one or more PDFs and a query, generate a response using retrieval-augmented generation (RAG).
         
@@ -219,9 +809,8 @@ class Citation_Retriever(Retriever):
         if isinstance(pdf_paths, str):
             pdf_paths = [pdf_paths]
         
-        # Process each PDF
-        for pdf_path in pdf_paths:
-            self.create_embedding_for_pdf(pdf_path, chunk_mode)
+        # Process all PDFs in one batched ingestion
+        self.create_embeddings_for_pdfs(pdf_paths, chunk_mode)
         
         # Retrieve relevant information and generate answer
         answer, context, top_texts = self.retrieve_and_ask(query)
@@ -0,0 +1,168 @@
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+import PyPDF2
+import fitz  # PyMuPDF
+
+ENGINES = ("pypdf2", "pymupdf")
+
+
+def page_count(pdf_path: str, engine: str = "pypdf2") -> int:
+    if engine == "pymupdf":
+        with fitz.open(pdf_path) as doc:
+            return doc.page_count
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_pages(pdf_path: str, start: int = 0, end: Optional[int] = None, engine: str = "pypdf2") -> List[str]:
+    """
+    Extract the text of pages [start, end) of a PDF, one string per page.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Invalid engine! Choose one of {ENGINES}.")
+    if engine == "pymupdf":
+        with fitz.open(pdf_path) as doc:
+            return [doc[i].get_text() for i in range(start, doc.page_count if end is None else end)]
+    with open(pdf_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return [page.extract_text() for page in reader.pages[start:end]]
+
+
+def iter_pages(pdf_path: str, engine: str = "pypdf2"):
+    """
+    Lazily yield the text of each page of a PDF, so pages can be processed as they are parsed.
+    """
+    if engine == "pymupdf":
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                yield page.get_text()
+        return
+    with open(pdf_path, 'rb') as file:
+        for page in PyPDF2.PdfReader(file).pages:
+            yield page.extract_text()
+
+
+def iter_extract_pdfs(pdf_paths: List[str], max_workers: Optional[int] = None, engine: str = "pypdf2",
+                      pages_per_task: Optional[int] = None,
+                      progress: Optional[Callable[[int, int, str], None]] = None):
+    """
+    Extract PDFs on a process pool and yield their result dicts (see extract_pdfs) in input
+    order as soon as each is ready. Tasks are submitted in order and at most 2 x max_workers
+    are in flight, so results waiting to be consumed stay bounded; with pages_per_task, the
+    page ranges of a large PDF are consecutive tasks spread across workers.
+    """
+    pdf_paths = list(pdf_paths)
+    tasks, errors = _plan_tasks(pdf_paths, engine, pages_per_task)
+    task_results = _run_tasks(tasks, max_workers, engine)
+    n_tasks = [0] * len(pdf_paths)
+    for i, _, _, _ in tasks:
+        n_tasks[i] += 1
+
+    done = 0
+    try:
+        for i, path in enumerate(pdf_paths):
+            pages, error = [], errors.get(i)
+            for _ in range(n_tasks[i]):
+                task_pages, task_error = next(task_results)
+                done += 1
+                if progress:
+                    progress(done, len(tasks), path)
+                error = error or task_error
+                if not error:
+                    pages.extend(task_pages)
+            yield {"path": path, "pages": None if error else pages, "error": error}
+    finally:
+        task_results.close()
+
+
+def _plan_tasks(pdf_paths: List[str], engine: str, pages_per_task: Optional[int]):
+    """
+    Extraction tasks (path index, path, start page, end page) in input order, and the
+    errors of PDFs that could not be split, by path index.
+    """
+    tasks, errors = [], {}
+    for i, path in enumerate(pdf_paths):
+        if pages_per_task:
+            try:
+                n_pages = page_count(path, engine)
+            except Exception as e:
+                errors[i] = f"{type(e).__name__}: {e}"
+                continue
+            tasks.extend((i, path, start, min(start + pages_per_task, n_pages))
+                         for start in range(0, max(n_pages, 1), pages_per_task))
+        else:
+            tasks.append((i, path, 0, None))
+    return tasks, errors
+
+
+def _run_tasks(tasks: list, max_workers: Optional[int], engine: str):
+    # Yields (pages, error) per task, in task order
+    max_workers = max_workers or os.cpu_count() or 1
+    if max_workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _extract_task(*task[1:], engine)
+        return
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+        remaining = iter(tasks)
+        pending = [executor.submit(_extract_task, *task[1:], engine)
+                   for task in itertools.islice(remaining, 2 * max_workers)]
+        while pending:
+            future = pending.pop(0)
+            try:
+                result = future.result()
+            except Exception as e:  # e.g. a worker process died
+                result = None, f"{type(e).__name__}: {e}"
+            next_task = next(remaining, None)
+            if next_task is not None:
+                pending.append(executor.submit(_extract_task, *next_task[1:], engine))
+            yield result
+
+
+def _extract_task(pdf_path: str, start: int, end: Optional[int], engine: str):
+    # Runs in a worker process; errors are returned instead of raised so one bad file
+    # cannot take down the batch
+    try:
+        return extract_pages(pdf_path, start, end, engine), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def extract_pdfs(pdf_paths: List[str], max_workers: Optional[int] = None, engine: str = "pypdf2",
+                 pages_per_task: Optional[int] = None,
+                 progress: Optional[Callable[[int, int, str], None]] = None) -> List[dict]:
+    """
+    Extract many PDFs on a process pool.
+
+    Args:
+        pdf_paths (list): Paths of the PDFs to extract.
+        max_workers (int): Number of worker processes (defaults to the CPU count; 1 runs in-process).
+        engine (str): "pypdf2" or "pymupdf".
+        pages_per_task (int): If set, PDFs with more pages are split into page ranges of this size
+            so a single large PDF is spread across workers.
+        progress (callable): Called as progress(done, total, pdf_path) after each task finishes.
+
+    Returns:
+        list: One dict per input path, in input order, with "path", "pages" (list of page text,
+        or None on failure) and "error" (None on success).
+    """
+    return list(iter_extract_pdfs(pdf_paths, max_workers, engine, pages_per_task, progress))
+
+
+# Example usage: extract the demo readings serially and on a process pool
+if __name__ == "__main__":
+    import glob
+    import time
+
+    reading_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test", "demo_reading")
+    pdf_paths = sorted(glob.glob(os.path.join(reading_dir, "*.pdf"))) + ["missing.pdf"]
+
+    for workers in (1, os.cpu_count()):
+        start = time.perf_counter()
+        results = extract_pdfs(pdf_paths, max_workers=workers, pages_per_task=8)
+        print(f"{workers} worker(s): {time.perf_counter() - start:.2f}s")
+    for result in results:
+        status = result["error"] or f"{len(result['pages'])} pages"
+        print(f"{os.path.basename(result['path'])}: {status}")
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from pydantic import BaseModel
+from openai.types.chat import ChatCompletionMessage
+
+# Default location and limits of the shared response cache, overridable from the environment.
+# The default file lives in the repository's cache/ directory, wherever the process is started from
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                          "cache", "llm_responses.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600))  # Seconds; 0 keeps entries forever
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 << 20))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+CREATE INDEX IF NOT EXISTS responses_created ON responses (created);
+-- Running total of the entries' sizes, kept in step with every write by the triggers below
+CREATE TABLE IF NOT EXISTS meta (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta (id, total) SELECT 0, COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses
+BEGIN UPDATE meta SET total = total + NEW.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses
+BEGIN UPDATE meta SET total = total - OLD.size WHERE id = 0; END;
+CREATE TRIGGER IF NOT EXISTS responses_update AFTER UPDATE OF size ON responses
+BEGIN UPDATE meta SET total = total + NEW.size - OLD.size WHERE id = 0; END;
+"""
+
+
+class ResponseCache:
+    """
+    Persistent cache of LLM responses in a single SQLite file.
+
+    Entries are keyed by a hash of everything that determines a response: model, system and
+    user prompts, the JSON schema of the structured output class and the generation params.
+    Plain completions are stored as chat messages and structured outputs as the JSON of their
+    schema instance, which get() validates back into the schema class. Entries older than
+    `ttl` seconds are misses; past max_bytes the least recently read entries are evicted.
+    The total size is kept in a one-row meta table by triggers, so checking it after a write
+    does not scan the table. The file is in WAL mode, so several processes can read and write it at once; each thread
+    uses its own connection.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_bytes: int = LLM_CACHE_MAX_BYTES, timeout: float = 30.0):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit; writes take the database lock for the statement only
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str, schema_class=None, params: dict = None) -> str:
+        schema = schema_class.model_json_schema() if schema_class is not None else None
+        payload = json.dumps({"model": model, "system": system_prompt, "user": user_prompt, "schema": schema,
+                              "params": params or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, schema_class=None):
+        """
+        Cached response for key, or None on a miss (absent, expired, or no longer valid for schema_class).
+        """
+        connection = self._connection()
+        row = connection.execute("SELECT kind, value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is not None and self.ttl and now - row[2] > self.ttl:
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        kind, value, _ = row
+        try:
+            if kind == "message":
+                response = ChatCompletionMessage.model_validate_json(value)
+            elif kind == "schema" and schema_class is not None:
+                response = schema_class.model_validate_json(value)
+            else:
+                response = json.loads(value)
+        except ValueError as e:
+            print(f"Discarding cached response that no longer validates: {e}")
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+        connection.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response):
+        """
+        Store a response (a chat message, a schema instance or a JSON value) and evict past max_bytes.
+        """
+        if isinstance(response, ChatCompletionMessage):
+            kind, value = "message", response.model_dump_json()
+        elif isinstance(response, BaseModel):
+            kind, value = "schema", response.model_dump_json()
+        else:
+            kind, value = "json", json.dumps(response)
+        now = time.time()
+        connection = self._connection()
+        # An upsert rather than INSERT OR REPLACE, whose implicit delete would bypass the triggers
+        connection.execute("INSERT INTO responses (key, kind, value, size, created, accessed) "
+                           "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET kind = excluded.kind, "
+                           "value = excluded.value, size = excluded.size, created = excluded.created, "
+                           "accessed = excluded.accessed", (key, kind, value, len(value), now, now))
+        self.evict()
+
+    def evict(self):
+        """
+        Drop expired entries, then the least recently read ones until the cache fits in max_bytes.
+        """
+        connection = self._connection()
+        if self.ttl:
+            connection.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        total = connection.execute("SELECT total FROM meta WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest reads first, up to the last entry needed to get back under the limit
+        excess, cutoff = total - self.max_bytes, None
+        for accessed, size in connection.execute("SELECT accessed, size FROM responses ORDER BY accessed"):
+            excess -= size
+            cutoff = accessed
+            if excess <= 0:
+                break
+        connection.execute("DELETE FROM responses WHERE accessed <= ?", (cutoff,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self):
+        self._connection().execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+_default_caches = {}
+_default_caches_lock = threading.Lock()
+
+
+def default_response_cache() -> Optional[ResponseCache]:
+    """
+    Process-wide cache at LLM_CACHE_PATH, or None when disabled with LLM_CACHE=0.
+    """
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    with _default_caches_lock:
+        if LLM_CACHE_PATH not in _default_caches:
+            _default_caches[LLM_CACHE_PATH] = ResponseCache(LLM_CACHE_PATH)
+        return _default_caches[LLM_CACHE_PATH]
+
+
+# Example usage: hit latency and concurrent writers from several processes on one cache file
+if __name__ == "__main__":
+    import tempfile
+    import multiprocessing
+
+    class Summary(BaseModel):
+        title: str
+        points: list[str]
+
+    def write_entries(path, worker, n):
+        cache = ResponseCache(path)
+        for i in range(n):
+            key = ResponseCache.key("gpt-4o-mini", "system", f"prompt {worker}-{i}", Summary)
+            cache.put(key, Summary(title=f"{worker}-{i}", points=["a", "b"]))
+        cache.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "responses.sqlite3")
+        cache = ResponseCache(path)
+        n_workers, n_entries = 4, 250
+        start = time.perf_counter()
+        workers = [multiprocessing.Process(target=write_entries, args=(path, w, n_entries)) for w in range(n_workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        print(f"{n_workers} processes wrote {len(cache)} entries in {elapsed:.2f}s "
+              f"(exit codes {[worker.exitcode for worker in workers]})")
+
+        key = ResponseCache.key("gpt-4o-mini", "system", "prompt 0-0", Summary)
+        assert cache.get(key, Summary) == Summary(title="0-0", points=["a", "b"])
+        assert cache.get(ResponseCache.key("gpt-4o", "system", "prompt 0-0", Summary), Summary) is None
+        message = ChatCompletionMessage(role="assistant", content="A long essay paragraph.")
+        cache.put("message", message)
+        assert cache.get("message") == message
+        start = time.perf_counter()
+        for _ in range(1000):
+            cache.get(key, Summary)
+        print(f"hit: {(time.perf_counter() - start):.3f} ms per lookup, {cache.hits} hits, {cache.misses} misses")
+
+        cache.max_bytes = 20000
+        cache.evict()
+        print(f"after evicting down to {cache.max_bytes} bytes: {len(cache)} entries")
+        cache.close()
@@ -0,0 +1,180 @@
+import os
+import sys
+import numpy as np
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Optional
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.vectorStore import SEARCH_BLOCK_ROWS, QUANTIZED_BLOCK_ROWS, normalize_rows, top_k
+
+# Worker processes run single-threaded BLAS, one shard at a time per core
+_BLAS_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+_shared = {}  # Arrays attached by a worker process: name -> (SharedMemory, array)
+
+
+def _attach(specs):
+    # Pool initializer: map the shared arrays into this worker
+    for name, (shm_name, shape, dtype) in specs.items():
+        # Spawned workers share the parent's resource tracker, which unlinks the segments in close()
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _shared[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+
+
+def _search_shard(start: int, end: int, queries: np.ndarray, top_n: int, block_rows: int):
+    """
+    Local top_n (rows, similarities) per query over rows [start, end) of the shared matrix.
+    """
+    matrix, deleted = _shared["embeddings"][1], _shared["deleted"][1]
+    scales = _shared["scales"][1] if "scales" in _shared else None
+    best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+    best_scores = np.zeros((len(queries), 0), dtype=np.float32)
+    for block_start in range(start, end, block_rows):
+        block_end = min(block_start + block_rows, end)
+        scores = matrix[block_start:block_end].astype(np.float32, copy=False) @ queries.T
+        if scales is not None:
+            scores *= scales[block_start:block_end, None]
+        scores[deleted[block_start:block_end]] = -np.inf
+        # Merge the block's candidates into the running top_n of each query
+        rows = np.concatenate([best_rows, np.broadcast_to(np.arange(block_start, block_end),
+                                                          (len(queries), block_end - block_start))], axis=1)
+        scores = np.concatenate([best_scores, scores.T], axis=1)
+        k = min(top_n, scores.shape[1])
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        best_rows = np.take_along_axis(rows, part, axis=1)
+        best_scores = np.take_along_axis(scores, part, axis=1)
+    return best_rows, best_scores
+
+
+class ShardedSearch:
+    """
+    Multi-core exact search over a snapshot of a VectorStore.
+
+    The stored matrix (raw float32/float16/int8 codes, plus int8 scales) and the tombstone
+    mask are copied once into shared memory and split into n_shards contiguous row ranges.
+    A pool of worker processes maps the shared arrays; each query batch fans out one task
+    per shard, every shard computes its local top-k with BLAS, and the local results are
+    merged into the global top-k. The snapshot does not follow later changes to the store
+    (see is_current); build a new ShardedSearch after adding or deleting rows.
+    """
+
+    def __init__(self, store, n_shards: int = None, n_workers: int = None, block_rows: int = SEARCH_BLOCK_ROWS):
+        self.store = store
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.n_shards = n_shards or self.n_workers
+        self.block_rows = min(block_rows, QUANTIZED_BLOCK_ROWS) if store.precision != "float32" else block_rows
+        self.size = len(store)
+        self.version = store.version
+        bounds = np.linspace(0, self.size, self.n_shards + 1).astype(np.int64)
+        self.shards = [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+        arrays = {"embeddings": store._embeddings[:self.size], "deleted": store.deleted}
+        if store.precision == "int8":
+            arrays["scales"] = store._scales[:self.size]
+        self._segments, specs = [], {}
+        for name, array in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            self._segments.append(shm)
+            specs[name] = (shm.name, array.shape, array.dtype.str)
+
+        # Spawned workers inherit single-threaded BLAS settings from the environment
+        saved = {variable: os.environ.get(variable) for variable in _BLAS_THREAD_VARIABLES}
+        os.environ.update({variable: "1" for variable in _BLAS_THREAD_VARIABLES})
+        try:
+            self._pool = multiprocessing.get_context("spawn").Pool(self.n_workers, initializer=_attach,
+                                                                   initargs=(specs,))
+        finally:
+            for variable, value in saved.items():
+                if value is None:
+                    os.environ.pop(variable, None)
+                else:
+                    os.environ[variable] = value
+
+    def is_current(self, store) -> bool:
+        """
+        Whether the snapshot still matches `store` (same store, no rows added, deleted or compacted since).
+        """
+        return store is self.store and store.version == self.version
+
+    def search(self, query_embedding, top_n: int = 1, rescore: int = 0, full_queries=None):
+        """
+        Exact cosine search, see VectorStore.search. Returns (row indices, similarities), best first.
+        """
+        if full_queries is not None:
+            full_queries = np.reshape(full_queries, (1, -1))
+        return self.search_many(np.reshape(query_embedding, (1, -1)), top_n, rescore, full_queries)[0]
+
+    def search_many(self, query_embeddings, top_n: int = 1, rescore: int = 0,
+                    full_queries: Optional[np.ndarray] = None) -> list:
+        """
+        Exact cosine search for several queries across all shards, see VectorStore.search_many.
+        Returns a list of (row indices, similarities) per query, best first.
+        """
+        queries = normalize_rows(np.reshape(query_embeddings, (-1, self.store.dim)))
+        rescore = rescore if self.store._float32_embeddings is not None else 0
+        n = max(top_n, rescore)
+        shard_hits = self._pool.starmap(_search_shard, [(start, end, queries, n, self.block_rows)
+                                                        for start, end in self.shards])
+        rows = np.concatenate([shard_rows for shard_rows, _ in shard_hits], axis=1)
+        scores = np.concatenate([shard_scores for _, shard_scores in shard_hits], axis=1)
+        hits = []
+        for query_rows, query_scores in zip(rows, scores):
+            indices, best = top_k(query_scores, n)
+            live = best > -np.inf
+            hits.append((query_rows[indices][live], best[live]))
+        if not rescore:
+            return hits
+        full_queries = queries if full_queries is None else normalize_rows(full_queries)
+        return self.store.rerank(full_queries, hits, top_n)
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        for shm in self._segments:
+            shm.close()
+            shm.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Example usage: latency and throughput of exact search at 1M vectors, single process vs shards
+if __name__ == "__main__":
+    import time
+    from fundations.vectorStore import VectorStore
+
+    n, dim, k = 1000000, 256, 10
+    rng = np.random.default_rng(0)
+    store = VectorStore(dim, initial_capacity=n)
+    for start in range(0, n, 100000):
+        store.add(rng.standard_normal((100000, dim), dtype=np.float32), [""] * 100000)
+    queries = rng.standard_normal((64, dim), dtype=np.float32)
+    print(f"{n} x {dim} float32 ({store.embeddings.nbytes / 1e9:.1f} GB), {os.cpu_count()} CPUs")
+
+    def measure(search_one, search_many):
+        start = time.perf_counter()
+        for query in queries[:16]:
+            search_one(query)
+        latency = (time.perf_counter() - start) * 1000 / 16
+        start = time.perf_counter()
+        search_many(queries)
+        return latency, len(queries) / (time.perf_counter() - start)
+
+    expected = store.search_many(queries, top_n=k)
+    latency, throughput = measure(lambda q: store.search(q, top_n=k), lambda qs: store.search_many(qs, top_n=k))
+    print(f"single process   {latency:7.1f} ms/query, {throughput:7.1f} queries/s (batch of {len(queries)})")
+    for n_shards in sorted({1, 2, 4, os.cpu_count() or 1}):
+        with ShardedSearch(store, n_shards=n_shards, n_workers=n_shards) as sharded:
+            found = sharded.search_many(queries, top_n=k)
+            assert all(np.array_equal(a[0], b[0]) for a, b in zip(found, expected))
+            latency, throughput = measure(lambda q: sharded.search(q, top_n=k),
+                                          lambda qs: sharded.search_many(qs, top_n=k))
+        print(f"{n_shards:2d} shard(s)      {latency:7.1f} ms/query, {throughput:7.1f} queries/s")
@@ -0,0 +1,104 @@
+import os
+import mmap
+import shutil
+import threading
+from typing import Optional
+
+
+class TextBlob:
+    """
+    Append-only UTF-8 text storage addressed by (offset, length).
+
+    Without a path the bytes live in a bytearray. With a path the blob is a file: appends
+    go to its end and reads go through a read-only mmap that is remapped as the file grows,
+    so only the pages of the texts actually read become resident. Bytes past the offsets a
+    reader knows about are ignored, so an interrupted append never corrupts earlier texts.
+    A file-backed blob assumes a single writing process; a temporary one deletes its file
+    when closed.
+    """
+
+    def __init__(self, path: Optional[str] = None, data: bytes = b"", temporary: bool = False):
+        self.path = path
+        self.temporary = temporary
+        self._lock = threading.Lock()
+        self._map = None
+        if path is None:
+            self._buffer = bytearray(data)
+            self._size = len(self._buffer)
+            return
+        self._file = open(path, "a+b")
+        if data:
+            self._file.write(data)
+            self._file.flush()
+        self._size = self._file.seek(0, os.SEEK_END)
+        self._remap()
+
+    @property
+    def in_memory(self) -> bool:
+        return self.path is None
+
+    @property
+    def resident_bytes(self) -> int:
+        # Mapped pages belong to the page cache, not to this process's heap
+        return len(self._buffer) if self.in_memory else 0
+
+    def __len__(self):
+        return self._size
+
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), self._size, access=mmap.ACCESS_READ) if self._size else None
+
+    def append(self, data: bytes) -> int:
+        """
+        Append bytes and return the offset they start at.
+        """
+        with self._lock:
+            offset = self._size
+            if self.in_memory:
+                self._buffer += data
+            else:
+                self._file.write(data)
+            self._size += len(data)
+            return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        if self.in_memory:
+            return bytes(self._buffer[offset:offset + length])
+        if length == 0:
+            return b""
+        with self._lock:
+            if self._map is None or offset + length > len(self._map):
+                self._file.flush()
+                self._remap()
+            return self._map[offset:offset + length]
+
+    def write_to(self, f):
+        """
+        Write the blob's bytes to an open binary file.
+        """
+        if self.in_memory:
+            f.write(self._buffer)
+            return
+        with self._lock:
+            self._file.flush()
+        start = f.tell()
+        with open(self.path, "rb") as source:
+            shutil.copyfileobj(source, f)
+        f.truncate(start + self._size)  # Drop bytes of an interrupted append past our size
+
+    def flush(self):
+        if not self.in_memory:
+            with self._lock:
+                self._file.flush()
+
+    def close(self):
+        if not self.in_memory:
+            with self._lock:
+                if self._map is not None:
+                    self._map.close()
+                    self._map = None
+                self._file.close()
+                if self.temporary:
+                    os.remove(self.path)
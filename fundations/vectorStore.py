@@ -0,0 +1,658 @@
+import os
+import sys
+import heapq
+import json
+import tempfile
+import numpy as np
+from typing import Iterable, List, Optional
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.textBlob import TextBlob
+
+# Rows scored per block when scanning large (possibly memory-mapped) indexes
+SEARCH_BLOCK_ROWS = 65536
+# Quantized blocks are converted to float32 before scoring, so they are scanned in smaller blocks
+QUANTIZED_BLOCK_ROWS = 8192
+
+# Storage precisions of the embedding matrix
+PRECISIONS = {"float32": np.float32, "float16": np.float16, "int8": np.int8}
+
+
+def normalize_rows(x) -> np.ndarray:
+    """
+    L2-normalize a vector or each row of a matrix as float32, leaving zero rows untouched.
+    """
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
+
+
+def top_k(scores: np.ndarray, k: int):
+    """
+    Indices and values of the k largest scores, best first, using an O(n) partial selection.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=scores.dtype)
+    if k < len(scores):
+        indices = np.argpartition(-scores, k - 1)[:k]
+    else:
+        indices = np.arange(len(scores))
+    indices = indices[np.argsort(-scores[indices], kind="stable")]
+    return indices, scores[indices]
+
+
+class DequantizedRows:
+    """
+    Read-only float32 view of a quantized VectorStore: indexing dequantizes only the selected rows.
+    """
+
+    def __init__(self, store: "VectorStore"):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    @property
+    def shape(self):
+        return len(self.store), self.store.dim
+
+    def __getitem__(self, index) -> np.ndarray:
+        return self.store._dequantize(index)
+
+
+class VectorStore:
+    """
+    Columnar store for chunk embeddings and their metadata.
+
+    Embeddings live in one contiguous float32 matrix that doubles its capacity when full,
+    so appending n rows costs amortized O(n). Rows are L2-normalized on insert, so a dot
+    product with a normalized query is the cosine similarity. Chunk text is kept in a single
+    UTF-8 buffer addressed by (offset, length), and sources are interned into integer ids.
+    With precision="float16" or "int8" the matrix is stored quantized (int8 rows with a
+    per-row scale), and searches score the quantized rows directly. keep_float32=True also
+    keeps a float32 copy, memory-mapped once the store is saved and loaded, so the top
+    candidates can be rescored exactly. For reduced-dimension stores the copy holds the
+    full-dimension embeddings (add(full_embeddings=...)), so rescoring is a rerank at full
+    dimension.
+    Each source also keeps the contiguous row ranges it occupies, so searches scoped to a
+    few sources touch only their rows. Deleted rows are tombstoned and skipped by searches
+    until compact() drops them.
+    """
+
+    # Per-row metadata columns, grown, saved and compacted together with the embeddings
+    COLUMNS = ("_text_offsets", "_text_lengths", "_source_ids", "_pages", "_deleted", "_scales")
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024, precision: str = "float32",
+                 keep_float32: bool = False, text_path: Optional[str] = None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Invalid precision! Choose one of {list(PRECISIONS)}.")
+        self.dim = dim
+        self.precision = precision
+        self.keep_float32 = keep_float32
+        self.full_dim = None  # Dimension of the float32 copy
+        self.size = 0
+        self._capacity = initial_capacity
+        self._embeddings = None
+        # Chunk texts, addressed by the rows' (offset, length); file-backed and memory-mapped
+        # with a text_path, and once the store is saved or loaded
+        self._text_blob = TextBlob(text_path)
+        self._text_offsets = np.zeros(initial_capacity, dtype=np.int64)
+        self._text_lengths = np.zeros(initial_capacity, dtype=np.int32)
+        self._source_ids = np.zeros(initial_capacity, dtype=np.int32)
+        self._pages = np.zeros(initial_capacity, dtype=np.int32)
+        self._deleted = np.zeros(initial_capacity, dtype=bool)
+        self._scales = np.ones(initial_capacity, dtype=np.float32)  # int8 dequantization scale per row
+        self._float32_embeddings = None
+        self.n_deleted = 0
+        self.version = 0  # Bumped by every add, delete and compaction
+        self.source_names = []
+        self._source_lookup = {}
+        self._source_ranges = {}  # source id -> list of [start, end) row ranges, in row order
+        if dim is not None:
+            self._allocate(initial_capacity)
+
+    def __len__(self):
+        return self.size
+
+    def _allocate(self, capacity: int):
+        self._embeddings = np.zeros((capacity, self.dim), dtype=PRECISIONS[self.precision])
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """
+        The stored embeddings as float32, shape (size, dim): a view for float32 stores,
+        a dequantized copy otherwise (see vectors for row-wise access).
+        """
+        if self._embeddings is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        if self.precision == "float32":
+            return self._embeddings[:self.size]
+        return self._dequantize(slice(0, self.size))
+
+    @property
+    def vectors(self):
+        """
+        Row-indexable float32 access to the embeddings that only dequantizes the rows it
+        is indexed with, e.g. store.vectors[rows].
+        """
+        if self.precision == "float32":
+            return self.embeddings
+        return DequantizedRows(self)
+
+    def _quantize(self, embeddings: np.ndarray):
+        """
+        Storage codes and per-row scales of normalized float32 rows.
+        """
+        if self.precision != "int8":
+            return embeddings.astype(PRECISIONS[self.precision]), 1.0
+        scales = np.abs(embeddings).max(axis=1) / 127
+        scales[scales == 0] = 1
+        return np.round(embeddings / scales[:, None]).astype(np.int8), scales
+
+    def _dequantize(self, index) -> np.ndarray:
+        rows = self._embeddings[:self.size][index].astype(np.float32)
+        if self.precision == "int8":
+            rows *= self._scales[:self.size][index][..., None]
+        return rows
+
+    @property
+    def deleted(self) -> np.ndarray:
+        """
+        Tombstone mask of the stored rows.
+        """
+        return self._deleted[:self.size]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes of RAM used by the stored rows (embeddings, text and metadata columns).
+        A memory-mapped float32 copy is not counted.
+        """
+        row_bytes = sum(getattr(self, name).itemsize for name in self.COLUMNS)
+        matrix_bytes = self._embeddings[:self.size].nbytes if self._embeddings is not None else 0
+        if self._float32_embeddings is not None and not isinstance(self._float32_embeddings, np.memmap):
+            matrix_bytes += self._float32_embeddings[:self.size].nbytes
+        return matrix_bytes + self._text_blob.resident_bytes + self.size * row_bytes
+
+    def _grow(self, min_capacity: int):
+        """
+        Double the capacity of every column until it holds at least min_capacity rows.
+        """
+        capacity = self._capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        mapped = isinstance(self._embeddings, np.memmap) or isinstance(self._float32_embeddings, np.memmap)
+        if capacity == self._capacity and not mapped:
+            return
+
+        def resized(column):
+            new_column = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+            new_column[:self.size] = column[:self.size]
+            return new_column
+
+        self._embeddings = resized(self._embeddings)
+        if self._float32_embeddings is not None:
+            self._float32_embeddings = resized(self._float32_embeddings)
+        for name in self.COLUMNS:
+            setattr(self, name, resized(getattr(self, name)))
+        self._capacity = capacity
+
+    def source_id(self, source: Optional[str]) -> int:
+        """
+        Interned id of a source name (-1 for no source).
+        """
+        if source is None:
+            return -1
+        if source not in self._source_lookup:
+            self._source_lookup[source] = len(self.source_names)
+            self.source_names.append(source)
+        return self._source_lookup[source]
+
+    def _index_source_ranges(self, start: int, end: int):
+        """
+        Record the source runs of rows [start, end) in the per-source row ranges.
+        """
+        if end <= start:
+            return
+        source_ids = self._source_ids[start:end]
+        boundaries = np.flatnonzero(np.diff(source_ids)) + 1
+        for run_start, run_end in zip(np.r_[0, boundaries], np.r_[boundaries, len(source_ids)]):
+            ranges = self._source_ranges.setdefault(int(source_ids[run_start]), [])
+            if ranges and ranges[-1][1] == start + run_start:
+                ranges[-1][1] = start + int(run_end)
+            else:
+                ranges.append([start + int(run_start), start + int(run_end)])
+
+    def add(self, embeddings, texts: List[str], sources: Optional[List[str]] = None,
+            pages: Optional[List[int]] = None, full_embeddings=None):
+        """
+        Append rows to the store. `embeddings`, `texts`, `sources` and `pages` are aligned.
+        With keep_float32, `full_embeddings` (defaulting to `embeddings`) go to the float32 copy.
+        """
+        n = len(texts)
+        if n == 0:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim == 1:
+            embeddings = embeddings.reshape(1, -1)
+        if embeddings.shape[0] != n:
+            raise ValueError(f"Got {embeddings.shape[0]} embeddings for {n} texts")
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        if self._embeddings is None:
+            self._allocate(self._capacity)
+        if embeddings.shape[1] != self.dim:
+            raise ValueError(f"Expected embeddings of dimension {self.dim}, got {embeddings.shape[1]}")
+
+        if self.keep_float32:
+            full_embeddings = embeddings if full_embeddings is None else np.asarray(full_embeddings, dtype=np.float32)
+            full_embeddings = full_embeddings.reshape(n, -1)
+            self.full_dim = self.full_dim or full_embeddings.shape[1]
+            if full_embeddings.shape[1] != self.full_dim:
+                raise ValueError(f"Expected full embeddings of dimension {self.full_dim}, got {full_embeddings.shape[1]}")
+            if self._float32_embeddings is None:
+                self._float32_embeddings = np.zeros((self._capacity, self.full_dim), dtype=np.float32)
+
+        self._grow(self.size + n)
+        start, end = self.size, self.size + n
+        self._embeddings[start:end], self._scales[start:end] = self._quantize(normalize_rows(embeddings))
+        if self.keep_float32:
+            self._float32_embeddings[start:end] = normalize_rows(full_embeddings)
+        encoded = [text.encode("utf-8") for text in texts]
+        self._text_lengths[start:end] = [len(data) for data in encoded]
+        self._text_offsets[start:end] = self._text_blob.append(b"".join(encoded)) + \
+            np.concatenate([[0], np.cumsum(self._text_lengths[start:end - 1], dtype=np.int64)])
+        self._source_ids[start:end] = [self.source_id(source) for source in sources] if sources is not None else -1
+        self._pages[start:end] = pages if pages is not None else 0
+        self._deleted[start:end] = False
+        self._index_source_ranges(start, end)
+        self.size = end
+        self.version += 1
+
+    def delete_rows(self, rows):
+        """
+        Tombstone rows so searches skip them. Space is reclaimed by compact().
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        newly_deleted = rows[~self._deleted[rows]]
+        self._deleted[newly_deleted] = True
+        self.n_deleted += len(np.unique(newly_deleted))
+        self.version += 1
+
+    def source_rows(self, source: str) -> np.ndarray:
+        """
+        Live rows belonging to a source.
+        """
+        return self.filter_rows(sources=[source])
+
+    def filter_rows(self, sources: Optional[Iterable[str]] = None, pages: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        Live rows (sorted) from any of `sources` whose page is in `pages`; None means no filter.
+        Source filters gather only the sources' row ranges and the page filter is applied to
+        those rows only, so the cost grows with the matching subset, not the store.
+        """
+        if sources is None:
+            rows = np.arange(self.size, dtype=np.int64)
+        else:
+            ranges = sorted(row_range for source in set(sources) if source in self._source_lookup
+                            for row_range in self._source_ranges.get(self._source_lookup[source], []))
+            rows = np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in ranges]) \
+                if ranges else np.zeros(0, dtype=np.int64)
+        if pages is not None:
+            row_pages = self._pages[rows]
+            if isinstance(pages, range) and pages.step == 1:
+                rows = rows[(row_pages >= pages.start) & (row_pages < pages.stop)]
+            else:
+                rows = rows[np.isin(row_pages, np.fromiter(pages, dtype=np.int64))]
+        if self.n_deleted:
+            rows = rows[~self._deleted[rows]]
+        return rows
+
+    def compact(self) -> np.ndarray:
+        """
+        Drop tombstoned rows and rewrite the texts into a new blob (a temporary file next to a
+        file-backed one, swapped in for text.bin on the next save).
+        Returns the old row ids of the kept rows (new row i was old row keep[i]).
+        """
+        keep = np.flatnonzero(~self.deleted)
+        if self._text_blob.in_memory:
+            text_blob = TextBlob()
+        else:
+            fd, path = tempfile.mkstemp(prefix="text-", suffix=".bin", dir=os.path.dirname(self._text_blob.path))
+            os.close(fd)
+            text_blob = TextBlob(path, temporary=True)
+        text_offsets = np.zeros(len(keep), dtype=np.int64)
+        for new_row, old_row in enumerate(keep):
+            text_offsets[new_row] = text_blob.append(self._text_blob.read(self._text_offsets[old_row],
+                                                                          self._text_lengths[old_row]))
+
+        capacity = max(len(keep), 1)
+
+        def compacted(matrix):
+            new_matrix = np.zeros((capacity, matrix.shape[1]), dtype=matrix.dtype)
+            new_matrix[:len(keep)] = matrix[keep]
+            return new_matrix
+
+        if self._embeddings is not None:
+            self._embeddings = compacted(self._embeddings)
+        if self._float32_embeddings is not None:
+            self._float32_embeddings = compacted(self._float32_embeddings)
+        for name in self.COLUMNS:
+            column = np.zeros(capacity, dtype=getattr(self, name).dtype)
+            column[:len(keep)] = getattr(self, name)[keep]
+            setattr(self, name, column)
+        self._text_offsets[:len(keep)] = text_offsets
+        self._text_blob.close()
+        self._text_blob = text_blob
+        self._capacity = capacity
+        self.size = len(keep)
+        self.n_deleted = 0
+        self.version += 1
+        self._source_ranges = {}
+        self._index_source_ranges(0, self.size)
+        return keep
+
+    def search(self, query_embedding, top_n: int = 1, block_rows: int = SEARCH_BLOCK_ROWS,
+               rows: Optional[np.ndarray] = None, rescore: int = 0, full_queries=None):
+        """
+        Exact cosine search: one matrix-vector product plus a partial selection.
+        Indexes larger than block_rows are scanned block by block, keeping a bounded
+        running top-k heap, so a memory-mapped matrix is never read into RAM at once.
+        If `rows` (sorted row ids, e.g. from filter_rows) is given, only those rows are scored.
+        rescore > 0 rescores the best max(top_n, rescore) rows with the float32 copy, using
+        `full_queries` (the full-dimension query) if the copy is wider (requires keep_float32
+        on a quantized store; ignored on a float32 store without a copy).
+        Returns (row indices, similarities) of the top_n rows, best first.
+        """
+        if full_queries is not None:
+            full_queries = np.reshape(full_queries, (1, -1))
+        return self.search_many(np.reshape(query_embedding, (1, -1)), top_n, block_rows, rows, rescore,
+                                full_queries)[0]
+
+    def search_many(self, query_embeddings, top_n: int = 1, block_rows: int = SEARCH_BLOCK_ROWS,
+                    rows: Optional[np.ndarray] = None, rescore: int = 0, full_queries=None) -> list:
+        """
+        Exact cosine search for several queries with one matrix-matrix product per block.
+        Returns a list of (row indices, similarities) per query, best first.
+        """
+        queries = normalize_rows(query_embeddings)
+        if not rescore or (self._float32_embeddings is None and self.precision == "float32"):
+            return self._scan(queries, top_n, block_rows, rows)
+        if self._float32_embeddings is None:
+            raise ValueError("Rescoring needs a store created with keep_float32=True")
+        full_queries = queries if full_queries is None else normalize_rows(full_queries)
+        return self.rerank(full_queries, self._scan(queries, max(top_n, rescore), block_rows, rows), top_n)
+
+    def rerank(self, full_queries: np.ndarray, hits: list, top_n: int) -> list:
+        """
+        Rescore candidate (rows, similarities) per normalized query with the float32 copy
+        and keep the top_n. Returns a list of (row indices, similarities) per query.
+        """
+        results = []
+        for query, (candidates, _) in zip(full_queries, hits):
+            candidates = np.sort(candidates)  # Gather rows in storage order
+            indices, scores = top_k(self._float32_embeddings[candidates] @ query, top_n)
+            results.append((candidates[indices], scores))
+        return results
+
+    def _scan(self, queries: np.ndarray, top_n: int, block_rows: int, rows: Optional[np.ndarray]) -> list:
+        if self.precision != "float32":
+            block_rows = min(block_rows, QUANTIZED_BLOCK_ROWS)
+        n_rows = self.size if rows is None else len(rows)
+        if n_rows <= block_rows:
+            row_ids, scores = self._score_block(queries, 0, n_rows, rows)
+            return [self._live(*self._to_rows(row_ids, *top_k(scores[:, q], top_n))) for q in range(len(queries))]
+
+        heaps = [[] for _ in range(len(queries))]  # Min-heaps of (similarity, -row) with the best top_n rows seen so far
+        for start in range(0, n_rows, block_rows):
+            row_ids, block_scores = self._score_block(queries, start, start + block_rows, rows)
+            for heap, column in zip(heaps, block_scores.T):
+                indices, scores = top_k(column, top_n)
+                for i, score in zip(indices, scores):
+                    item = (float(score), -(start + int(i) if row_ids is None else int(row_ids[i])))
+                    if len(heap) < top_n:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+
+        results = []
+        for heap in heaps:
+            best = sorted(heap, reverse=True)
+            results.append(self._live(np.array([-row for _, row in best], dtype=np.int64),
+                                      np.array([score for score, _ in best], dtype=np.float32)))
+        return results
+
+    def _score_block(self, queries: np.ndarray, start: int, end: int, rows: Optional[np.ndarray]):
+        """
+        Scores of block [start, end) of the scanned rows (all rows, or `rows`), with
+        tombstoned rows set to -inf. Returns (row ids, or None for rows start..end; scores).
+        """
+        index = slice(start, min(end, self.size)) if rows is None else rows[start:end]
+        block = self._embeddings[:self.size][index]
+        scores = block.astype(np.float32, copy=False) @ queries.T
+        if self.precision == "int8":
+            scores *= self._scales[:self.size][index][:, None]
+        row_ids, deleted = (None, self.deleted[index]) if rows is None else (index, self._deleted[index])
+        if self.n_deleted:
+            scores[deleted] = -np.inf
+        return row_ids, scores
+
+    @staticmethod
+    def _to_rows(row_ids: Optional[np.ndarray], indices: np.ndarray, scores: np.ndarray):
+        return (indices if row_ids is None else row_ids[indices]), scores
+
+    @staticmethod
+    def _live(indices: np.ndarray, scores: np.ndarray):
+        """
+        Drop results that only exist because tombstoned rows were scored as -inf.
+        """
+        live = scores > -np.inf
+        return indices[live], scores[live]
+
+    def save(self, directory: str):
+        """
+        Save the store as embeddings.npy, text.bin and metadata.npz in a directory.
+        Each file is written to a temporary name first and then swapped in. The texts are then
+        read from the saved text.bin through mmap, and later rows are appended to it.
+        """
+        os.makedirs(directory, exist_ok=True)
+
+        def write(name, writer):
+            path = os.path.join(directory, name)
+            with open(path + ".tmp", "wb") as f:
+                writer(f)
+            os.replace(path + ".tmp", path)
+
+        write("embeddings.npy", lambda f: np.save(f, np.ascontiguousarray(self._embeddings[:self.size])))
+        if self._float32_embeddings is not None:
+            write("embeddings_f32.npy", lambda f: np.save(f, np.ascontiguousarray(self._float32_embeddings[:self.size])))
+        text_path = os.path.join(directory, "text.bin")
+        if self._text_blob.path is not None and os.path.abspath(self._text_blob.path) == os.path.abspath(text_path):
+            self._text_blob.flush()  # Already appended to in place
+        else:
+            write("text.bin", self._text_blob.write_to)
+            self._text_blob.close()
+            self._text_blob = TextBlob(text_path)
+        write("metadata.npz", lambda f: np.savez(
+            f,
+            text_offsets=self._text_offsets[:self.size],
+            text_lengths=self._text_lengths[:self.size],
+            source_ids=self._source_ids[:self.size],
+            pages=self._pages[:self.size],
+            deleted=self._deleted[:self.size],
+            scales=self._scales[:self.size],
+            source_names=np.frombuffer(json.dumps(self.source_names).encode("utf-8"), dtype=np.uint8),
+        ))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "VectorStore":
+        """
+        Load a store written by save(). With mmap=True the embedding matrix is opened
+        read-only with np.load(mmap_mode="r") and paged in on demand, and texts are read from
+        text.bin through mmap (new rows' texts are appended to it). The float32 copy of a
+        quantized store is always memory-mapped. Adding rows to a loaded store copies the
+        matrices into memory first.
+        """
+        embeddings = np.load(os.path.join(directory, "embeddings.npy"), mmap_mode="r" if mmap else None)
+        float32_path = os.path.join(directory, "embeddings_f32.npy")
+        precision = next(name for name, dtype in PRECISIONS.items() if embeddings.dtype == dtype)
+        text_path = os.path.join(directory, "text.bin")
+        if mmap:
+            text_blob = TextBlob(text_path)
+        else:
+            with open(text_path, "rb") as f:
+                text_blob = TextBlob(data=f.read())
+        metadata = np.load(os.path.join(directory, "metadata.npz"))
+
+        size, dim = embeddings.shape
+        store = cls(dim, initial_capacity=max(size, 1), precision=precision,
+                    keep_float32=os.path.exists(float32_path))
+        store._embeddings = embeddings
+        if store.keep_float32:
+            store._float32_embeddings = np.load(float32_path, mmap_mode="r")
+            store.full_dim = store._float32_embeddings.shape[1]
+        store._text_blob = text_blob
+        for name in cls.COLUMNS:
+            if name[1:] in metadata:
+                setattr(store, name, metadata[name[1:]].copy())
+            else:  # Saved before the column existed
+                setattr(store, name, np.full(size, 1 if name == "_scales" else 0, dtype=getattr(store, name).dtype))
+        store.n_deleted = int(store._deleted.sum())
+        store.source_names = json.loads(metadata["source_names"].tobytes().decode("utf-8"))
+        store._source_lookup = {name: i for i, name in enumerate(store.source_names)}
+        store._index_source_ranges(0, size)
+        store.size = size
+        if size == 0:
+            # An empty matrix cannot be grown in place; start from a fresh in-memory buffer
+            store._allocate(1)
+            for name in cls.COLUMNS:
+                setattr(store, name, np.full(1, 1 if name == "_scales" else 0, dtype=getattr(store, name).dtype))
+        return store
+
+    def text(self, i: int) -> str:
+        return self._text_blob.read(self._text_offsets[i], self._text_lengths[i]).decode("utf-8")
+
+    def source(self, i: int) -> Optional[str]:
+        source_id = self._source_ids[i]
+        return self.source_names[source_id] if source_id >= 0 else None
+
+    def page(self, i: int) -> int:
+        return int(self._pages[i])
+
+    def texts(self) -> List[str]:
+        return [self.text(i) for i in range(self.size)]
+
+    def sources(self) -> List[Optional[str]]:
+        return [self.source(i) for i in range(self.size)]
+
+    def pages(self) -> List[int]:
+        return self._pages[:self.size].tolist()
+
+
+# Example usage: ingestion and search benchmarks on a synthetic corpus
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+    from scipy import spatial
+
+    dim = 1536
+    batch_size = 1000
+    rng = np.random.default_rng(0)
+    batch = rng.standard_normal((batch_size, dim)).astype(np.float32)
+    texts = [f"Synthetic chunk number {i} about protest music." for i in range(batch_size)]
+
+    store = VectorStore()
+    start = time.perf_counter()
+    for n in range(1, 101):
+        store.add(batch, texts, [f"reading{n % 50}.pdf"] * batch_size, [n] * batch_size)
+        if n % 25 == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{len(store):>7} chunks: {elapsed:6.2f}s, {store.nbytes / 1e6:8.1f} MB "
+                  f"(n x dim x 4 = {len(store) * dim * 4 / 1e6:8.1f} MB)")
+
+    # Search: the previous row-by-row pandas/scipy scan against one matrix-vector product
+    n_search = 20000
+    query = rng.standard_normal(dim).astype(np.float32)
+    search_embeddings = rng.standard_normal((n_search, dim))
+    df = pd.DataFrame({"embedding": list(search_embeddings)})
+    start = time.perf_counter()
+    df["similarity"] = df["embedding"].apply(lambda x: 1 - spatial.distance.cosine(query, x))
+    expected = df.sort_values(by="similarity", ascending=False).head(5).index.tolist()
+    pandas_time = time.perf_counter() - start
+
+    small_store = VectorStore(dim)
+    small_store.add(search_embeddings, texts * (n_search // batch_size))
+    start = time.perf_counter()
+    indices, _ = small_store.search(query, top_n=5)
+    numpy_time = time.perf_counter() - start
+    print(f"Search over {n_search} chunks: pandas apply {pandas_time * 1000:.1f} ms, "
+          f"matrix-vector {numpy_time * 1000:.2f} ms, same top 5: {indices.tolist() == expected}")
+
+    start = time.perf_counter()
+    store.search(query, top_n=5)
+    print(f"Search over {len(store)} chunks: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Filtered search: only the matching rows are scored
+    for sources, pages in ((["reading7.pdf"], None), (["reading7.pdf", "reading8.pdf"], None),
+                           (None, range(1, 6)), (["reading7.pdf"], range(1, 50))):
+        start = time.perf_counter()
+        rows = store.filter_rows(sources, pages)
+        store.search(query, top_n=5, rows=rows)
+        print(f"Filtered search (sources={sources}, pages={pages}) over {len(rows)} chunks: "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    # Persistence: save, reopen memory-mapped, and search the memmap block by block
+    with tempfile.TemporaryDirectory() as directory:
+        store.save(directory)
+        start = time.perf_counter()
+        mapped = VectorStore.load(directory)
+        print(f"Loaded {len(mapped)} chunks memory-mapped in {(time.perf_counter() - start) * 1000:.1f} ms")
+        start = time.perf_counter()
+        _, scores = mapped.search(query, top_n=5)
+        _, expected_scores = store.search(query, top_n=5, block_rows=len(store))
+        print(f"Blocked memmap search: {(time.perf_counter() - start) * 1000:.1f} ms, "
+              f"same top 5 scores: {np.allclose(scores, expected_scores)}")
+        del mapped
+
+    # Texts: resident bytes before and after the texts move to the memory-mapped text.bin,
+    # and the cost of materializing only the top-k texts of a search
+    n_texts = 100000
+    text_store = VectorStore(32)
+    chunk_texts = [f"Chunk {i}: " + "protest music and the sound of dissent " * 50 for i in range(n_texts)]
+    text_store.add(rng.standard_normal((n_texts, 32), dtype=np.float32), chunk_texts)
+    del chunk_texts
+    in_memory = text_store.nbytes
+    with tempfile.TemporaryDirectory() as directory:
+        text_store.save(directory)
+        print(f"{n_texts} texts: {in_memory / 1e6:.1f} MB resident in memory, {text_store.nbytes / 1e6:.1f} MB "
+              f"once saved (text.bin is {os.path.getsize(os.path.join(directory, 'text.bin')) / 1e6:.1f} MB)")
+        rows, _ = text_store.search(rng.standard_normal(32), top_n=10)
+        start = time.perf_counter()
+        top_texts = [text_store.text(i) for i in rows]
+        print(f"Materialized the top {len(top_texts)} texts in {(time.perf_counter() - start) * 1000:.2f} ms")
+        del text_store
+
+    # Quantized storage: resident memory, latency and recall@10 against float32
+    n_quantized, k = 50000, 10
+    centers = rng.standard_normal((500, dim)).astype(np.float32)
+    data = centers[rng.integers(500, size=n_quantized)] + 2.0 * rng.standard_normal((n_quantized, dim), dtype=np.float32)
+    queries = centers[rng.integers(500, size=50)] + 2.0 * rng.standard_normal((50, dim), dtype=np.float32)
+    quantized_texts = [""] * n_quantized
+    exact = None
+    for precision, rescore in (("float32", 0), ("float16", 0), ("int8", 0), ("int8", 50)):
+        quantized = VectorStore(dim, precision=precision, keep_float32=rescore > 0)
+        quantized.add(data, quantized_texts)
+        with tempfile.TemporaryDirectory() as directory:
+            quantized.save(directory)
+            quantized = VectorStore.load(directory, mmap=False)  # float32 copy, if any, stays on disk
+            start = time.perf_counter()
+            found = [quantized.search(q, top_n=k, rescore=rescore)[0] for q in queries]
+            elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+            exact = exact or [set(rows.tolist()) for rows in found]
+            recall = np.mean([len(set(rows.tolist()) & e) / k for rows, e in zip(found, exact)])
+            print(f"{precision:<7} rescore={rescore:<3} {quantized.nbytes / 1e6:7.1f} MB, "
+                  f"{elapsed:6.1f} ms/query, recall@{k} = {recall:.3f}")
+            del quantized
@@ -0,0 +1,105 @@
+import os
+import sys
+import shutil
+import hashlib
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.open_ai_RAG import Citation_Retriever
+from fundations.ingestPipeline import IngestPipeline
+
+DEMO_READING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_reading")
+
+
+class CountingEmbeddingClient:
+    """
+    Stand-in for the OpenAI client's embeddings endpoint: deterministic vectors per text,
+    counting round trips and inputs.
+    """
+
+    def __init__(self, dim: int = 32):
+        self.dim = dim
+        self.calls = 0
+        self.inputs = 0
+        self.embeddings = self
+
+    def create(self, input, model, **kwargs):
+        self.calls += 1
+        self.inputs += len(input)
+        data = []
+        for i, text in enumerate(input):
+            seed = int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+            data.append(SimpleNamespace(index=i, embedding=np.random.default_rng(seed).standard_normal(self.dim).tolist()))
+        return SimpleNamespace(data=data[::-1])  # Out of order, as the endpoint is allowed to
+
+
+@pytest.fixture
+def pdf_paths(tmp_path):
+    paths = []
+    for name in sorted(os.listdir(DEMO_READING))[:4]:
+        shutil.copy(os.path.join(DEMO_READING, name), tmp_path / name)
+        paths.append(str(tmp_path / name))
+    return paths
+
+
+def ingest(pdf_paths, one_at_a_time=False, **pipeline_kwargs):
+    client = CountingEmbeddingClient()
+    retriever = Citation_Retriever(embedding_client=client, dedup=False)
+    batches = [[path] for path in pdf_paths] if one_at_a_time else [pdf_paths]
+    for batch in batches:
+        if pipeline_kwargs:
+            IngestPipeline(retriever, max_workers=1, **pipeline_kwargs).run(batch)
+        else:
+            retriever.create_embeddings_for_pdfs(batch, max_workers=1)
+    return retriever, client
+
+
+def test_batched_ingest_saves_round_trips(pdf_paths):
+    batched, batched_client = ingest(pdf_paths)
+    single, single_client = ingest(pdf_paths, one_at_a_time=True)
+
+    # Every chunk of every PDF goes out in one request, instead of one request per PDF
+    assert batched_client.calls == 1
+    assert single_client.calls == len(pdf_paths)
+    assert batched_client.inputs == single_client.inputs == len(batched.store)
+
+    assert batched.store.texts() == single.store.texts()
+    assert list(batched.store.sources()) == list(single.store.sources())
+    assert list(batched.store.pages()) == list(single.store.pages())
+    np.testing.assert_allclose(batched.store.embeddings, single.store.embeddings, rtol=1e-6)
+    assert set(batched.manifest) == {os.path.basename(path) for path in pdf_paths}
+
+
+def test_batches_span_pdfs_and_rows_keep_their_source(pdf_paths):
+    reference, _ = ingest(pdf_paths, one_at_a_time=True)
+    batch_size = 25
+    retriever, client = ingest(pdf_paths, batch_size=batch_size)
+
+    # Batches are filled across PDF boundaries, not cut at the end of each PDF
+    assert client.calls == -(-len(reference.store) // batch_size)
+    for path in pdf_paths:
+        source = os.path.basename(path)
+        assert list(retriever.store.source_rows(source)) == list(reference.store.source_rows(source))
+
+
+def test_changed_pdf_replaces_only_its_rows(pdf_paths):
+    retriever, client = ingest(pdf_paths)
+    changed = os.path.basename(pdf_paths[1])
+    n_rows = len(retriever.store.source_rows(changed))
+    with open(pdf_paths[1], "ab") as f:
+        f.write(b"\n")
+
+    assert retriever.create_embeddings_for_pdfs(pdf_paths, max_workers=1) == 1
+    assert client.calls == 2
+    assert len(retriever.store.source_rows(changed)) == n_rows
+    assert len(retriever.store) - retriever.store.n_deleted == sum(
+        len(retriever.store.source_rows(os.path.basename(path))) for path in pdf_paths)
+
+    retriever.remove_source(pdf_paths[2])
+    assert len(retriever.store.source_rows(os.path.basename(pdf_paths[2]))) == 0
+    assert os.path.basename(pdf_paths[2]) not in retriever.manifest
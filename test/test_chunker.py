@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.chunker import TokenChunker, chunk_pages, count_tokens
+
+
+def test_overlap_must_stay_below_half_of_max_tokens():
+    with pytest.raises(ValueError):
+        TokenChunker(max_tokens=100, overlap_tokens=50, min_tokens=10)
+    TokenChunker(max_tokens=100, overlap_tokens=49, min_tokens=10)
+
+
+def test_no_chunk_holds_only_overlap():
+    # Short one-sentence paragraphs: every paragraph end is a chance to close a chunk early
+    sentences = [f"Sentence number {i} talks about protest songs in the city." for i in range(60)]
+    pages = [(page, "\n\n".join(sentences[page * 10:(page + 1) * 10])) for page in range(6)]
+    chunks = list(chunk_pages(pages, max_tokens=60, overlap_tokens=29, min_tokens=5))
+
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert not previous[0].endswith(chunk[0])  # Each chunk adds sentences beyond the carried-over ones
+    for text, first_page, last_page, n_tokens in chunks:
+        assert first_page <= last_page
+        assert n_tokens <= 60
+    # Every sentence makes it into some chunk
+    assert all(any(sentence in text for text, _, _, _ in chunks) for sentence in sentences)
+    assert sum(count_tokens(sentence) for sentence in sentences) <= sum(chunk[3] for chunk in chunks)
@@ -0,0 +1,55 @@
+import os
+import sys
+import asyncio
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.clientRegistry import PerLoop, ClientRegistry
+
+
+def test_per_loop_values_are_closed_with_their_loop():
+    closed = []
+
+    async def close(value):
+        closed.append(value)
+
+    values = PerLoop(object, close)
+
+    async def use():
+        value = values.get()
+        assert values.get() is value  # Shared within the loop
+        return value
+
+    used = [asyncio.run(use()) for _ in range(3)]
+    assert len(set(map(id, used))) == 3
+    assert closed == used
+    assert len(values) == 0
+
+
+def test_values_of_loops_closed_by_hand_are_dropped():
+    values = PerLoop(object)
+
+    async def use():
+        return values.get()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(use())
+    loop.close()  # Without shutdown_asyncgens(), as asyncio.run() would do
+    assert len(values) == 1
+    asyncio.run(use())
+    assert len(values) == 0
+
+
+def test_async_clients_do_not_outlive_their_loop():
+    registry = ClientRegistry()
+
+    async def get_client():
+        client = registry.get_async("key", "http://127.0.0.1:9/v1")
+        assert registry.get_async("key", "http://127.0.0.1:9/v1") is client
+        return client
+
+    clients = [asyncio.run(get_client()) for _ in range(3)]
+    assert all(client.is_closed() for client in clients)
+    assert len(registry._async_clients) == 0
+    assert registry.stats == {"created": 3, "reused": 3}
@@ -0,0 +1,73 @@
+import os
+import sys
+import shutil
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.dedup import ChunkDeduplicator
+from fundations.open_ai_RAG import Citation_Retriever
+
+DEMO_READING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_reading")
+
+
+def test_different_numbers_are_not_merged():
+    deduplicator = ChunkDeduplicator()
+    deduplicator.add(0, "Table 3: 12.5%")
+    key, kind, _, _ = deduplicator.match("Table 4: 17.1%")
+    assert key is None and kind is None
+
+
+PARAGRAPH = ("Protest songs were sung at every march that summer, and the crowd learned the words "
+             "from leaflets handed out at the station before the rally began in the afternoon.")
+
+
+def test_exact_duplicate_ignores_case_and_whitespace():
+    deduplicator = ChunkDeduplicator()
+    deduplicator.add(7, PARAGRAPH)
+    key, kind, _, _ = deduplicator.match("  " + PARAGRAPH.upper().replace(" ", "\n", 3))
+    assert (key, kind) == (7, "exact")
+
+
+def test_header_and_footer_variants_are_near_duplicates():
+    deduplicator = ChunkDeduplicator()
+    deduplicator.add(0, f"Hong Kong Protest Archive 12 {PARAGRAPH} Page 12 of 240")
+    key, kind, _, _ = deduplicator.match(f"Hong Kong Protest Archive 13 {PARAGRAPH} Page 13 of 240")
+    assert (key, kind) == (0, "near")
+    # Only rows the caller accepts are matched
+    assert deduplicator.match(f"Hong Kong Protest Archive 13 {PARAGRAPH}", accept=lambda row: False)[0] is None
+
+
+def test_figures_that_differ_are_not_near_duplicates():
+    deduplicator = ChunkDeduplicator()
+    deduplicator.add(0, "Table 3: Share of respondents who joined a march, 12.5% in 2019 and 3.1% in 2014.")
+    key, _, _, _ = deduplicator.match(
+        "Table 4: Share of respondents who joined a march, 17.1% in 2020 and 4.8% in 2015.")
+    assert key is None
+
+
+def test_occurrences_are_remapped_after_compaction(tmp_path):
+    names = sorted(os.listdir(DEMO_READING))[:2]
+    paths = []
+    for name in names:
+        shutil.copy(os.path.join(DEMO_READING, name), tmp_path / name)
+        paths.append(str(tmp_path / name))
+    shutil.copy(paths[1], tmp_path / "copy.pdf")
+    paths.append(str(tmp_path / "copy.pdf"))
+
+    retriever = Citation_Retriever(embedding_backend="hashing")
+    retriever.create_embeddings_for_pdfs(paths, max_workers=1)
+    rows = retriever.store.source_rows(names[1])
+    # Every chunk of the copy is recorded against the row of the chunk it duplicates
+    assert len(retriever.store.source_rows("copy.pdf")) == 0
+    assert all(("copy.pdf", retriever.store.page(row)) in retriever.occurrences_of(row) for row in rows)
+    texts = [retriever.store.text(row) for row in rows]
+
+    retriever.remove_source(paths[0])
+    keep = retriever.compact_index()
+    rows = retriever.store.source_rows(names[1])
+    assert retriever.store.n_deleted == 0 and len(keep) == len(rows)
+    assert [retriever.store.text(row) for row in rows] == texts
+    assert all(("copy.pdf", retriever.store.page(row)) in retriever.occurrences_of(row) for row in rows)
+    assert list(retriever._filter_rows(sources=["copy.pdf"])) == list(rows)
+    assert [retriever.deduplicator.match(text)[0] for text in texts] == list(rows)
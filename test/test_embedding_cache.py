@@ -0,0 +1,87 @@
+import os
+import sys
+import shutil
+
+import fitz  # PyMuPDF
+import numpy as np
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.embeddingCache import EmbeddingCache
+from fundations.open_ai_RAG import Citation_Retriever
+from test_batched_ingest import CountingEmbeddingClient, DEMO_READING
+
+MODEL = "text-embedding-3-small"
+
+
+def index(pdf_path, cache_dir):
+    client = CountingEmbeddingClient()
+    cache = EmbeddingCache(cache_dir)
+    retriever = Citation_Retriever(embedding_client=client, embedding_cache=cache, dedup=False)
+    retriever.create_embeddings_for_pdfs([pdf_path], chunk_mode="page", max_workers=1)
+    cache.close()
+    return retriever, client, cache
+
+
+def test_reindexing_hits_the_cache(tmp_path):
+    pdf_path = str(tmp_path / "reading.pdf")
+    shutil.copy(os.path.join(DEMO_READING, sorted(os.listdir(DEMO_READING))[0]), pdf_path)
+    cache_dir = str(tmp_path / "cache")
+    first, first_client, first_cache = index(pdf_path, cache_dir)
+    assert first_client.inputs == len(first.store) == first_cache.misses
+    assert first_cache.hits == 0
+
+    # A fresh index of the unchanged PDF is served entirely from the cache on disk
+    second, second_client, second_cache = index(pdf_path, cache_dir)
+    assert second_client.calls == 0
+    assert (second_cache.hits, second_cache.misses) == (len(second.store), 0)
+    np.testing.assert_array_equal(second.store.embeddings, first.store.embeddings)
+
+    # After editing one page, only that page's chunks go to the endpoint
+    with fitz.open(pdf_path) as document:
+        document[1].insert_text((72, 72), "A note added in the margin of the second page.")
+        document.save(str(tmp_path / "edited.pdf"))
+    shutil.move(str(tmp_path / "edited.pdf"), pdf_path)
+    edited, edited_client, edited_cache = index(pdf_path, cache_dir)
+    changed = [row for row in range(len(edited.store)) if edited.store.page(row) == 2]
+    assert changed and edited_client.inputs == edited_cache.misses == len(changed)
+    assert edited_cache.hits == len(edited.store) - len(changed)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=3 * 4 * 4)
+    cache.put_many(MODEL, ["a", "b", "c"], np.eye(3, 4))
+    assert cache.get(MODEL, "a") is not None  # "a" is now the most recently used
+    cache.put_many(MODEL, ["d"], [np.ones(4)])
+    assert len(cache) == 3 and cache.live_bytes == cache.max_bytes
+    assert cache.get(MODEL, "b") is None
+    for text in ("a", "c", "d"):
+        assert cache.get(MODEL, text) is not None
+    cache.close()
+
+    # Evictions are recorded in the index, so they survive a reopen
+    reopened = EmbeddingCache(str(tmp_path), max_bytes=3 * 4 * 4)
+    assert len(reopened) == 3 and reopened.get(MODEL, "b") is None
+    reopened.close()
+
+
+def test_blob_is_compacted_once_mostly_dead(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=4 * 8 * 4)
+    vectors = np.arange(9 * 8, dtype=np.float32).reshape(9, 8)
+    cache.put_many(MODEL, [f"text {i}" for i in range(4)], vectors[:4])
+    cache.put_many(MODEL, [f"text {i}" for i in range(4, 8)], vectors[4:8])
+    # Half of the blob is dead: not yet more than half
+    assert os.path.getsize(cache.vectors_path) == 8 * 8 * 4
+
+    cache.put_many(MODEL, ["text 8"], vectors[8:])
+    assert os.path.getsize(cache.vectors_path) == cache.live_bytes == 4 * 8 * 4
+    for i in range(5, 9):
+        np.testing.assert_array_equal(cache.get(MODEL, f"text {i}"), vectors[i])
+    cache.close()
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert len(reopened) == 4
+    for i in range(5, 9):
+        np.testing.assert_array_equal(reopened.get(MODEL, f"text {i}"), vectors[i])
+    reopened.close()
@@ -0,0 +1,57 @@
+import os
+import sys
+import glob
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fundations.open_ai_RAG import Citation_Retriever
+from fundations.embeddingBackends import HashingEmbeddingBackend
+
+DEMO_READING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_reading")
+QUERIES = ["protest songs and chants", "Hong Kong Happy Birthday", "queer activism archive"]
+
+
+@pytest.fixture(scope="module")
+def pdf_paths():
+    return sorted(glob.glob(os.path.join(DEMO_READING, "*.pdf")))[:3]
+
+
+def test_fit_embed_save_load_search(pdf_paths, tmp_path):
+    retriever = Citation_Retriever(embedding_backend="hashing")
+    assert not retriever.embedding_backend.fitted
+    retriever.create_embeddings_for_pdfs(pdf_paths, max_workers=1)
+
+    # The IDF was fitted on the corpus before any chunk was embedded
+    backend = retriever.embedding_backend
+    assert backend.fitted
+    assert np.allclose(retriever.store.embeddings, backend.embed(retriever.store.texts()), atol=1e-6)
+    expected = retriever.vector_search_many(QUERIES, top_n=3)
+
+    retriever.save_index(str(tmp_path))
+    loaded = Citation_Retriever(embedding_backend="hashing")
+    loaded.load_index(str(tmp_path))
+    assert loaded.embedding_backend.model_key() == backend.model_key()
+    np.testing.assert_array_equal(loaded.embedding_backend.idf, backend.idf)
+    assert loaded.vector_search_many(QUERIES, top_n=3) == expected
+
+
+def test_idf_is_fitted_once(pdf_paths):
+    retriever = Citation_Retriever(embedding_backend="hashing")
+    retriever.create_embeddings_for_pdfs(pdf_paths[:2], max_workers=1)
+    model_key = retriever.embedding_backend.model_key()
+
+    # Later ingestions reuse the fitted weights, so earlier vectors stay comparable
+    retriever.create_embeddings_for_pdfs(pdf_paths, max_workers=1)
+    assert retriever.embedding_backend.model_key() == model_key
+    with pytest.raises(ValueError):
+        retriever.fit_embedding_backend(["too late"])
+
+
+def test_idf_downweights_common_terms():
+    backend = HashingEmbeddingBackend(dimensions=64).fit(["the protest", "the song", "the chant"])
+    features, _ = backend._features(["the", "protest"])
+    assert backend.idf[features[0]] < backend.idf[features[1]]